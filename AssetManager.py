@@ -0,0 +1,528 @@
+# Loads images and GIFs once per process and shares the surfaces between
+# Pixel Typers.py, Gameplay.py and TheTypingGame.py
+#
+# Everything is cached by (path, size, variant). Callers get shared
+# references, so they must never draw on a returned surface - copy it first.
+#
+# Importing this module does no I/O; the GIF decoders (PIL, imageio) are only
+# imported when the first GIF is decoded.
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+# Folders listed in the asset manifest
+ASSET_DIRECTORIES = ('images', 'fonts')
+
+# Normalized path -> path on disk for every file in ASSET_DIRECTORIES,
+# built on first use (see get_asset_manifest)
+_manifest = None
+
+# (path, size, variant) -> surface, tuple of frames, or None when the file is
+# missing or failed to load (so a bad path is only looked at once)
+_cache = {}
+
+# (size, color) -> filled surface, see get_filled_surface()
+_filled_cache = {}
+
+# (path, size) -> pygame Font
+_font_cache = {}
+
+# Transparent color of colorkeyed frames (see to_display_format)
+COLORKEY = (255, 0, 255)
+
+def get_asset_manifest():
+    """Return the index of asset files, walking ASSET_DIRECTORIES once per process."""
+    global _manifest
+    if _manifest is None:
+        manifest = {}
+        for directory in ASSET_DIRECTORIES:
+            for root, dirs, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    manifest[os.path.normcase(os.path.normpath(path))] = path
+        _manifest = manifest
+    return _manifest
+
+def rebuild_asset_manifest():
+    """Forget the manifest so it is rebuilt from disk on next use."""
+    global _manifest
+    _manifest = None
+
+def resolve_asset(path):
+    """Return the path on disk of an asset, or None if there is no such file.
+
+    Paths inside ASSET_DIRECTORIES are answered from the manifest without
+    touching the filesystem; anything else is checked on disk.
+    """
+    key = os.path.normcase(os.path.normpath(path))
+    if key.split(os.sep, 1)[0] not in ASSET_DIRECTORIES:
+        return path if os.path.isfile(path) else None
+    return get_asset_manifest().get(key)
+
+def asset_exists(path):
+    """Whether an asset file exists (from the manifest - see resolve_asset)."""
+    return resolve_asset(path) is not None
+
+def scale_keep_aspect(image, target_width, target_height):
+    """Scale image to fit target_width x target_height while maintaining aspect ratio."""
+    original_width, original_height = image.get_size()
+    aspect_ratio = original_width / original_height
+
+    # Calculate scaling to fit target dimensions
+    if aspect_ratio > 1:  # Wider than tall
+        new_width = target_width
+        new_height = int(target_width / aspect_ratio)
+        if new_height > target_height:
+            new_height = target_height
+            new_width = int(target_height * aspect_ratio)
+    else:  # Taller than wide or square
+        new_height = target_height
+        new_width = int(target_height * aspect_ratio)
+        if new_width > target_width:
+            new_width = target_width
+            new_height = int(target_width / aspect_ratio)
+
+    return pygame.transform.scale(image, (new_width, new_height))
+
+def to_display_format(surface, use_colorkey=False):
+    """Convert a loaded surface to the display's pixel format, keeping only the alpha it needs.
+
+    Surfaces whose pixels are all opaque get convert(). With use_colorkey,
+    surfaces whose pixels are all either opaque or fully transparent (GIF
+    sprites) are copied onto COLORKEY and get an RLE-accelerated colorkey
+    instead of per-pixel alpha. Everything else gets convert_alpha().
+
+    Only use the colorkey for surfaces that are blitted as they are -
+    tinting one with BLEND_* flags would recolor the transparent pixels.
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert()
+    width, height = surface.get_size()
+    opaque = pygame.mask.from_surface(surface, 254).count()
+    if opaque == width * height:
+        return surface.convert()
+    if use_colorkey and pygame.mask.from_surface(surface, 0).count() == opaque:
+        keyed = pygame.Surface((width, height)).convert()
+        keyed.fill(COLORKEY)
+        keyed.blit(surface, (0, 0))
+        # Can't use the key if a visible pixel already has the key color
+        if pygame.mask.from_threshold(keyed, COLORKEY, (1, 1, 1, 255)).count() == width * height - opaque:
+            keyed.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            return keyed
+    return surface.convert_alpha()
+
+def get_image(path, size=None):
+    """Return the image at path, converted for the display and scaled to size if given.
+
+    Returns None if the file is missing or can't be loaded.
+    """
+    path = os.path.normpath(path)
+    key = (path, size, "image")
+    if key in _cache:
+        return _cache[key]
+
+    image = None
+    if size is None:
+        resolved_path = resolve_asset(path)
+        if resolved_path is not None:
+            try:
+                image = to_display_format(pygame.image.load(resolved_path))
+            except Exception as e:
+                print(f"Error loading image {path}: {e}")
+    else:
+        original = get_image(path)
+        if original is not None:
+            image = pygame.transform.scale(original, size)
+    _cache[key] = image
+    return image
+
+def get_font(path, size, fallback_name='Arial'):
+    """Return the font at path in size points, shared by every screen.
+
+    Falls back to the system font fallback_name if the file can't be loaded.
+    """
+    key = (path, size)
+    font = _font_cache.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        try:
+            font = pygame.font.Font(resolve_asset(path) or path, size)
+        except Exception:
+            font = pygame.font.SysFont(fallback_name, size)
+        _font_cache[key] = font
+    return font
+
+def read_gif_frames(path, alpha=True):
+    """Decode every frame of a GIF into (pixel bytes, size, mode) tuples.
+
+    Uses PIL (correct frame handling and transparency) and falls back to
+    imageio. With alpha=False the frames are opaque RGB. Touches no pygame
+    state, so it is safe to run on a worker thread.
+    """
+    try:
+        from PIL import Image, ImageSequence
+    except ImportError:
+        Image = None
+    try:
+        import imageio
+    except ImportError:
+        imageio = None
+    if Image is None and imageio is None:
+        print("Neither PIL/Pillow nor imageio is installed. Please install one with: pip install pillow imageio")
+
+    mode = 'RGBA' if alpha else 'RGB'
+    frames = []
+    if Image is not None:
+        try:
+            with Image.open(path) as img:
+                for frame in ImageSequence.Iterator(img):
+                    frame = frame.convert(mode)
+                    frames.append((frame.tobytes(), frame.size, mode))
+        except Exception:
+            frames = []
+
+    # Fallback to imageio if PIL failed or not available
+    if not frames and imageio is not None:
+        try:
+            reader = imageio.get_reader(path)
+            for frame in reader:
+                # frame is H x W x (3 or 4)
+                h, w = frame.shape[0], frame.shape[1]
+                frame_mode = 'RGBA' if frame.shape[2] == 4 else 'RGB'
+                frames.append((frame.tobytes(), (w, h), frame_mode))
+            reader.close()
+        except Exception as e:
+            print(f"imageio failed to load GIF {path}: {e}")
+            frames = []
+    return frames
+
+def frames_to_surfaces(frames, alpha=True):
+    """Turn read_gif_frames() output into display-format surfaces (main thread only)."""
+    surfaces = (pygame.image.frombuffer(data, size, mode) for data, size, mode in frames)
+    if alpha:
+        return tuple(to_display_format(surface, use_colorkey=True) for surface in surfaces)
+    return tuple(surface.convert() for surface in surfaces)
+
+def decode_gif(path, alpha=True):
+    """Decode every frame of a GIF into display-format surfaces."""
+    return frames_to_surfaces(read_gif_frames(path, alpha), alpha)
+
+def get_gif_frames(path, size=None, alpha=True):
+    """Return the frames of the GIF at path as a tuple, scaled to size if given.
+
+    Returns an empty tuple if the file is missing or can't be decoded.
+    """
+    path = os.path.normpath(path)
+    key = (path, size, "frames" if alpha else "opaque frames")
+    if key in _cache:
+        return _cache[key]
+
+    if size is None:
+        resolved_path = resolve_asset(path)
+        frames = decode_gif(resolved_path, alpha) if resolved_path is not None else ()
+    else:
+        frames = tuple(pygame.transform.scale(frame, size) for frame in get_gif_frames(path, None, alpha))
+    _cache[key] = frames
+    return frames
+
+class GifStream:
+    """Plays a GIF by decoding frames as they are needed, within a memory ceiling.
+
+    Unlike get_gif_frames(), which keeps every frame decoded, at most
+    max_bytes of display-ready frames are held (but never fewer than the
+    current frame plus the prefetch window); the rest are decoded again when
+    they come up. The next prefetch frames after the one shown are decoded
+    and scaled on a worker thread, so frame() only converts finished frames
+    to the display format. A frame the worker hasn't finished yet is
+    replaced by the last one shown. When the budget is full, the frame shown
+    longest ago goes first - for a looping animation that is the one needed
+    last.
+
+    Opening the file touches no pygame display state, so a stream can be
+    created on a worker thread (see BackgroundLoader.submit); frame() and
+    close() must be called on the main thread.
+    """
+    def __init__(self, path, size=None, alpha=False, max_bytes=8 * 1024 * 1024, prefetch=2):
+        self.path = path
+        self.size = size
+        self.alpha = alpha
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+        self.frames = {}  # Frame index -> display-ready surface
+        self.queued = set()  # Frame indexes the worker is decoding
+        self.capacity = None  # How many frames fit in max_bytes, known after the first decode
+        self.last_index = None
+        self.decodes = 0
+        self.image = None  # PIL image, or
+        self.reader = None  # imageio reader when PIL is not installed
+        # One worker, so the decoder is only ever used by one thread at a time and reads frames in order
+        self.loader = BackgroundLoader(max_workers=1)
+
+        resolved_path = resolve_asset(path)
+        if resolved_path is None:
+            raise FileNotFoundError(path)
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        if Image is not None:
+            self.image = Image.open(resolved_path)
+            self.frame_count = getattr(self.image, 'n_frames', 1)
+        else:
+            import imageio
+            self.reader = imageio.get_reader(resolved_path)
+            self.frame_count = self.reader.get_length()
+        # Decode the first frame here, so frame(0) has something to show straight away
+        self.first_frame = self.decode_frame(0)
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def resident_bytes(self):
+        """Bytes of decoded pixels currently held."""
+        return sum(frame.get_bytesize() * frame.get_width() * frame.get_height() for frame in self.frames.values())
+
+    def read_frame(self, index):
+        """Decode frame index into (pixel bytes, size, mode), like read_gif_frames()."""
+        if self.image is not None:
+            self.image.seek(index)
+            frame = self.image.convert('RGBA' if self.alpha else 'RGB')
+            return frame.tobytes(), frame.size, frame.mode
+        frame = self.reader.get_data(index)
+        mode = 'RGBA' if frame.shape[2] == 4 else 'RGB'
+        return frame.tobytes(), (frame.shape[1], frame.shape[0]), mode
+
+    def decode_frame(self, index):
+        """Decode frame index and scale it to size, as a surface not yet in the display format.
+
+        Runs on the worker thread.
+        """
+        data, frame_size, mode = self.read_frame(index)
+        surface = pygame.image.frombuffer(data, frame_size, mode)
+        if self.size is not None:
+            surface = pygame.transform.scale(surface, self.size)
+        return surface
+
+    def store(self, index, surface):
+        """Keep a decoded frame in the display format, dropping the frame shown longest ago if over budget."""
+        self.queued.discard(index)
+        surface = to_display_format(surface, use_colorkey=True) if self.alpha else surface.convert()
+        self.decodes += 1
+        if self.capacity is None:
+            frame_bytes = surface.get_bytesize() * surface.get_width() * surface.get_height()
+            self.capacity = max(self.prefetch + 1, self.max_bytes // frame_bytes)
+        if len(self.frames) >= self.capacity:
+            # Furthest from coming up again - the frames just shown
+            current = self.last_index or 0
+            evicted = max(self.frames, key=lambda held: (held - current) % self.frame_count)
+            del self.frames[evicted]
+        self.frames[index] = surface
+
+    def queue_frames(self, index):
+        """Have the worker decode frame index and the prefetch frames after it, if they aren't held."""
+        for ahead in range(self.prefetch + 1):
+            wanted = (index + ahead) % self.frame_count
+            if wanted in self.frames or wanted in self.queued:
+                continue
+            self.queued.add(wanted)
+            self.loader.submit(lambda wanted=wanted: self.decode_frame(wanted),
+                               lambda surface, wanted=wanted: self.store(wanted, surface))
+
+    def frame(self, index):
+        """Return frame index as a display-format surface, or the last frame shown if it isn't decoded yet."""
+        if self.first_frame is not None:
+            self.store(0, self.first_frame)
+            self.first_frame = None
+        self.loader.poll()
+        self.queue_frames(index)
+        surface = self.frames.get(index)
+        if surface is None:
+            surface = self.frames.get(self.last_index)
+            if surface is None:
+                # Nothing to show instead - only before anything has been decoded
+                self.loader.wait()
+                surface = self.frames[index]
+            else:
+                return surface
+        self.last_index = index
+        return surface
+
+    def close(self):
+        """Drop the decoded frames and close the file."""
+        self.loader.wait()
+        self.frames.clear()
+        if self.image is not None:
+            self.image.close()
+        if self.reader is not None:
+            self.reader.close()
+
+def get_button_images(path, width, height):
+    """Return (normal, hover, pressed) images for a button, or None if the image is missing.
+
+    The image is scaled to fit width x height keeping its aspect ratio; hover
+    is slightly brightened and pressed slightly darkened.
+    """
+    path = os.path.normpath(path)
+    key = (path, (width, height), "button")
+    if key in _cache:
+        return _cache[key]
+
+    images = None
+    original_image = get_image(path)
+    if original_image is not None:
+        normal_image = scale_keep_aspect(original_image, width, height)
+        hover_image = normal_image.copy()
+        pressed_image = normal_image.copy()
+
+        # Slightly brighten hover image
+        brighten = pygame.Surface(hover_image.get_size(), pygame.SRCALPHA)
+        brighten.fill((50, 50, 50, 50))  # Semi-transparent white
+        hover_image.blit(brighten, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+        # Slightly darken pressed image
+        darken = pygame.Surface(pressed_image.get_size(), pygame.SRCALPHA)
+        darken.fill((0, 0, 0, 50))  # Semi-transparent black
+        pressed_image.blit(darken, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+
+        images = (normal_image, hover_image, pressed_image)
+    _cache[key] = images
+    return images
+
+def get_filled_surface(size, color, alpha=None):
+    """Return a reusable surface of size filled with color, for boxes and overlays.
+
+    An RGBA color gives a per-pixel alpha surface. With an RGB color, alpha is
+    set as the surface alpha (None = opaque) on every call, so a fade reuses
+    one surface instead of allocating one per frame. The same surface is
+    handed out again on the next call - blit it, never draw on it.
+    """
+    size = (size[0], size[1])
+    key = (size, color)
+    surface = _filled_cache.get(key)
+    if surface is None:
+        if len(_filled_cache) >= 128:
+            _filled_cache.clear()
+        if len(color) == 4:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+        else:
+            surface = pygame.Surface(size)
+        surface.fill(color)
+        _filled_cache[key] = surface
+    if len(color) == 3:
+        surface.set_alpha(alpha)
+    return surface
+
+class BackgroundLoader:
+    """Decodes assets on a thread pool and finishes them on the main thread.
+
+    Queue work with add_image(), add_gif() and add_font(), then call poll()
+    once per frame. The workers read and decode files; poll() does the
+    display-format conversion (which must happen on the main thread) and
+    stores the results in the same caches get_image(), get_gif_frames() and
+    get_font() use, so those calls return immediately afterwards.
+    """
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = None  # Started with the first job, stopped when all are done
+        self.jobs = []  # (future, finish) not yet finished
+        self.queued = set()  # Cache keys already queued, so nothing is loaded twice
+        self.total = 0
+        self.done = 0
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def progress(self):
+        """Fraction of queued assets that are ready (1.0 when nothing is queued)."""
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def finished(self):
+        return self.done == self.total
+
+    def submit(self, work, finish):
+        """Run work() on a worker thread, then finish(result) on the main thread in poll()."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="AssetLoader")
+        self.jobs.append((self.executor.submit(work), finish))
+        self.total += 1
+
+    def add_image(self, path):
+        """Load an image (PNG etc.) in the background."""
+        path = os.path.normpath(path)
+        key = (path, None, "image")
+        resolved_path = resolve_asset(path)
+        if key in _cache or key in self.queued or resolved_path is None:
+            return
+        self.queued.add(key)
+
+        def finish(image):
+            _cache[key] = to_display_format(image)
+        self.submit(lambda: pygame.image.load(resolved_path), finish)
+
+    def add_gif(self, path, alpha=True):
+        """Decode the frames of a GIF in the background."""
+        path = os.path.normpath(path)
+        key = (path, None, "frames" if alpha else "opaque frames")
+        resolved_path = resolve_asset(path)
+        if key in _cache or key in self.queued or resolved_path is None:
+            return
+        self.queued.add(key)
+
+        def finish(frames):
+            _cache[key] = frames_to_surfaces(frames, alpha)
+        self.submit(lambda: read_gif_frames(resolved_path, alpha), finish)
+
+    def add_font(self, path, sizes):
+        """Read a font file in the background and create it in each of sizes."""
+        sizes = [size for size in sizes if (path, size) not in _font_cache and (path, size) not in self.queued]
+        resolved_path = resolve_asset(path)
+        if not sizes or resolved_path is None:
+            return
+        self.queued.update((path, size) for size in sizes)
+
+        def read():
+            with open(resolved_path, 'rb') as font_file:
+                return font_file.read()
+
+        def finish(data):
+            if not pygame.font.get_init():
+                pygame.font.init()
+            for size in sizes:
+                _font_cache[(path, size)] = pygame.font.Font(io.BytesIO(data), size)
+        self.submit(read, finish)
+
+    def poll(self):
+        """Finish every asset whose background work is done. Returns progress()."""
+        pending = []
+        for future, finish in self.jobs:
+            if not future.done():
+                pending.append((future, finish))
+                continue
+            try:
+                finish(future.result())
+            except Exception as e:
+                # Leave it to the synchronous loaders, which report the error
+                print(f"Background asset load failed: {e}")
+            self.done += 1
+        self.jobs = pending
+        if not pending and self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+        return self.progress
+
+    def wait(self):
+        """Block until everything queued is loaded."""
+        for future, _ in self.jobs:
+            future.exception()  # Waits without raising
+        self.poll()
+
+def clear_cache():
+    """Forget every loaded asset (e.g. after the display mode changes)."""
+    _cache.clear()
+    _filled_cache.clear()
@@ -0,0 +1,111 @@
+# Simulated typists for races and load tests
+#
+# A bot's whole round is planned before it starts. BotPack draws the time of
+# every keystroke for all of its bots in one NumPy batch - lognormal gaps
+# around each bot's target speed, longer at the start of a word, and
+# mistakes that are sometimes fixed with a backspace - and keeps them in one
+# sorted array, so where every bot is at a given moment is one searchsorted().
+import random
+
+import numpy as np
+
+WORD_PAUSE = 1.6  # The first key of a word waits this many times longer than an average key
+NOTICE_DELAY = 2.5  # Backspacing a mistake waits this many times longer (noticing it)
+
+class BotProfile:
+    """How one bot types.
+
+    wpm            - average keystroke speed in words (5 characters) per minute
+    burstiness     - spread of the gaps between keys (lognormal sigma); 0 types like a metronome
+    mistake_rate   - chance of typing a wrong character at each position
+    backspace_rate - chance a mistake gets fixed (backspace, then the right character)
+    """
+    def __init__(self, name, wpm=50, burstiness=0.4, mistake_rate=0.04, backspace_rate=0.8):
+        self.name = name
+        self.wpm = wpm
+        self.burstiness = burstiness
+        self.mistake_rate = mistake_rate
+        self.backspace_rate = backspace_rate
+
+def random_profiles(count, wpm=55, wpm_spread=15, seed=None):
+    """count bots with speeds around wpm and a mix of typing styles."""
+    rng = random.Random(seed)
+    return [BotProfile(f"Bot {i + 1}",
+                       wpm=min(150, max(15, rng.gauss(wpm, wpm_spread))),
+                       burstiness=rng.uniform(0.2, 0.7),
+                       mistake_rate=rng.uniform(0.01, 0.08),
+                       backspace_rate=rng.uniform(0.5, 0.95))
+            for i in range(count)]
+
+class BotPack:
+    """Keystroke schedules for a batch of bots typing paragraph_text.
+
+    Every character gets three key slots per bot: the first attempt, then a
+    backspace and a retype if the attempt was a mistake that gets fixed
+    (unused slots take no time). The slot times are cumulative, so each
+    bot's row is sorted; rows are laid end to end with a gap bigger than any
+    round, which lets progress() place every bot with one searchsorted().
+    """
+    def __init__(self, paragraph_text, profiles, seed=None):
+        rng = np.random.default_rng(seed)
+        self.profiles = profiles
+        count = len(profiles)
+        length = len(paragraph_text)
+
+        wpm = np.array([p.wpm for p in profiles], dtype=np.float64)
+        sigma = np.array([p.burstiness for p in profiles], dtype=np.float64)
+        mistake_rate = np.array([p.mistake_rate for p in profiles], dtype=np.float64)
+        backspace_rate = np.array([p.backspace_rate for p in profiles], dtype=np.float64)
+
+        # Lognormal gaps whose mean is the bot's seconds per key
+        mu = np.log(60.0 / (wpm * 5)) - sigma ** 2 / 2
+        gaps = rng.lognormal(mu[:, None, None], sigma[:, None, None], (count, length, 3))
+        word_start = np.array([i == 0 or paragraph_text[i - 1] == ' ' for i in range(length)])
+        gaps[:, :, 0] *= np.where(word_start, WORD_PAUSE, 1.0)
+        gaps[:, :, 1] *= NOTICE_DELAY
+
+        wrong = rng.random((count, length)) < mistake_rate[:, None]
+        fixed = wrong & (rng.random((count, length)) < backspace_rate[:, None])
+        gaps[:, :, 1:][~fixed] = 0
+
+        # What each slot leaves behind: the caret position and the mistakes made so far
+        char_index = np.empty((count, length, 3), dtype=np.int32)
+        char_index[:, :, 0] = np.arange(1, length + 1)
+        char_index[:, :, 1] = np.arange(length)
+        char_index[:, :, 2] = char_index[:, :, 0]
+        mistakes = np.repeat(np.cumsum(wrong, axis=1, dtype=np.int32)[:, :, None], 3, axis=2)
+
+        times = np.cumsum(gaps.reshape(count, length * 3), axis=1)
+        self.slots = length * 3
+        self.finish_times = times[:, -1].copy()  # Seconds each bot takes to finish
+        # Unused slots share their time with the slot before them, and searchsorted(side='right')
+        # lands on the last of equal times - the retype slot, whose caret is right either way
+        self.offsets = np.arange(count) * (float(self.finish_times.max(initial=0.0)) + 1.0)
+        self.times = (times + self.offsets[:, None]).ravel()
+        self.char_index = char_index.ravel()
+        self.mistakes = mistakes.ravel()
+        self.row_starts = np.arange(count) * self.slots
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def progress(self, elapsed):
+        """(char index, mistakes) arrays for every bot, elapsed seconds after it started.
+
+        elapsed is one number for all bots or an array with one per bot.
+        """
+        positions = np.searchsorted(self.times, np.asarray(elapsed, dtype=np.float64) + self.offsets, side='right') - 1
+        started = positions >= self.row_starts
+        # Past the end of its own row a bot stays finished instead of reading the next row
+        positions = np.clip(positions, 0, self.row_starts + (self.slots - 1))
+        return (np.where(started, self.char_index[positions], 0),
+                np.where(started, self.mistakes[positions], 0))
+
+    def finished(self, elapsed):
+        """Boolean array: which bots have typed the whole paragraph after elapsed seconds."""
+        return np.asarray(elapsed) >= self.finish_times
+
+    def wpm(self):
+        """Each bot's WPM over its whole round (corrections included)."""
+        characters = self.slots // 3
+        return characters / 5 / (self.finish_times / 60)
@@ -1,39 +1,18 @@
 import pygame
-import sys
 import os
-import math
-try:
-    import imageio
-except ImportError:
-    print("imageio module not found. Please install it with: pip install imageio")
-    sys.exit(1)
 
-# Import TheTypingGame module
-try:
-    import TheTypingGame
-    TYPING_GAME_AVAILABLE = True
-    print("TheTypingGame module loaded successfully")
-except ImportError as e:
-    print(f"Could not load TheTypingGame module: {e}")
-    TYPING_GAME_AVAILABLE = False
-except Exception as e:
-    print(f"Error loading TheTypingGame module: {e}")
-    TYPING_GAME_AVAILABLE = False
+import AssetManager
+import SceneManager
+from TextCache import render_text
 
-# Initialize pygame
-pygame.init()
+# TheTypingGame module, imported when the first round starts (see load_typing_game)
+TheTypingGame = None
 
-# Screen dimensions and display
-# Prefer reusing the existing window created by Pixel Typers
+# Screen dimensions and display - set up by ensure_initialized() on first use,
+# so importing this module is cheap
 SCREEN_WIDTH = 960
 SCREEN_HEIGHT = 540
-existing_screen = pygame.display.get_surface()
-if existing_screen:
-    screen = existing_screen
-    SCREEN_WIDTH, SCREEN_HEIGHT = existing_screen.get_size()
-else:
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Selection!")
+screen = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -43,18 +22,10 @@ BLUE = (0, 120, 255)
 YELLOW = (255, 255, 0)
 BACKGROUND_COLOR = (20, 30, 48)  # Hex #141E30 converted to RGB
 
-# Font setup
+# Font setup (fonts are loaded by ensure_initialized())
 font_path = os.path.join('fonts', 'fs-pixel-sans-unicode-regular.ttf')
-try:
-    title_font = pygame.font.Font(font_path, 48)
-    button_font = pygame.font.Font(font_path, 36)
-except:
-    title_font = pygame.font.SysFont('Arial', 48)
-    button_font = pygame.font.SysFont('Arial', 36)
-
-# Game states
-SELECTION_SCREEN = 0  # Practice/Multiplayer selection
-DIFFICULTY_SCREEN = 1  # Difficulty selection (Easy/Normal/Hard)
+title_font = None
+button_font = None
 
 # Button positioning and sizing (Practice/Multiplayer scaled up 30%)
 BUTTON_WIDTH = 600 # 180 * 1.3 (30% increase)
@@ -74,6 +45,60 @@ DIFFICULTY_START_Y = (SCREEN_HEIGHT - (3 * DIFFICULTY_BUTTON_HEIGHT + 2 * DIFFIC
 BACK_BUTTON_SIZE = 44
 BACK_BUTTON_PADDING = 16
 
+def ensure_initialized():
+    """Set up the display, fonts and screen layout the first time they are needed."""
+    global screen, SCREEN_WIDTH, SCREEN_HEIGHT, title_font, button_font, BUTTON_START_Y, DIFFICULTY_START_Y
+    if screen is not None and pygame.display.get_surface() is screen:
+        return
+    
+    if not pygame.display.get_init():
+        pygame.display.init()
+    # Prefer reusing the existing window created by Pixel Typers
+    existing_screen = pygame.display.get_surface()
+    if existing_screen:
+        screen = existing_screen
+        SCREEN_WIDTH, SCREEN_HEIGHT = existing_screen.get_size()
+    else:
+        # Running on its own - open a window
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Selection!")
+    
+    title_font = AssetManager.get_font(font_path, 48)
+    button_font = AssetManager.get_font(font_path, 36)
+    
+    # Re-center the buttons for the actual window size
+    BUTTON_START_Y = (SCREEN_HEIGHT - (2 * BUTTON_HEIGHT + BUTTON_SPACING)) // 2
+    DIFFICULTY_START_Y = (SCREEN_HEIGHT - (3 * DIFFICULTY_BUTTON_HEIGHT + 2 * DIFFICULTY_BUTTON_SPACING)) // 2
+
+# Images used by the selection screens, for preload_assets()
+BUTTON_IMAGE_PATHS = ('images/Back Button 1.png', 'images/PracticeBTN.png', 'images/MultiplayerBTN.png',
+                      'images/EasyBTN.png', 'images/Normal BTN.png', 'images/Hard BTN.png')
+POPUP_IMAGE_PATH = os.path.join('images', '200.gif')
+
+def preload_assets(loader):
+    """Queue the fonts and images of these screens and the typing game on an AssetManager.BackgroundLoader."""
+    loader.add_font(font_path, (48, 36))
+    for path in BUTTON_IMAGE_PATHS:
+        loader.add_image(path)
+    loader.add_gif(POPUP_IMAGE_PATH)
+    typing_game = load_typing_game()
+    if typing_game is not None:
+        typing_game.preload_assets(loader)
+
+def load_typing_game():
+    """Import the TheTypingGame module on first use. Returns it, or None if it can't be loaded."""
+    global TheTypingGame
+    if TheTypingGame is None:
+        try:
+            import TheTypingGame as typing_game
+            TheTypingGame = typing_game
+            print("TheTypingGame module loaded successfully")
+        except ImportError as e:
+            print(f"Could not load TheTypingGame module: {e}")
+        except Exception as e:
+            print(f"Error loading TheTypingGame module: {e}")
+    return TheTypingGame
+
 # Initialize buttons
 def initialize_buttons():
     """Initialize all buttons including back button, PracticeBTN and MultiplayerBTN."""
@@ -219,32 +244,12 @@ class InteractiveButton:
     def load_images(self, base_image_path):
         """Load button images for different states."""
         try:
-            # Load normal state image
-            if os.path.exists(base_image_path):
-                original_image = pygame.image.load(base_image_path).convert_alpha()
-                # Scale to fit the button dimensions while maintaining aspect ratio
-                self.normal_image = self.scale_image_keep_aspect(original_image, self.rect.width, self.rect.height)
+            # Normal, hover (brightened) and pressed (darkened) images, scaled to fit
+            # the button - loaded once and shared by every button using this file
+            images = AssetManager.get_button_images(base_image_path, self.rect.width, self.rect.height)
+            if images:
+                self.normal_image, self.hover_image, self.pressed_image = images
                 self.current_image = self.normal_image
-                print(f"Loaded {self.button_name} button image successfully")
-                
-                # For actual button images, we'll use the same image for all states
-                # but apply visual effects for hover and pressed states
-                self.hover_image = self.normal_image.copy()
-                self.pressed_image = self.normal_image.copy()
-                
-                # Apply subtle effects for different states
-                if self.hover_image:
-                    # Slightly brighten hover image
-                    brighten = pygame.Surface(self.hover_image.get_size(), pygame.SRCALPHA)
-                    brighten.fill((50, 50, 50, 50))  # Semi-transparent white
-                    self.hover_image.blit(brighten, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
-                
-                if self.pressed_image:
-                    # Slightly darken pressed image
-                    darken = pygame.Surface(self.pressed_image.get_size(), pygame.SRCALPHA)
-                    darken.fill((0, 0, 0, 50))  # Semi-transparent black
-                    self.pressed_image.blit(darken, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
-                
             else:
                 print(f"Warning: {base_image_path} not found, using fallback rectangle")
                 self.create_fallback_images()
@@ -255,24 +260,7 @@ class InteractiveButton:
     
     def scale_image_keep_aspect(self, image, target_width, target_height):
         """Scale image while maintaining aspect ratio."""
-        original_width, original_height = image.get_size()
-        aspect_ratio = original_width / original_height
-        
-        # Calculate scaling to fit target dimensions
-        if aspect_ratio > 1:  # Wider than tall
-            new_width = target_width
-            new_height = int(target_width / aspect_ratio)
-            if new_height > target_height:
-                new_height = target_height
-                new_width = int(target_height * aspect_ratio)
-        else:  # Taller than wide or square
-            new_height = target_height
-            new_width = int(target_height * aspect_ratio)
-            if new_width > target_width:
-                new_width = target_width
-                new_height = int(target_width / aspect_ratio)
-        
-        return pygame.transform.scale(image, (new_width, new_height))
+        return AssetManager.scale_keep_aspect(image, target_width, target_height)
     
     def create_fallback_images(self):
         """Create fallback rectangle images if image files are not available."""
@@ -381,11 +369,11 @@ class InteractiveButton:
         # Do not render text for buttons that have images (BackButton, difficulty buttons, etc.)
         buttons_with_images = ["BackButton", "EasyBTN", "NormalBTN", "HardBTN", "PracticeBTN", "MultiplayerBTN"]
         image_path = os.path.join('images', f'{self.button_name}.png')
-        if self.normal_image and not os.path.exists(image_path):
+        if self.normal_image and not AssetManager.asset_exists(image_path):
             # Do not render fallback text for buttons that should only show images
             if self.button_name not in buttons_with_images:
                 text_color = WHITE if self.enabled else GRAY
-                text_surface = button_font.render(self.button_name.replace('BTN', ''), True, text_color)
+                text_surface = render_text(button_font, self.button_name.replace('BTN', ''), text_color)
                 text_rect = text_surface.get_rect(center=self.rect.center)
                 screen_surface.blit(text_surface, text_rect)
     
@@ -411,6 +399,7 @@ class PopupModal:
         self.frame_delay = 100  # milliseconds between frames
         self.button_rect = None
         self.button_hovered = False
+        self.message_lines = None  # Wrapped on first draw
         
         # Load image (GIF or static image)
         self.load_image(image_path)
@@ -429,54 +418,41 @@ class PopupModal:
         self.button_rect = pygame.Rect(self.button_x, self.button_y, self.button_width, self.button_height)
     
     def load_image(self, image_path):
-        """Load image from path (supports static images and GIFs)."""
+        """Load image from path (supports static images and GIFs) through the asset manager."""
         try:
-            if os.path.exists(image_path):
-                # Check if it's a GIF
-                if image_path.lower().endswith('.gif'):
-                    self.load_gif(image_path)
-                else:
-                    # Load static image
-                    self.image = pygame.image.load(image_path).convert_alpha()
-                    self.scale_image()
-                    print(f"Loaded popup image: {image_path}")
+            # Check if it's a GIF
+            if image_path.lower().endswith('.gif'):
+                self.load_gif(image_path)
             else:
-                print(f"Warning: Popup image not found: {image_path}")
+                # Load static image
+                self.image = AssetManager.get_image(image_path)
+                if self.image:
+                    self.scale_image(image_path)
+                else:
+                    print(f"Warning: Popup image not found: {image_path}")
         except Exception as e:
             print(f"Error loading popup image: {e}")
     
     def load_gif(self, gif_path):
-        """Load GIF frames using imageio."""
-        try:
-            reader = imageio.get_reader(gif_path)
-            for frame in reader:
-                # Convert frame to pygame surface
-                frame_surface = pygame.image.fromstring(frame.tobytes(), frame.shape[1::-1], 'RGB').convert_alpha()
-                self.image_frames.append(frame_surface)
-            reader.close()
-            
-            if self.image_frames:
-                self.image = self.image_frames[0]
-                self.scale_image()
-                print(f"Loaded GIF: {gif_path} with {len(self.image_frames)} frames")
-            else:
-                print(f"Error: No frames loaded from GIF: {gif_path}")
-        except Exception as e:
-            print(f"Error loading GIF: {e}")
+        """Load GIF frames (decoded once per process)."""
+        self.image_frames = AssetManager.get_gif_frames(gif_path)
+        if self.image_frames:
+            self.image = self.image_frames[0]
+            self.scale_image(gif_path)
+        else:
+            print(f"Error: No frames loaded from GIF: {gif_path}")
     
-    def scale_image(self):
+    def scale_image(self, image_path):
         """Scale image to fit in modal (max 120x120)."""
         if self.image:
             max_size = 120
             if self.image.get_width() > max_size or self.image.get_height() > max_size:
-                self.image = pygame.transform.scale(self.image, (max_size, max_size))
-            
-            # Also scale all GIF frames
-            if self.image_frames:
-                self.image_frames = [
-                    pygame.transform.scale(frame, (max_size, max_size)) if frame.get_width() > max_size or frame.get_height() > max_size else frame
-                    for frame in self.image_frames
-                ]
+                # The asset manager keeps the scaled copies too
+                if self.image_frames:
+                    self.image_frames = AssetManager.get_gif_frames(image_path, (max_size, max_size))
+                    self.image = self.image_frames[0]
+                else:
+                    self.image = AssetManager.get_image(image_path, (max_size, max_size))
     
     def update_gif_frame(self):
         """Update GIF animation frame."""
@@ -512,10 +488,8 @@ class PopupModal:
         # Update GIF frame if animated
         self.update_gif_frame()
         
-        # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Semi-transparent black
-        screen_surface.blit(overlay, (0, 0))
+        # Draw semi-transparent overlay (semi-transparent black, reused every frame)
+        screen_surface.blit(AssetManager.get_filled_surface((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 180)), (0, 0))
         
         # Draw modal background
         modal_rect = pygame.Rect(self.modal_x, self.modal_y, self.modal_width, self.modal_height)
@@ -523,7 +497,7 @@ class PopupModal:
         pygame.draw.rect(screen_surface, BLUE, modal_rect, width=3, border_radius=10)
         
         # Draw title
-        title_surface = title_font.render(self.title, True, WHITE)
+        title_surface = render_text(title_font, self.title, WHITE)
         title_rect = title_surface.get_rect(center=(self.modal_x + self.modal_width // 2, self.modal_y + 30))
         screen_surface.blit(title_surface, title_rect)
         
@@ -534,10 +508,11 @@ class PopupModal:
             screen_surface.blit(self.image, (image_x, image_y))
         
         # Draw message text (wrapped)
-        message_lines = self.wrap_text_for_modal(self.message, 450)
+        if self.message_lines is None:
+            self.message_lines = self.wrap_text_for_modal(self.message, 450)
         line_y = self.modal_y + 180
-        for line in message_lines:
-            line_surface = button_font.render(line, True, WHITE)
+        for line in self.message_lines:
+            line_surface = render_text(button_font, line, WHITE)
             line_rect = line_surface.get_rect(center=(self.modal_x + self.modal_width // 2, line_y))
             screen_surface.blit(line_surface, line_rect)
             line_y += 35
@@ -548,7 +523,7 @@ class PopupModal:
         pygame.draw.rect(screen_surface, (0, 100, 200), self.button_rect, width=2, border_radius=5)
         
         # Draw button text
-        button_text_surface = button_font.render(self.button_text, True, WHITE)
+        button_text_surface = render_text(button_font, self.button_text, WHITE)
         button_text_rect = button_text_surface.get_rect(center=self.button_rect.center)
         screen_surface.blit(button_text_surface, button_text_rect)
     
@@ -560,8 +535,7 @@ class PopupModal:
         
         for word in words:
             test_line = ' '.join(current_line + [word])
-            test_surface = button_font.render(test_line, True, WHITE)
-            if test_surface.get_width() <= max_width:
+            if button_font.size(test_line)[0] <= max_width:
                 current_line.append(word)
             else:
                 if current_line:
@@ -583,106 +557,138 @@ class PopupModal:
         """Hide the modal."""
         self.is_active = False
 
-def main():
-    """Main function for the Gameplay module."""
-    print("Gameplay.py main() function called")
-    
-    clock = pygame.time.Clock()
-    running = True
-    
-    # Initialize with selection screen
-    current_state = SELECTION_SCREEN
-    buttons = initialize_buttons()
-    
-    # Initialize popup modal
-    popup = PopupModal(
-        "Sorry!",
-        "Multiplayer Feature has not yet been added it is to be added in Future Updates.",
-        os.path.join('images', '200.gif'),
-        "I Understand!"
-    )
+class SelectionScene(SceneManager.Scene):
+    """Practice/Multiplayer selection. Pops with "BACK_TO_MAIN" when the player goes back."""
+    def enter(self):
+        print("Gameplay selection screen opened")
+        ensure_initialized()
+        self.buttons = initialize_buttons()
+        
+        # Initialize popup modal
+        self.popup = PopupModal(
+            "Sorry!",
+            "Multiplayer could not be started. Check the console for details.",
+            POPUP_IMAGE_PATH,
+            "I Understand!"
+        )
+        
+        print(f"Initialized {len(self.buttons)} buttons: {[btn.button_name for btn in self.buttons]}")
     
-    print(f"Initialized {len(buttons)} buttons: {[btn.button_name for btn in buttons]}")
+    def resume(self, result):
+        # Back from the difficulty screen - fresh buttons (no stuck hover/pressed state)
+        self.buttons = initialize_buttons()
     
-    # Simple game loop for demonstration
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            # Handle popup events first
-            if popup.handle_event(event):
-                print("Popup closed")
-            
-            # Keyboard shortcut to go back (only if popup is not active)
-            if event.type == pygame.KEYDOWN:
-                if event.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
-                    if popup.is_active:
-                        popup.hide()
-                    elif current_state == DIFFICULTY_SCREEN:
-                        print("Keyboard back pressed - returning to selection screen")
-                        current_state = SELECTION_SCREEN
-                        buttons = initialize_buttons()
-                    else:
-                        print("Keyboard back pressed - returning to Pixel Typers main menu")
-                        return "BACK_TO_MAIN"
-            
-            # Handle button events (only if popup is not active)
-            if not popup.is_active:
-                for button in buttons:
-                    if button.handle_event(event):
-                        print(f"Button clicked: {button.button_name}")
-                        
-                        if button.button_name == "BackButton":
-                            if current_state == DIFFICULTY_SCREEN:
-                                print("Back button clicked - returning to selection screen")
-                                current_state = SELECTION_SCREEN
-                                buttons = initialize_buttons()
-                            else:
-                                print("Back button clicked - returning to Pixel Typers main menu")
-                                return "BACK_TO_MAIN"
-                        
-                        elif button.button_name == "PracticeBTN":
-                            print("Practice button clicked - showing difficulty selection")
-                            current_state = DIFFICULTY_SCREEN
-                            buttons = initialize_difficulty_buttons()
-                        
-                        elif button.button_name == "MultiplayerBTN":
-                            print("Multiplayer button clicked - showing popup")
-                            popup.show()
-                        
-                        elif button.button_name in ["EasyBTN", "NormalBTN", "HardBTN"]:
-                            difficulty = button.button_name.replace("BTN", "")
-                            print(f"Difficulty button clicked: {difficulty}")
-                            
-                            if TYPING_GAME_AVAILABLE:
-                                print(f"Launching typing game with difficulty: {difficulty}")
-                                result = TheTypingGame.main(difficulty)
-                                
-                                if result == "BACK_TO_DIFFICULTY":
-                                    print("Returned from typing game to difficulty selection")
-                                    current_state = DIFFICULTY_SCREEN
-                                    buttons = initialize_difficulty_buttons()
-                                else:
-                                    current_state = DIFFICULTY_SCREEN
-                                    buttons = initialize_difficulty_buttons()
+    def handle_event(self, event):
+        popup = self.popup
+        
+        # Handle popup events first
+        if popup.handle_event(event):
+            print("Popup closed")
+        
+        # Keyboard shortcut to go back (only if popup is not active)
+        if event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
+                if popup.is_active:
+                    popup.hide()
+                else:
+                    print("Keyboard back pressed - returning to Pixel Typers main menu")
+                    self.manager.pop("BACK_TO_MAIN")
+                    return
         
+        # Handle button events (only if popup is not active)
+        if not popup.is_active:
+            for button in self.buttons:
+                if button.handle_event(event):
+                    print(f"Button clicked: {button.button_name}")
+                    
+                    if button.button_name == "BackButton":
+                        print("Back button clicked - returning to Pixel Typers main menu")
+                        self.manager.pop("BACK_TO_MAIN")
+                        return
+                    
+                    elif button.button_name == "PracticeBTN":
+                        print("Practice button clicked - showing difficulty selection")
+                        self.manager.push(DifficultyScene())
+                        return
+                    
+                    elif button.button_name == "MultiplayerBTN":
+                        if load_typing_game() is not None and TheTypingGame.load_race_modules():
+                            print("Multiplayer button clicked - showing difficulty selection for a race")
+                            self.manager.push(DifficultyScene(race=True))
+                            return
+                        popup.show()
+    
+    def draw(self, screen):
         # Clear screen with custom background color
         screen.fill(BACKGROUND_COLOR)
         
-        # Draw buttons based on current state
-        for button in buttons:
+        # Draw buttons
+        for button in self.buttons:
             button.draw(screen)
         
         # Draw popup if active
-        popup.draw(screen)
+        self.popup.draw(screen)
+
+class DifficultyScene(SceneManager.Scene):
+    """Easy/Normal/Hard selection - starts a typing round (a LAN race with race=True), pops back to the selection screen."""
+    def __init__(self, race=False):
+        self.race = race
+    
+    def enter(self):
+        ensure_initialized()
+        self.buttons = initialize_difficulty_buttons()
+    
+    def resume(self, result):
+        if result == "BACK_TO_DIFFICULTY":
+            print("Returned from typing game to difficulty selection")
+        self.buttons = initialize_difficulty_buttons()
+    
+    def handle_event(self, event):
+        # Keyboard shortcut to go back
+        if event.type == pygame.KEYDOWN:
+            if event.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
+                print("Keyboard back pressed - returning to selection screen")
+                self.manager.pop()
+                return
         
-        # Update display
-        pygame.display.flip()
-        clock.tick(60)
+        for button in self.buttons:
+            if button.handle_event(event):
+                print(f"Button clicked: {button.button_name}")
+                
+                if button.button_name == "BackButton":
+                    print("Back button clicked - returning to selection screen")
+                    self.manager.pop()
+                    return
+                
+                elif button.button_name in ["EasyBTN", "NormalBTN", "HardBTN"]:
+                    difficulty = button.button_name.replace("BTN", "")
+                    print(f"Difficulty button clicked: {difficulty}")
+                    
+                    if load_typing_game() is not None:
+                        if self.race:
+                            print(f"Joining a race with difficulty: {difficulty}")
+                            self.manager.push(TheTypingGame.RaceScene(difficulty))
+                        else:
+                            print(f"Launching typing game with difficulty: {difficulty}")
+                            self.manager.push(TheTypingGame.TypingScene(difficulty))
+                        return
+    
+    def draw(self, screen):
+        screen.fill(BACKGROUND_COLOR)
+        for button in self.buttons:
+            button.draw(screen)
+
+def main():
+    """Run the selection screens on their own until the player goes back.
     
+    Returns "BACK_TO_MAIN" when the player goes back, or None if the window
+    was closed.
+    """
+    print("Gameplay.py main() function called")
+    ensure_initialized()
+    result = SceneManager.run_scene(SelectionScene(), screen)
     print("Gameplay.py main() function completed")
-    return None  # Return None if no specific action was taken
+    return result
 
 # Entry point for the gameplay module
 def run_gameplay():
@@ -697,6 +703,7 @@ def run_gameplay():
 def test_buttons():
     """Test function to verify button functionality."""
     print("Testing button functionality...")
+    ensure_initialized()
     
     # Test button creation
     buttons = initialize_buttons()
@@ -0,0 +1,500 @@
+# LAN race mode: an asyncio race server, its client, and a load harness
+#
+# Every player keeps one TCP connection to the server and talks in small
+# binary frames: a 3-byte header (message type, payload length) and the
+# payload. While racing, players only send PROGRESS frames - their character
+# index, mistake count and milliseconds since the start, 11 bytes - and the
+# server relays each one to the rest of the room the moment it arrives.
+#
+# Run a server for the LAN:   python Multiplayer.py serve [host] [port]
+# Load test it:               python Multiplayer.py load [rooms] [players per room] [seconds]
+#
+# This module does not use pygame; the race screen is TheTypingGame.RaceScene.
+import asyncio
+import getpass
+import os
+import struct
+import subprocess
+import sys
+import time
+from array import array
+
+# Where the game looks for a race server. Set RACE_SERVER_HOST to the LAN
+# address of the machine running "python Multiplayer.py serve"; if nothing is
+# listening on this machine the game hosts the race itself.
+RACE_SERVER_HOST = '127.0.0.1'
+RACE_SERVER_PORT = 50505
+
+# Let other machines on the LAN join a race the game hosts itself. Off, the
+# hosted server only listens on 127.0.0.1.
+RACE_HOST_ON_LAN = False
+
+MAX_PLAYERS_PER_ROOM = 8
+MIN_PLAYERS_TO_START = 2  # Fewer only start with MSG_START_ANYWAY
+START_COUNTDOWN_MS = 3000  # From everyone being ready to the start
+
+# Frame header: message type, payload length
+FRAME_HEADER = struct.Struct('<BH')
+MAX_PAYLOAD = 1024
+
+# Message types
+MSG_JOIN = 1  # client -> server: "room\nname\ndifficulty" (UTF-8)
+MSG_WELCOME = 2  # server -> client: PLAYER (your id) + "room\ndifficulty"
+MSG_PLAYER_JOINED = 3  # server -> room: PLAYER + name
+MSG_PLAYER_LEFT = 4  # server -> room: PLAYER
+MSG_READY = 5  # client -> server: ready to start (no payload)
+MSG_START = 6  # server -> room: START
+MSG_PROGRESS = 7  # client -> server -> room: PROGRESS (clients send player id 0)
+MSG_STATS = 8  # client -> server (no payload), server -> client: STATS
+MSG_START_ANYWAY = 9  # client -> server: ready, and start even with fewer than MIN_PLAYERS_TO_START (no payload)
+
+PLAYER = struct.Struct('<H')
+START = struct.Struct('<I')  # Milliseconds until the race starts
+PROGRESS = struct.Struct('<HBHHI')  # player id, flags, char index, mistakes, milliseconds since the start
+STATS = struct.Struct('<dQQII')  # server CPU seconds, frames in, frames out, rooms, players
+
+# PROGRESS flags
+FLAG_FINISHED = 1
+
+def default_player_name():
+    """The name shown to other players (the login name)."""
+    try:
+        return getpass.getuser()[:16]
+    except Exception:
+        return "Player"
+
+class FrameProtocol(asyncio.Protocol):
+    """Splits a TCP stream into (message type, payload) frames."""
+    def __init__(self):
+        self.transport = None
+        self.buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        while len(buffer) - offset >= FRAME_HEADER.size:
+            message_type, length = FRAME_HEADER.unpack_from(buffer, offset)
+            if length > MAX_PAYLOAD:
+                print(f"Dropping connection: {length} byte frame")
+                self.transport.close()
+                return
+            end = offset + FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            self.frame_received(message_type, bytes(buffer[offset + FRAME_HEADER.size:end]))
+            offset = end
+        del buffer[:offset]
+
+    def frame_received(self, message_type, payload):
+        """Handle one frame (override)."""
+
+    def send(self, message_type, payload=b''):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.write(FRAME_HEADER.pack(message_type, len(payload)) + payload)
+
+class Room:
+    """Players racing the same paragraph."""
+    def __init__(self, name, difficulty):
+        self.name = name
+        self.difficulty = difficulty
+        self.players = {}  # player id -> RaceServerProtocol
+        self.started = False
+
+class RaceServerProtocol(FrameProtocol):
+    """One player's connection to the server."""
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+        self.player_id = server.new_player_id()
+        self.name = ""
+        self.room = None
+        self.ready = False
+
+    def frame_received(self, message_type, payload):
+        self.server.frame_received(self, message_type, payload)
+
+    def connection_lost(self, exc):
+        self.server.leave(self)
+
+class RaceServer:
+    """Matches players into rooms, starts races and relays progress."""
+    def __init__(self, max_players=MAX_PLAYERS_PER_ROOM, countdown_ms=START_COUNTDOWN_MS, min_players=MIN_PLAYERS_TO_START):
+        self.max_players = max_players
+        self.min_players = min_players
+        self.countdown_ms = countdown_ms
+        self.open_rooms = {}  # room name -> Room still taking players
+        self.rooms = set()
+        self.players = 0
+        self.last_player_id = 0
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def protocol(self):
+        """Protocol factory for loop.create_server()."""
+        return RaceServerProtocol(self)
+
+    def new_player_id(self):
+        self.last_player_id = self.last_player_id % 0xFFFF + 1
+        return self.last_player_id
+
+    def frame_received(self, player, message_type, payload):
+        self.frames_in += 1
+        if message_type == MSG_PROGRESS:
+            self.relay_progress(player, payload)
+        elif message_type == MSG_JOIN:
+            self.join(player, payload)
+        elif message_type == MSG_READY:
+            self.set_ready(player)
+        elif message_type == MSG_START_ANYWAY:
+            self.set_ready(player, start_anyway=True)
+        elif message_type == MSG_STATS:
+            self.send(player, MSG_STATS, STATS.pack(time.process_time(), self.frames_in, self.frames_out, len(self.rooms), self.players))
+
+    def send(self, player, message_type, payload=b''):
+        player.send(message_type, payload)
+        self.frames_out += 1
+
+    def broadcast(self, room, message_type, payload, skip=None):
+        for other in room.players.values():
+            if other is not skip:
+                self.send(other, message_type, payload)
+
+    def join(self, player, payload):
+        if player.room is not None:
+            return
+        try:
+            room_name, name, difficulty = payload.decode('utf-8').split('\n')
+        except ValueError:
+            return
+        room = self.open_rooms.get(room_name)
+        if room is None:
+            room = Room(room_name, difficulty or "Normal")
+            self.open_rooms[room_name] = room
+            self.rooms.add(room)
+        player.name = name[:16]
+        player.room = room
+        room.players[player.player_id] = player
+        self.players += 1
+        if len(room.players) >= self.max_players:
+            # Full - the next player with this room name gets a new room
+            del self.open_rooms[room_name]
+
+        self.send(player, MSG_WELCOME, PLAYER.pack(player.player_id) + f"{room.name}\n{room.difficulty}".encode('utf-8'))
+        joined = PLAYER.pack(player.player_id) + player.name.encode('utf-8')
+        for other in room.players.values():
+            if other is not player:
+                self.send(player, MSG_PLAYER_JOINED, PLAYER.pack(other.player_id) + other.name.encode('utf-8'))
+                self.send(other, MSG_PLAYER_JOINED, joined)
+
+    def set_ready(self, player, start_anyway=False):
+        room = player.room
+        if room is None or room.started:
+            return
+        player.ready = True
+        self.start_if_ready(room, start_anyway)
+
+    def start_if_ready(self, room, start_anyway=False):
+        """Start the countdown once everyone in room is ready and there are enough of them."""
+        if len(room.players) < self.min_players and not start_anyway:
+            return
+        if all(other.ready for other in room.players.values()):
+            room.started = True
+            if self.open_rooms.get(room.name) is room:
+                del self.open_rooms[room.name]
+            self.broadcast(room, MSG_START, START.pack(self.countdown_ms))
+
+    def relay_progress(self, player, payload):
+        room = player.room
+        if room is None or len(payload) != PROGRESS.size:
+            return
+        # Stamp the sender's id over the 0 the client sent
+        payload = PLAYER.pack(player.player_id) + payload[PLAYER.size:]
+        self.broadcast(room, MSG_PROGRESS, payload, skip=player)
+
+    def leave(self, player):
+        room = player.room
+        if room is None:
+            return
+        player.room = None
+        del room.players[player.player_id]
+        self.players -= 1
+        if room.players:
+            self.broadcast(room, MSG_PLAYER_LEFT, PLAYER.pack(player.player_id))
+            # Everyone left may now be ready
+            if not room.started:
+                self.start_if_ready(room)
+        else:
+            self.rooms.discard(room)
+            if self.open_rooms.get(room.name) is room:
+                del self.open_rooms[room.name]
+
+    async def start(self, host=RACE_SERVER_HOST, port=RACE_SERVER_PORT):
+        """Start listening on the running loop and return the asyncio server."""
+        loop = asyncio.get_running_loop()
+        return await loop.create_server(self.protocol, host, port)
+
+class RaceClient(FrameProtocol):
+    """The client side of a race: sends our progress and collects everyone else's.
+
+    With a NetworkPump, received frames are applied on the render loop (in
+    pump.drain()) and sends go through the pump, so the game reads and
+    writes the client from its own thread only.
+    """
+    def __init__(self, pump=None):
+        super().__init__()
+        self.pump = pump
+        self.player_id = None
+        self.room_name = None
+        self.difficulty = None
+        self.players = {}  # player id -> name (not including us)
+        self.progress = {}  # player id -> (char index, mistakes, milliseconds since the start, finished)
+        self.start_time = None  # perf_counter() time the race starts
+        self.last_sent = None
+        self.connected = False
+        self.stats = None  # Last STATS reply
+
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        self.connected = True
+
+    def connection_lost(self, exc):
+        self.connected = False
+
+    def send(self, message_type, payload=b''):
+        if self.pump is not None:
+            self.pump.call(FrameProtocol.send, self, message_type, payload)
+        else:
+            super().send(message_type, payload)
+
+    def join(self, room_name, name, difficulty):
+        self.send(MSG_JOIN, f"{room_name}\n{name}\n{difficulty}".encode('utf-8'))
+
+    def ready(self):
+        self.send(MSG_READY)
+
+    def start_anyway(self):
+        """Ready up and start without waiting for MIN_PLAYERS_TO_START players."""
+        self.send(MSG_START_ANYWAY)
+
+    def request_stats(self):
+        self.send(MSG_STATS)
+
+    @property
+    def started(self):
+        return self.start_time is not None and time.perf_counter() >= self.start_time
+
+    def send_progress(self, char_index, mistakes, elapsed_ms, finished=False):
+        """Send our progress if it changed since the last call. Returns whether anything was sent."""
+        progress = (char_index, mistakes, finished)
+        if progress == self.last_sent:
+            return False
+        self.last_sent = progress
+        self.send(MSG_PROGRESS, PROGRESS.pack(0, FLAG_FINISHED if finished else 0, char_index, mistakes, int(elapsed_ms)))
+        return True
+
+    def frame_received(self, message_type, payload):
+        if self.pump is not None:
+            self.pump.post(self.apply_frame, message_type, payload)
+        else:
+            self.apply_frame(message_type, payload)
+
+    def apply_frame(self, message_type, payload):
+        """Update the race state from one frame the server sent."""
+        if message_type == MSG_PROGRESS:
+            player_id, flags, char_index, mistakes, elapsed_ms = PROGRESS.unpack(payload)
+            self.progress[player_id] = (char_index, mistakes, elapsed_ms, bool(flags & FLAG_FINISHED))
+            self.progress_received(player_id, char_index, mistakes, elapsed_ms)
+        elif message_type == MSG_PLAYER_JOINED:
+            player_id, = PLAYER.unpack_from(payload)
+            self.players[player_id] = payload[PLAYER.size:].decode('utf-8', 'replace')
+        elif message_type == MSG_PLAYER_LEFT:
+            player_id, = PLAYER.unpack_from(payload)
+            self.players.pop(player_id, None)
+            self.progress.pop(player_id, None)
+        elif message_type == MSG_WELCOME:
+            self.player_id, = PLAYER.unpack_from(payload)
+            self.room_name, self.difficulty = payload[PLAYER.size:].decode('utf-8').split('\n')
+        elif message_type == MSG_START:
+            countdown_ms, = START.unpack(payload)
+            self.start_time = time.perf_counter() + countdown_ms / 1000
+        elif message_type == MSG_STATS:
+            self.stats = STATS.unpack(payload)
+
+    def progress_received(self, player_id, char_index, mistakes, elapsed_ms):
+        """Called for every progress update from another player (override)."""
+
+    def close(self):
+        if self.transport is None:
+            return
+        if self.pump is not None:
+            self.pump.call(self.transport.close)
+        else:
+            self.transport.close()
+
+async def connect(host=RACE_SERVER_HOST, port=RACE_SERVER_PORT, client_class=RaceClient, pump=None):
+    """Connect to a race server and return the client."""
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_connection(lambda: client_class(pump), host, port)
+    return client
+
+async def connect_or_host(host=RACE_SERVER_HOST, port=RACE_SERVER_PORT, timeout=1.0, pump=None, lan=None):
+    """Connect to the race server, or host one on this machine if none is running here.
+
+    A hosted server only accepts connections from this machine unless lan
+    (RACE_HOST_ON_LAN unless given) is set.
+
+    Returns (client, server) - server is the asyncio server we started, or None.
+    """
+    try:
+        return await asyncio.wait_for(connect(host, port, pump=pump), timeout), None
+    except (ConnectionRefusedError, OSError):
+        if host not in ('127.0.0.1', 'localhost'):
+            raise
+    if lan is None:
+        lan = RACE_HOST_ON_LAN
+    # Every interface when other players on the LAN should be able to join
+    bind_host = '0.0.0.0' if lan else '127.0.0.1'
+    print(f"No race server on {host}:{port} - hosting one on {bind_host}")
+    server = await RaceServer().start(bind_host, port)
+    return await connect(host, port, pump=pump), server
+
+async def serve(host, port):
+    server = RaceServer()
+    listener = await server.start(host, port)
+    print(f"Race server listening on {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+class LoadClient(RaceClient):
+    """Simulated player for the load test - records how long relayed progress took to arrive."""
+    sent_at = {}  # (player id, char index) -> perf_counter() time it was sent
+    latencies = array('d')  # Milliseconds from send to arrival at another player
+
+    def progress_received(self, player_id, char_index, mistakes, elapsed_ms):
+        sent = self.sent_at.get((player_id, char_index))
+        if sent is not None:
+            self.latencies.append((time.perf_counter() - sent) * 1000)
+
+# What the load test's bots type
+LOAD_TEST_PARAGRAPH = ("Pixelated games are cool because they bring a mix of nostalgia and creativity their simple "
+                       "blocky art style reminds players of old classic games while still feeling fresh and fun today "
+                       "they show that even without realistic graphics games can be full of life emotion and beauty")
+
+async def drive_bots(clients, seconds, wpm=55, rate=60):
+    """Type for every client from one batch of bot schedules (see Bots.py) until seconds have passed.
+
+    Each tick (rate a second, like a game frame) places every bot with one
+    lookup and sends progress for the clients whose bot moved. Returns
+    (started, ended): the perf_counter() times of the window in which every
+    bot was racing.
+    """
+    import Bots  # NumPy is only needed for load tests, not by the server
+    pack = Bots.BotPack(LOAD_TEST_PARAGRAPH, Bots.random_profiles(len(clients), wpm))
+    while not all(client.started for client in clients):
+        await asyncio.sleep(0.01)
+    start_times = [client.start_time for client in clients]
+    last_chars, last_mistakes = pack.progress(0.0)
+    racing_from = max(start_times)
+    ends_at = racing_from + seconds
+    while time.perf_counter() < ends_at:
+        await asyncio.sleep(1.0 / rate)
+        now = time.perf_counter()
+        elapsed = [now - start_time for start_time in start_times]
+        chars, mistakes = pack.progress(elapsed)
+        finished = pack.finished(elapsed)
+        for i in ((chars != last_chars) | (mistakes != last_mistakes)).nonzero()[0].tolist():
+            client = clients[i]
+            LoadClient.sent_at[(client.player_id, int(chars[i]))] = time.perf_counter()
+            client.send_progress(int(chars[i]), int(mistakes[i]), elapsed[i] * 1000, bool(finished[i]))
+        last_chars, last_mistakes = chars, mistakes
+    return racing_from, time.perf_counter()
+
+async def stats_snapshot(client):
+    client.stats = None
+    client.request_stats()
+    while client.stats is None:
+        await asyncio.sleep(0.01)
+    return client.stats
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * percent // 100) - 1)]
+
+async def run_load_test(rooms=200, players_per_room=4, seconds=10.0, host='127.0.0.1', port=RACE_SERVER_PORT + 1):
+    """Race rooms x players_per_room bots against a server in a separate process."""
+    server_process = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', host, str(port)])
+    try:
+        # Wait for the server to come up
+        for _ in range(100):
+            try:
+                monitor = await connect(host, port)
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        else:
+            print("Race server did not start")
+            return
+
+        print(f"Connecting {rooms * players_per_room} players in {rooms} rooms...")
+        clients = []
+        for room in range(rooms):
+            for player in range(players_per_room):
+                client = await connect(host, port, LoadClient)
+                client.join(f"load-{room}", f"bot{player}", "Normal")
+                clients.append(client)
+        while any(client.player_id is None for client in clients):
+            await asyncio.sleep(0.01)
+        for client in clients:
+            if players_per_room < MIN_PLAYERS_TO_START:
+                client.start_anyway()
+            else:
+                client.ready()
+        # Measure the race, not the countdown before it
+        while not all(client.started for client in clients):
+            await asyncio.sleep(0.01)
+
+        before = await stats_snapshot(monitor)
+        racing_from, racing_until = await drive_bots(clients, seconds)
+        after = await stats_snapshot(monitor)
+        wall = racing_until - racing_from
+        await asyncio.sleep(0.2)  # Let the last updates arrive before reading the latencies
+
+        cpu = after[0] - before[0]
+        frames_in = after[1] - before[1]
+        frames_out = after[2] - before[2]
+        latencies = LoadClient.latencies
+        print(f"{after[3]} rooms, {after[4]} players for {wall:.1f} s")
+        print(f"Server: {frames_in / wall:,.0f} frames/s in, {frames_out / wall:,.0f} frames/s out, "
+              f"CPU {cpu / wall * 100:.0f}% of one core")
+        print(f"Relay latency: p50 {percentile(latencies, 50):.2f} ms, p95 {percentile(latencies, 95):.2f} ms, "
+              f"p99 {percentile(latencies, 99):.2f} ms ({len(latencies)} updates)")
+        for client in clients:
+            client.close()
+        monitor.close()
+    finally:
+        server_process.terminate()
+        server_process.wait()
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "serve":
+        host = sys.argv[2] if len(sys.argv) > 2 else '0.0.0.0'
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else RACE_SERVER_PORT
+        try:
+            asyncio.run(serve(host, port))
+        except KeyboardInterrupt:
+            pass
+    elif command == "load":
+        rooms = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        players_per_room = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+        seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 10.0
+        asyncio.run(run_load_test(rooms, players_per_room, seconds))
+    else:
+        print("Usage: python Multiplayer.py serve [host] [port]")
+        print("       python Multiplayer.py load [rooms] [players per room] [seconds]")
@@ -0,0 +1,223 @@
+# Network I/O off the render thread
+#
+# A NetworkPump runs an asyncio event loop on a background thread. The render
+# loop and the network thread never share anything but two deques (appending
+# and popping at opposite ends of a deque is atomic, so neither side takes a
+# lock):
+#   outbox - work for the network thread, queued with call() (e.g. writes)
+#   inbox  - work for the render loop, queued with post() (e.g. received
+#            messages), run by drain() once per frame for at most budget_ms
+#
+# Run this file for a self-check against a local echo server:
+#   python NetworkPump.py [seconds]
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Longest the render loop spends running posted work per frame; the rest waits for the next frame
+DRAIN_BUDGET_MS = 2.0
+
+class NetworkPump:
+    """An asyncio loop on a background thread, with queues to and from the render loop."""
+    def __init__(self, name="Network pump"):
+        self.name = name
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.outbox = deque()  # (function, args) to run on the network thread
+        self.inbox = deque()  # (function, args) to run on the render loop
+        self.flush_scheduled = False
+
+        # Metrics
+        self.outbox_peak = 0
+        self.inbox_peak = 0
+        self.posted = 0
+        self.drained = 0
+        self.frames_over_budget = 0  # Frames that left work in the inbox for later
+        self.drain_times = deque(maxlen=600)  # Milliseconds spent in drain() per frame
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        """The network thread: run the loop until stop(), then tidy up."""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        try:
+            # Let connections closed just before stop() finish closing and cancel whatever is left
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, asyncio.sleep(0), return_exceptions=True))
+        finally:
+            self.loop.close()
+
+    def stop(self, timeout=1.0):
+        """Stop the network thread once the work already queued has run."""
+        if self.thread.is_alive():
+            self.call(self.loop.stop)
+            self.thread.join(timeout)
+
+    # Render loop -> network thread
+
+    def call(self, function, *args):
+        """Run function(*args) on the network thread (call from the render loop)."""
+        outbox = self.outbox
+        outbox.append((function, args))
+        if len(outbox) > self.outbox_peak:
+            self.outbox_peak = len(outbox)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            try:
+                self.loop.call_soon_threadsafe(self.flush_outbox)
+            except RuntimeError:
+                pass  # Loop already closed - nothing will run it
+
+    def submit(self, coroutine):
+        """Run coroutine on the network thread. Returns a concurrent.futures.Future to poll with done()."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def flush_outbox(self):
+        # Clear the flag first - anything queued after this point schedules another flush
+        self.flush_scheduled = False
+        outbox = self.outbox
+        while outbox:
+            function, args = outbox.popleft()
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"{self.name}: {e}")
+
+    # Network thread -> render loop
+
+    def post(self, function, *args):
+        """Have the render loop run function(*args) on its next drain() (call from the network thread)."""
+        inbox = self.inbox
+        inbox.append((function, args))
+        self.posted += 1
+        if len(inbox) > self.inbox_peak:
+            self.inbox_peak = len(inbox)
+
+    def drain(self, budget_ms=DRAIN_BUDGET_MS):
+        """Run posted work until the inbox is empty or budget_ms has passed. Returns how many ran."""
+        inbox = self.inbox
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+        count = 0
+        while inbox:
+            function, args = inbox.popleft()
+            function(*args)
+            count += 1
+            if time.perf_counter() >= deadline:
+                if inbox:
+                    self.frames_over_budget += 1
+                break
+        self.drained += count
+        self.drain_times.append((time.perf_counter() - started) * 1000)
+        return count
+
+    def metrics(self):
+        """Queue depths and drain times, as a dict."""
+        times = sorted(self.drain_times) or [0.0]
+        return {
+            "inbox": len(self.inbox),
+            "outbox": len(self.outbox),
+            "inbox_peak": self.inbox_peak,
+            "outbox_peak": self.outbox_peak,
+            "posted": self.posted,
+            "drained": self.drained,
+            "frames_over_budget": self.frames_over_budget,
+            "drain_p50_ms": times[(len(times) - 1) // 2],
+            "drain_p95_ms": times[max(0, -(-len(times) * 95 // 100) - 1)],
+            "drain_max_ms": times[-1],
+        }
+
+    def summary(self):
+        """One-line summary of the metrics."""
+        m = self.metrics()
+        return (f"{self.name}: {m['drained']} messages drained, drain p50 {m['drain_p50_ms']:.2f} ms, "
+                f"p95 {m['drain_p95_ms']:.2f} ms, max {m['drain_max_ms']:.2f} ms; queue peaks in {m['inbox_peak']}, "
+                f"out {m['outbox_peak']}; {m['frames_over_budget']} frames over budget")
+
+class EchoServerProtocol(asyncio.Protocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.transport.write(data)
+
+class EchoClientProtocol(asyncio.Protocol):
+    """Posts every line the echo server sends back to the render loop."""
+    def __init__(self, pump, on_line):
+        self.pump = pump
+        self.on_line = on_line
+        self.buffer = b''
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        *lines, self.buffer = (self.buffer + data).split(b'\n')
+        for line in lines:
+            self.pump.post(self.on_line, line)
+
+async def open_echo(pump, on_line, host='127.0.0.1'):
+    """Start an echo server on the pump's loop and connect to it. Returns (server, client transport)."""
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(EchoServerProtocol, host, 0)
+    port = server.sockets[0].getsockname()[1]
+    transport, _ = await loop.create_connection(lambda: EchoClientProtocol(pump, on_line), host, port)
+    return server, transport
+
+def self_check(seconds=3.0, fps=60, messages_per_frame=20):
+    """Echo messages through the pump from a 60 fps loop and report round trips and frame stalls."""
+    pump = NetworkPump("Echo pump").start()
+    round_trips = []
+    received = [0]
+
+    def on_line(line):
+        # Runs on the render loop
+        received[0] += 1
+        round_trips.append((time.perf_counter() - float(line)) * 1000)
+
+    server, transport = pump.submit(open_echo(pump, on_line)).result(timeout=5)
+    frame_time = 1.0 / fps
+    frames = 0
+    worst_frame_work = 0.0
+    sent = 0
+    started = time.perf_counter()
+    next_frame = started
+    while time.perf_counter() - started < seconds:
+        frame_started = time.perf_counter()
+        pump.drain()
+        for _ in range(messages_per_frame):
+            pump.call(transport.write, f"{time.perf_counter()}\n".encode())
+            sent += 1
+        worst_frame_work = max(worst_frame_work, (time.perf_counter() - frame_started) * 1000)
+        frames += 1
+        next_frame += frame_time
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    # Collect the stragglers
+    deadline = time.perf_counter() + 1.0
+    while received[0] < sent and time.perf_counter() < deadline:
+        time.sleep(0.001)
+        pump.drain()
+
+    pump.call(transport.close)
+    pump.call(server.close)
+    pump.stop()
+    round_trips.sort()
+    print(f"{frames} frames, {sent} sent, {received[0]} echoed back")
+    if round_trips:
+        print(f"Round trip to the render loop: p50 {round_trips[len(round_trips) // 2]:.2f} ms, "
+              f"max {round_trips[-1]:.2f} ms (includes waiting for the next frame)")
+    print(f"Worst frame spent {worst_frame_work:.2f} ms on network work")
+    print(pump.summary())
+    return received[0] == sent
+
+if __name__ == "__main__":
+    import sys
+    ok = self_check(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
+    print("OK" if ok else "FAILED - messages went missing")
+    sys.exit(0 if ok else 1)
@@ -1,27 +1,28 @@
+import time
+startup_started = time.perf_counter()  # For the time-to-first-frame check below
+
 import pygame
 import sys
 import os
-import math
-try:
-    import imageio
-except ImportError:
-    print("imageio module not found. Please install it with: pip install imageio")
-    sys.exit(1)
 
-# Import Gameplay module with error handling
-try:
-    import Gameplay
-    GAMEPLAY_MODULE_AVAILABLE = True
-    print("Gameplay module loaded successfully")
-except ImportError as e:
-    print(f"Could not load Gameplay module: {e}")
-    GAMEPLAY_MODULE_AVAILABLE = False
-except Exception as e:
-    print(f"Error loading Gameplay module: {e}")
-    GAMEPLAY_MODULE_AVAILABLE = False
+import AssetManager
+import SceneManager
+import ScoreStore
+import SessionLog
+from TextCache import render_text
+
+# Time from launch until the first frame is on screen that we aim to stay
+# under (printed at startup, with a warning when it is exceeded)
+STARTUP_BUDGET_MS = 500
+first_frame_shown = False
 
-# Initialize pygame
-pygame.init()
+# Gameplay module - imported the first time START GAME is clicked (see can_load_gameplay)
+Gameplay = None
+GAMEPLAY_MODULE_AVAILABLE = True
+
+# Initialize only the pygame subsystems the game uses (no audio)
+pygame.display.init()
+pygame.font.init()
 
 # Screen dimensions based on the image
 SCREEN_WIDTH = 960
@@ -64,52 +65,68 @@ fading_out = False  # Flag to indicate if elements are fading out
 fading_in = False  # Flag to indicate if elements are fading in
 title_visible_during_transition = True  # Keep title visible during transitions
 
-# Loading animation properties
+# Loading screen properties
 loading_animation_active = False
-loading_dots = 0
-loading_animation_speed = 30  # milliseconds between dot updates
-last_loading_update = 0
+asset_loader = None  # AssetManager.BackgroundLoader for the gameplay assets, while the loading screen is up
+loading_bar_width = 320
+loading_bar_height = 16
 # Gameplay launch state
 gameplay_launch_initiated = False
 
 # Load the GIF background
-background_color = (20, 20, 40)  # Fallback color
+background_color = (20, 20, 40)  # Fallback color, also shown until the GIF is decoded
 background_path = os.path.join('images', 'BACKGROUND PIXELTYPERS.gif')
-try:
-    # Using imageio to handle GIF animation
-    gif = imageio.mimread(background_path)
-    # Convert to pygame surfaces
-    pygame_frames = []
-    for frame in gif:
-        frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-        # Scale to fit screen if needed
-        frame_surface = pygame.transform.scale(frame_surface, (SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame_frames.append(frame_surface)
-    current_frame = 0
-    total_frames = len(pygame_frames)
-    frame_delay = 100  # milliseconds between frames
-    last_frame_time = pygame.time.get_ticks()
-    has_background_gif = True
-    print("Successfully loaded background GIF with", total_frames, "frames")
-except Exception as e:
-    print("Could not load background GIF:", e)
-    has_background_gif = False
+# Most memory the decoded background frames may use. Frames that don't fit
+# are decoded again, a couple of frames before they come up, on a worker
+# thread (at full size every frame takes about 2 MB, so raising this to 16
+# keeps the whole animation resident).
+BACKGROUND_MEMORY_LIMIT_MB = 8
+has_background_gif = False
+
+def load_background(stream):
+    """Switch the background to the GIF once its stream is open."""
+    global background_stream, current_frame, total_frames, frame_delay, last_frame_time, has_background_gif
+    try:
+        # Frames are decoded and scaled to fit the screen as they come up
+        background_stream = stream
+        background_stream.frame(0)
+        current_frame = 0
+        total_frames = len(background_stream)
+        frame_delay = 100  # milliseconds between frames
+        last_frame_time = pygame.time.get_ticks()
+        has_background_gif = True
+        print("Successfully loaded background GIF with", total_frames, "frames")
+    except Exception as e:
+        print("Could not load background GIF:", e)
+        has_background_gif = False
+
+# The GIF is opened on a worker thread so the window comes up straight away;
+# the main loop picks the stream up once it is ready (see load_background)
+startup_loader = AssetManager.BackgroundLoader()
+startup_loader.submit(
+    lambda: AssetManager.GifStream(background_path, (SCREEN_WIDTH, SCREEN_HEIGHT), alpha=False,
+                                   max_bytes=BACKGROUND_MEMORY_LIMIT_MB * 1024 * 1024),
+    load_background)
 
 # Load main menu text box and back button
 try:
-    menu_box_img = pygame.image.load(os.path.join('images', 'MainMenuTXTBOX.png')).convert_alpha()
-    menu_box_img = pygame.transform.scale(menu_box_img, (400, 350))  # Adjust size as needed
+    menu_box_img = AssetManager.get_image(os.path.join('images', 'MainMenuTXTBOX.png'), (400, 350))  # Adjust size as needed
+    if menu_box_img is None:
+        raise FileNotFoundError("MainMenuTXTBOX.png")
     has_menu_box = True
     
-    # Load back button image
-    back_button_img = pygame.image.load(os.path.join('images', 'Back Button 1.png')).convert_alpha()
+    # Load back button image (shared with Gameplay's back button)
+    back_button_path = os.path.join('images', 'Back Button 1.png')
+    back_button_img = AssetManager.get_image(back_button_path)
+    if back_button_img is None:
+        raise FileNotFoundError(back_button_path)
     # Get original dimensions to preserve aspect ratio
     original_width, original_height = back_button_img.get_size()
     aspect_ratio = original_width / original_height
     # Set target height and calculate width to maintain aspect ratio
     target_height = 35  # Scaled down from 50
     target_width = int(target_height * aspect_ratio)
-    back_button_img = pygame.transform.scale(back_button_img, (target_width, target_height))
+    back_button_img = AssetManager.get_image(back_button_path, (target_width, target_height))
     has_back_button = True
 except Exception as e:
     print("Could not load images:", e)
@@ -118,17 +135,10 @@ except Exception as e:
 
 # Font for the title and buttons
 font_path = os.path.join('fonts', 'fs-pixel-sans-unicode-regular.ttf')
-try:
-    # Use the custom pixel font
-    title_font = pygame.font.Font(font_path, 72)  # Pixel font, size 72
-    button_font = pygame.font.Font(font_path, 36)  # Pixel font, size 36
-    menu_font = pygame.font.Font(font_path, 28)  # Smaller font for menu items
-except:
-    # Fallback to default font if the custom font fails to load
-    print("Could not load custom font. Using default font instead.")
-    title_font = pygame.font.SysFont('Arial', 72)
-    button_font = pygame.font.SysFont('Arial', 36)
-    menu_font = pygame.font.SysFont('Arial', 28)
+# Use the custom pixel font (falls back to Arial if it can't be loaded)
+title_font = AssetManager.get_font(font_path, 72)  # Pixel font, size 72
+button_font = AssetManager.get_font(font_path, 36)  # Pixel font, size 36
+menu_font = AssetManager.get_font(font_path, 28)  # Smaller font for menu items
 
 # Main menu buttons
 menu_items = ["START GAME", "SETTINGS", "EXIT"]
@@ -180,16 +190,37 @@ button_fade_value = 255  # Start with full yellow (255)
 button_fade_direction = -1  # Start by fading to black (-1), then to yellow (1)
 button_fade_speed = 5  # Speed of color transition
 
+# Settings popup box - drawn once and reused every frame
+settings_popup_surface = pygame.Surface((400, 300), pygame.SRCALPHA)
+pygame.draw.rect(settings_popup_surface, (40, 60, 120), settings_popup_surface.get_rect(), border_radius=10)
+pygame.draw.rect(settings_popup_surface, (60, 80, 160), settings_popup_surface.get_rect(), width=3, border_radius=10)
+
+def load_gameplay_module():
+    """Import the Gameplay module on first use."""
+    global Gameplay, GAMEPLAY_MODULE_AVAILABLE
+    if Gameplay is None and GAMEPLAY_MODULE_AVAILABLE:
+        try:
+            import Gameplay as gameplay_module
+            Gameplay = gameplay_module
+            print("Gameplay module loaded successfully")
+        except ImportError as e:
+            print(f"Could not load Gameplay module: {e}")
+            GAMEPLAY_MODULE_AVAILABLE = False
+        except Exception as e:
+            print(f"Error loading Gameplay module: {e}")
+            GAMEPLAY_MODULE_AVAILABLE = False
+    return Gameplay
+
 def can_load_gameplay():
     """Check if the Gameplay module can be loaded properly."""
     try:
         # Check if Gameplay module is available
-        if not GAMEPLAY_MODULE_AVAILABLE:
+        if load_gameplay_module() is None:
             return False, "Gameplay module not available"
         
         # Check if Gameplay has required attributes
-        if not hasattr(Gameplay, 'main'):
-            return False, "Gameplay module missing main() function"
+        if not hasattr(Gameplay, 'SelectionScene'):
+            return False, "Gameplay module missing SelectionScene"
         
         return True, "Gameplay module ready"
         
@@ -198,9 +229,10 @@ def can_load_gameplay():
 
 def reset_transition_state():
     """Reset all transition-related variables to their initial state."""
-    global transitioning, loading_animation_active, fade_alpha, fading_out, fading_in, current_state, gameplay_launch_initiated, transition_target
+    global transitioning, loading_animation_active, asset_loader, fade_alpha, fading_out, fading_in, current_state, gameplay_launch_initiated, transition_target
     transitioning = False
     loading_animation_active = False
+    asset_loader = None
     fade_alpha = 255
     fading_out = False
     fading_in = False
@@ -209,10 +241,11 @@ def reset_transition_state():
     transition_target = GAME_SCREEN
     print("Transition state reset to main menu")
 
-def transition_to_gameplay():
-    """Handle the transition to Gameplay.py module with proper error handling."""
-    global loading_animation_active, loading_dots, last_loading_update
+def transition_to_gameplay(manager):
+    """Open the Gameplay selection screen on top of the title scene, with proper error handling.
     
+    Returns False if it could not be opened.
+    """
     try:
         # Check if Gameplay module can be loaded
         can_load, message = can_load_gameplay()
@@ -220,31 +253,26 @@ def transition_to_gameplay():
             print(f"ERROR: {message}")
             return False
         
-        # Attempt to run the Gameplay module
-        print("Loading Gameplay module...")
-        
-        # Run the Gameplay module's main function and capture result
-        print("Running Gameplay.main()...")
-        gameplay_result = Gameplay.main()
-        
-        print("Gameplay module finished with result:", gameplay_result)
-        # Propagate explicit back signal; otherwise return True
-        return gameplay_result if gameplay_result == "BACK_TO_MAIN" else True
+        # The title scene resumes (see TitleScene.resume) when the player comes back
+        print("Opening Gameplay selection screen...")
+        manager.push(Gameplay.SelectionScene())
+        return True
         
     except Exception as e:
         print(f"ERROR: Failed to load Gameplay module: {e}")
         return False
 
-# Main game loop
-running = True
-clock = pygame.time.Clock()
-
-while running:
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        
+class TitleScene(SceneManager.Scene):
+    """Title screen, main menu and settings popup.
+    
+    The three share the animated background and fade into each other, so
+    they are states of one scene (current_state) rather than separate
+    scenes. START GAME pushes the Gameplay selection scene once its assets
+    are loaded; this scene resumes at the main menu when it pops.
+    """
+    def handle_event(self, event):
+        global button_hover, transitioning, transition_target, fade_alpha, fading_out, fading_in, current_state
+        global gameplay_launch_initiated, settings_popup_alpha, music_enabled, sound_enabled
         # Mouse events
         if event.type == pygame.MOUSEMOTION:
             # Check if mouse is over the button
@@ -320,24 +348,9 @@ while running:
                                 settings_popup_alpha = 0
                                 print("Opening settings popup!")
                             elif i == 2:  # EXIT
-                                running = False
                                 print("Exiting game!")
-                            elif i == 0:  # START GAME
-                                print("Loading Gameplay module...")
-                                # Ensure pygame is properly initialized for Gameplay
-                                if not pygame.get_init():
-                                    pygame.init()
-                                # Import and run the Gameplay module
-                                try:
-                                    import Gameplay
-                                    print("Running Gameplay.main()...")
-                                    Gameplay.main()
-                                    print("Gameplay module loaded successfully!")
-                                except ImportError:
-                                    print("Gameplay module not found!")
-                                except Exception as e:
-                                    print("Error running Gameplay module:", e)
-                
+                                self.manager.quit()
+                                return
                 # Handle clicks in Settings screen
                 elif current_state == SETTINGS_SCREEN:
                     # Back button (arrow in top-left of the popup)
@@ -372,342 +385,373 @@ while running:
                         sound_enabled = not sound_enabled
                         print(f"Sound {'enabled' if sound_enabled else 'disabled'}")
     
-    # Display background (either GIF animation or solid color)
-    if has_background_gif:
-        # Check if it's time to advance to the next frame
-        current_time = pygame.time.get_ticks()
-        if current_time - last_frame_time > frame_delay:
-            current_frame = (current_frame + 1) % total_frames
-            last_frame_time = current_time
-        
-        # Display the current frame
-        screen.blit(pygame_frames[current_frame], (0, 0))
-    else:
-        # Fallback to solid color if GIF couldn't be loaded
-        screen.fill(background_color)
+    def update(self):
+        global startup_loader, gameplay_launch_initiated
+        # Finish loading the background GIF once the worker has opened it
+        if startup_loader is not None and startup_loader.poll() >= 1.0:
+            startup_loader = None
+        
+        # Launch gameplay once the loading bar has been shown full for a frame
+        if (loading_animation_active and transition_target == "GAMEPLAY" and asset_loader is not None
+                and asset_loader.finished and not gameplay_launch_initiated):
+            gameplay_launch_initiated = True
+            print("Loading Gameplay.py module...")
+            if not transition_to_gameplay(self.manager):
+                # Could not start it - back to the main menu
+                reset_transition_state()
+    
+    def resume(self, result):
+        print(f"Gameplay returned: {result}")
+        # Always return to main menu after Gameplay finishes (whether back button was clicked or not)
+        reset_transition_state()
+    
+    def draw(self, screen):
+        global current_frame, last_frame_time, button_fade_value, button_fade_direction, settings_popup_alpha
+        global fade_alpha, fading_out, fading_in, loading_animation_active, current_state, transitioning, asset_loader
+        # Display background (either GIF animation or solid color)
+        if has_background_gif:
+            # Check if it's time to advance to the next frame
+            current_time = pygame.time.get_ticks()
+            if current_time - last_frame_time > frame_delay:
+                current_frame = (current_frame + 1) % total_frames
+                last_frame_time = current_time
+        
+            # Display the current frame
+            screen.blit(background_stream.frame(current_frame), (0, 0))
+        else:
+            # Fallback to solid color if GIF couldn't be loaded (or isn't decoded yet)
+            screen.fill(background_color)
     
-    # Draw based on current state
-    if current_state == TITLE_SCREEN:
-        # Draw title
-        title_text = title_font.render("PIXEL TYPERS", True, YELLOW)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
-        screen.blit(title_text, title_rect)
-        
-        # Handle button fading effect when hovered
-        if button_hover:
-            # Update fade value based on direction and speed
-            button_fade_value += button_fade_direction * button_fade_speed
+        # Draw based on current state
+        if current_state == TITLE_SCREEN:
+            # Draw title
+            title_text = render_text(title_font, "PIXEL TYPERS", YELLOW)
+            title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
+            screen.blit(title_text, title_rect)
+        
+            # Handle button fading effect when hovered
+            if button_hover:
+                # Update fade value based on direction and speed
+                button_fade_value += button_fade_direction * button_fade_speed
             
-            # Change direction when reaching limits
-            if button_fade_value <= 0:  # Fully black
-                button_fade_value = 0
-                button_fade_direction = 1  # Start fading to yellow
-            elif button_fade_value >= 255:  # Fully yellow
-                button_fade_value = 255
-                button_fade_direction = -1  # Start fading to black
+                # Change direction when reaching limits
+                if button_fade_value <= 0:  # Fully black
+                    button_fade_value = 0
+                    button_fade_direction = 1  # Start fading to yellow
+                elif button_fade_value >= 255:  # Fully yellow
+                    button_fade_value = 255
+                    button_fade_direction = -1  # Start fading to black
             
-            # Create fading color between yellow and black
-            button_color = (button_fade_value, button_fade_value, 0)  # R and G fade together
-        else:
-            # Reset to yellow when not hovering
-            button_color = YELLOW
-            button_fade_value = 255
-            button_fade_direction = -1
+                # Create fading color between yellow and black
+                button_color = (button_fade_value, button_fade_value, 0)  # R and G fade together
+            else:
+                # Reset to yellow when not hovering
+                button_color = YELLOW
+                button_fade_value = 255
+                button_fade_direction = -1
         
-        # No background rectangle - making it transparent
+            # No background rectangle - making it transparent
         
-        # Draw button text with fading color
-        button_surface = button_font.render(button_text, True, button_color)
-        button_text_rect = button_surface.get_rect(center=button_rect.center)
-        screen.blit(button_surface, button_text_rect)
+            # Draw button text with fading color
+            button_surface = render_text(button_font, button_text, button_color)
+            button_text_rect = button_surface.get_rect(center=button_rect.center)
+            screen.blit(button_surface, button_text_rect)
     
-    elif current_state == GAME_SCREEN:
-        # Main Menu Screen
-        # Draw title (always visible, not affected by fade)
-        title_text = title_font.render("PIXEL TYPERS", True, YELLOW)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//6))
-        screen.blit(title_text, title_rect)
-        
-        # Draw menu items with blue button boxes and fade effect
-        for i, (item, rect) in enumerate(zip(menu_items, menu_rects)):
-            # Determine button color based on transition state
-            if transitioning and i == 0:  # START GAME button during transition
-                button_color = (80, 100, 150)  # Disabled/darker blue
-                text_color = GRAY  # Gray text for disabled state
-            else:
-                button_color = BLUE  # Normal blue
-                # Change text color based on hover state
-                text_color = YELLOW if menu_hover[i] else WHITE
+        elif current_state == GAME_SCREEN:
+            # Main Menu Screen
+            # Draw title (always visible, not affected by fade)
+            title_text = render_text(title_font, "PIXEL TYPERS", YELLOW)
+            title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//6))
+            screen.blit(title_text, title_rect)
+        
+            # Draw menu items with blue button boxes and fade effect
+            for i, (item, rect) in enumerate(zip(menu_items, menu_rects)):
+                # Determine button color based on transition state
+                if transitioning and i == 0:  # START GAME button during transition
+                    button_color = (80, 100, 150)  # Disabled/darker blue
+                    text_color = GRAY  # Gray text for disabled state
+                else:
+                    button_color = BLUE  # Normal blue
+                    # Change text color based on hover state
+                    text_color = YELLOW if menu_hover[i] else WHITE
             
-            # Draw button box
-            button_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-            pygame.draw.rect(button_surface, button_color, button_surface.get_rect(), border_radius=5)
+                # Draw button box
+                button_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+                pygame.draw.rect(button_surface, button_color, button_surface.get_rect(), border_radius=5)
             
-            # Add a 3D effect with a darker border
-            pygame.draw.rect(button_surface, (0, 80, 200), button_surface.get_rect(), width=3, border_radius=5)
+                # Add a 3D effect with a darker border
+                pygame.draw.rect(button_surface, (0, 80, 200), button_surface.get_rect(), width=3, border_radius=5)
             
-            # Apply fade effect during transition
-            if transitioning and not title_visible_during_transition:
-                button_surface.set_alpha(fade_alpha)
+                # Apply fade effect during transition
+                if transitioning and not title_visible_during_transition:
+                    button_surface.set_alpha(fade_alpha)
             
-            screen.blit(button_surface, rect)
+                screen.blit(button_surface, rect)
             
-            # Render text
-            text_surface = menu_font.render(item, True, text_color)
-            text_rect = text_surface.get_rect(center=rect.center)
+                # Render text
+                text_surface = render_text(menu_font, item, text_color)
+                text_rect = text_surface.get_rect(center=rect.center)
             
-            # Apply fade effect to text during transition
-            if transitioning and not title_visible_during_transition:
-                text_surface.set_alpha(fade_alpha)
+                # Apply fade effect to text during transition
+                if transitioning and not title_visible_during_transition:
+                    text_surface = text_surface.copy()  # The cached surface is shared
+                    text_surface.set_alpha(fade_alpha)
             
-            # Draw text
-            screen.blit(text_surface, text_rect)
+                # Draw text
+                screen.blit(text_surface, text_rect)
     
-    elif current_state == SETTINGS_SCREEN:
-        # First draw the main menu in the background
-        # Draw title
-        title_text = title_font.render("PIXEL TYPERS", True, YELLOW)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//6))
-        screen.blit(title_text, title_rect)
-        
-        # Draw menu items with blue button boxes
-        for i, (item, rect) in enumerate(zip(menu_items, menu_rects)):
-            # Draw blue button box
-            pygame.draw.rect(screen, BLUE, rect, border_radius=5)
-            pygame.draw.rect(screen, (0, 80, 200), rect, width=3, border_radius=5)
+        elif current_state == SETTINGS_SCREEN:
+            # First draw the main menu in the background
+            # Draw title
+            title_text = render_text(title_font, "PIXEL TYPERS", YELLOW)
+            title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//6))
+            screen.blit(title_text, title_rect)
+        
+            # Draw menu items with blue button boxes
+            for i, (item, rect) in enumerate(zip(menu_items, menu_rects)):
+                # Draw blue button box
+                pygame.draw.rect(screen, BLUE, rect, border_radius=5)
+                pygame.draw.rect(screen, (0, 80, 200), rect, width=3, border_radius=5)
             
-            # Render text
-            text_surface = menu_font.render(item, True, WHITE)
-            text_rect = text_surface.get_rect(center=rect.center)
+                # Render text
+                text_surface = render_text(menu_font, item, WHITE)
+                text_rect = text_surface.get_rect(center=rect.center)
             
-            # Draw text
-            screen.blit(text_surface, text_rect)
-        
-        # Animate settings popup alpha
-        if settings_popup_alpha < settings_popup_max_alpha:
-            settings_popup_alpha += settings_popup_speed
-            if settings_popup_alpha > settings_popup_max_alpha:
-                settings_popup_alpha = settings_popup_max_alpha
-        
-        # Create a semi-transparent overlay to dim the background
-        dim_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        dim_surface.fill((20, 30, 70))  # Dark blue color
-        
-        # Apply fade effect during transition
-        if transitioning and not title_visible_during_transition:
-            dim_surface.set_alpha(fade_alpha)
-        else:
-            dim_surface.set_alpha(settings_popup_alpha)
-        
-        screen.blit(dim_surface, (0, 0))
-        
-        # Draw settings popup with fade effect
-        popup_width, popup_height = 400, 300
-        popup_rect = pygame.Rect(
-            SCREEN_WIDTH//2 - popup_width//2,
-            SCREEN_HEIGHT//2 - popup_height//2,
-            popup_width, 
-            popup_height
-        )
-        
-        # Create popup surface with fade effect
-        popup_surface = pygame.Surface((popup_width, popup_height), pygame.SRCALPHA)
-        pygame.draw.rect(popup_surface, (40, 60, 120), popup_surface.get_rect(), border_radius=10)
-        pygame.draw.rect(popup_surface, (60, 80, 160), popup_surface.get_rect(), width=3, border_radius=10)
-        
-        # Apply fade effect during transition
-        if transitioning and not title_visible_during_transition:
-            popup_surface.set_alpha(fade_alpha)
-        
-        screen.blit(popup_surface, popup_rect)
-        
-        # Settings title with fade effect
-        settings_text = button_font.render("SETTINGS", True, WHITE)
-        settings_rect = settings_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 100))
-        
-        # Apply fade effect to settings title during transition
-        if transitioning and not title_visible_during_transition:
-            settings_text.set_alpha(fade_alpha)
-        
-        screen.blit(settings_text, settings_rect)
-        
-        # Back button (arrow in top-left of the popup) with fade effect
-        back_rect = pygame.Rect(
-            popup_rect.left + 20,  # 20px from left edge of popup
-            popup_rect.top + 20,   # 20px from top edge of popup
-            50, 50
-        )
-        if has_back_button:
+                # Draw text
+                screen.blit(text_surface, text_rect)
+        
+            # Animate settings popup alpha
+            if settings_popup_alpha < settings_popup_max_alpha:
+                settings_popup_alpha += settings_popup_speed
+                if settings_popup_alpha > settings_popup_max_alpha:
+                    settings_popup_alpha = settings_popup_max_alpha
+        
+            # Semi-transparent dark blue overlay to dim the background (one
+            # reused surface, only its alpha changes while fading)
             if transitioning and not title_visible_during_transition:
-                # Create a surface for the back button with fade effect
-                back_button_surface = pygame.Surface(back_button_img.get_size(), pygame.SRCALPHA)
-                back_button_surface.blit(back_button_img, (0, 0))
-                back_button_surface.set_alpha(fade_alpha)
-                screen.blit(back_button_surface, back_rect)
+                dim_alpha = fade_alpha  # Apply fade effect during transition
             else:
-                screen.blit(back_button_img, back_rect)
-        else:
-            # Fallback if image not available
-            pygame.draw.rect(screen, BLUE, back_rect, border_radius=5)
-            back_text = button_font.render("←", True, WHITE)
-            back_text_rect = back_text.get_rect(center=back_rect.center)
-            
-            # Apply fade effect to back button text during transition
+                dim_alpha = settings_popup_alpha
+        
+            screen.blit(AssetManager.get_filled_surface((SCREEN_WIDTH, SCREEN_HEIGHT), (20, 30, 70), dim_alpha), (0, 0))
+        
+            # Draw settings popup with fade effect
+            popup_width, popup_height = 400, 300
+            popup_rect = pygame.Rect(
+                SCREEN_WIDTH//2 - popup_width//2,
+                SCREEN_HEIGHT//2 - popup_height//2,
+                popup_width, 
+                popup_height
+            )
+        
+            # Popup box (drawn once at startup) with fade effect
+            popup_surface = settings_popup_surface
+        
+            # Apply fade effect during transition
             if transitioning and not title_visible_during_transition:
-                back_text.set_alpha(fade_alpha)
+                popup_surface = settings_popup_surface.copy()
+                popup_surface.set_alpha(fade_alpha)
+        
+            screen.blit(popup_surface, popup_rect)
+        
+            # Settings title with fade effect
+            settings_text = render_text(button_font, "SETTINGS", WHITE)
+            settings_rect = settings_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 100))
+        
+            # Apply fade effect to settings title during transition
+            if transitioning and not title_visible_during_transition:
+                settings_text = settings_text.copy()  # The cached surface is shared
+                settings_text.set_alpha(fade_alpha)
+        
+            screen.blit(settings_text, settings_rect)
+        
+            # Back button (arrow in top-left of the popup) with fade effect
+            back_rect = pygame.Rect(
+                popup_rect.left + 20,  # 20px from left edge of popup
+                popup_rect.top + 20,   # 20px from top edge of popup
+                50, 50
+            )
+            if has_back_button:
+                if transitioning and not title_visible_during_transition:
+                    # Create a surface for the back button with fade effect
+                    back_button_surface = pygame.Surface(back_button_img.get_size(), pygame.SRCALPHA)
+                    back_button_surface.blit(back_button_img, (0, 0))
+                    back_button_surface.set_alpha(fade_alpha)
+                    screen.blit(back_button_surface, back_rect)
+                else:
+                    screen.blit(back_button_img, back_rect)
+            else:
+                # Fallback if image not available
+                pygame.draw.rect(screen, BLUE, back_rect, border_radius=5)
+                back_text = render_text(button_font, "←", WHITE)
+                back_text_rect = back_text.get_rect(center=back_rect.center)
             
-            screen.blit(back_text, back_text_rect)
-        
-        # Music option with fade effect
-        music_text = menu_font.render("Music", True, WHITE)
-        music_rect = music_text.get_rect(midright=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 35))
-        
-        # Apply fade effect to music text during transition
-        if transitioning and not title_visible_during_transition:
-            music_text.set_alpha(fade_alpha)
-        
-        screen.blit(music_text, music_rect)
-        
-        # Music checkbox with fade effect
-        music_checkbox_rect = pygame.Rect(SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT//2 - 50, 30, 30)
-        
-        # Apply fade effect to checkbox during transition
-        if transitioning and not title_visible_during_transition:
-            pygame.draw.rect(screen, (80, 100, 200), music_checkbox_rect, border_radius=3)
-            if music_enabled:
-                # Create checkmark surface with fade effect
-                checkmark_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
-                pygame.draw.line(checkmark_surface, WHITE, 
-                                 (5, 15),
-                                 (13, 25), 3)
-                pygame.draw.line(checkmark_surface, WHITE, 
-                                 (13, 25),
-                                 (25, 5), 3)
-                checkmark_surface.set_alpha(fade_alpha)
-                screen.blit(checkmark_surface, music_checkbox_rect)
-        else:
-            pygame.draw.rect(screen, (80, 100, 200), music_checkbox_rect, border_radius=3)
-            if music_enabled:
-                # Draw checkmark normally
-                pygame.draw.line(screen, WHITE, 
-                                 (music_checkbox_rect.left + 5, music_checkbox_rect.centery),
-                                 (music_checkbox_rect.centerx - 2, music_checkbox_rect.bottom - 5), 3)
-                pygame.draw.line(screen, WHITE, 
-                                 (music_checkbox_rect.centerx - 2, music_checkbox_rect.bottom - 5),
-                                 (music_checkbox_rect.right - 5, music_checkbox_rect.top + 5), 3)
-        
-        # Sound option with fade effect
-        sound_text = menu_font.render("Sound", True, WHITE)
-        sound_rect = sound_text.get_rect(midright=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 45))
-        
-        # Apply fade effect to sound text during transition
-        if transitioning and not title_visible_during_transition:
-            sound_text.set_alpha(fade_alpha)
-        
-        screen.blit(sound_text, sound_rect)
-        
-        # Sound checkbox with fade effect
-        sound_checkbox_rect = pygame.Rect(SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT//2 + 30, 30, 30)
-        
-        # Apply fade effect to sound checkbox during transition
-        if transitioning and not title_visible_during_transition:
-            pygame.draw.rect(screen, (80, 100, 200), sound_checkbox_rect, border_radius=3)
-            if sound_enabled:
-                # Create checkmark surface with fade effect
-                checkmark_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
-                pygame.draw.line(checkmark_surface, WHITE, 
-                                 (5, 15),
-                                 (13, 25), 3)
-                pygame.draw.line(checkmark_surface, WHITE, 
-                                 (13, 25),
-                                 (25, 5), 3)
-                checkmark_surface.set_alpha(fade_alpha)
-                screen.blit(checkmark_surface, sound_checkbox_rect)
-        else:
-            pygame.draw.rect(screen, (80, 100, 200), sound_checkbox_rect, border_radius=3)
-            if sound_enabled:
-                # Draw checkmark normally
-                pygame.draw.line(screen, WHITE, 
-                                 (sound_checkbox_rect.left + 5, sound_checkbox_rect.centery),
-                                 (sound_checkbox_rect.centerx - 2, sound_checkbox_rect.bottom - 5), 3)
-                pygame.draw.line(screen, WHITE, 
-                                 (sound_checkbox_rect.centerx - 2, sound_checkbox_rect.bottom - 5),
-                                 (sound_checkbox_rect.right - 5, sound_checkbox_rect.top + 5), 3)
-    
-    # Handle fade animations for transition state
-    if current_state == TRANSITION_SCREEN or transitioning:
-        if fading_out:
-            # Fade out the current elements
-            fade_alpha -= fade_speed
-            if fade_alpha <= 0:
-                fade_alpha = 0
-                fading_out = False
-                fading_in = True
-                # Switch to target state
-                if current_state == TRANSITION_SCREEN:
-                    # Special handling for Gameplay transition
-                    if transition_target == "GAMEPLAY":
-                        # Show loading screen instead of regular fade-in
-                        loading_animation_active = True
-                        print("Showing loading screen for Gameplay.py...")
-                    else:
-                        current_state = transition_target
-        
-        elif fading_in and transition_target != "GAMEPLAY":
-            # Fade in the new elements (only for non-gameplay transitions)
-            fade_alpha += fade_speed
-            if fade_alpha >= 255:
-                fade_alpha = 255
-                fading_in = False
-                transitioning = False
-                
-                # Handle Gameplay module transition (this shouldn't happen here, but just in case)
-                if transition_target == "GAMEPLAY":
-                    print("Transition complete, loading Gameplay.py...")
-                    result = transition_to_gameplay()
-                    print(f"Gameplay returned: {result}")
-                    # Always return to main menu after Gameplay finishes
-                    reset_transition_state()
+                # Apply fade effect to back button text during transition
+                if transitioning and not title_visible_during_transition:
+                    back_text = back_text.copy()  # The cached surface is shared
+                    back_text.set_alpha(fade_alpha)
+            
+                screen.blit(back_text, back_text_rect)
+        
+            # Music option with fade effect
+            music_text = render_text(menu_font, "Music", WHITE)
+            music_rect = music_text.get_rect(midright=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 35))
+        
+            # Apply fade effect to music text during transition
+            if transitioning and not title_visible_during_transition:
+                music_text = music_text.copy()  # The cached surface is shared
+                music_text.set_alpha(fade_alpha)
+        
+            screen.blit(music_text, music_rect)
+        
+            # Music checkbox with fade effect
+            music_checkbox_rect = pygame.Rect(SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT//2 - 50, 30, 30)
+        
+            # Apply fade effect to checkbox during transition
+            if transitioning and not title_visible_during_transition:
+                pygame.draw.rect(screen, (80, 100, 200), music_checkbox_rect, border_radius=3)
+                if music_enabled:
+                    # Create checkmark surface with fade effect
+                    checkmark_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
+                    pygame.draw.line(checkmark_surface, WHITE, 
+                                     (5, 15),
+                                     (13, 25), 3)
+                    pygame.draw.line(checkmark_surface, WHITE, 
+                                     (13, 25),
+                                     (25, 5), 3)
+                    checkmark_surface.set_alpha(fade_alpha)
+                    screen.blit(checkmark_surface, music_checkbox_rect)
+            else:
+                pygame.draw.rect(screen, (80, 100, 200), music_checkbox_rect, border_radius=3)
+                if music_enabled:
+                    # Draw checkmark normally
+                    pygame.draw.line(screen, WHITE, 
+                                     (music_checkbox_rect.left + 5, music_checkbox_rect.centery),
+                                     (music_checkbox_rect.centerx - 2, music_checkbox_rect.bottom - 5), 3)
+                    pygame.draw.line(screen, WHITE, 
+                                     (music_checkbox_rect.centerx - 2, music_checkbox_rect.bottom - 5),
+                                     (music_checkbox_rect.right - 5, music_checkbox_rect.top + 5), 3)
+        
+            # Sound option with fade effect
+            sound_text = render_text(menu_font, "Sound", WHITE)
+            sound_rect = sound_text.get_rect(midright=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 45))
+        
+            # Apply fade effect to sound text during transition
+            if transitioning and not title_visible_during_transition:
+                sound_text = sound_text.copy()  # The cached surface is shared
+                sound_text.set_alpha(fade_alpha)
+        
+            screen.blit(sound_text, sound_rect)
+        
+            # Sound checkbox with fade effect
+            sound_checkbox_rect = pygame.Rect(SCREEN_WIDTH//2 + 50, SCREEN_HEIGHT//2 + 30, 30, 30)
+        
+            # Apply fade effect to sound checkbox during transition
+            if transitioning and not title_visible_during_transition:
+                pygame.draw.rect(screen, (80, 100, 200), sound_checkbox_rect, border_radius=3)
+                if sound_enabled:
+                    # Create checkmark surface with fade effect
+                    checkmark_surface = pygame.Surface((30, 30), pygame.SRCALPHA)
+                    pygame.draw.line(checkmark_surface, WHITE, 
+                                     (5, 15),
+                                     (13, 25), 3)
+                    pygame.draw.line(checkmark_surface, WHITE, 
+                                     (13, 25),
+                                     (25, 5), 3)
+                    checkmark_surface.set_alpha(fade_alpha)
+                    screen.blit(checkmark_surface, sound_checkbox_rect)
+            else:
+                pygame.draw.rect(screen, (80, 100, 200), sound_checkbox_rect, border_radius=3)
+                if sound_enabled:
+                    # Draw checkmark normally
+                    pygame.draw.line(screen, WHITE, 
+                                     (sound_checkbox_rect.left + 5, sound_checkbox_rect.centery),
+                                     (sound_checkbox_rect.centerx - 2, sound_checkbox_rect.bottom - 5), 3)
+                    pygame.draw.line(screen, WHITE, 
+                                     (sound_checkbox_rect.centerx - 2, sound_checkbox_rect.bottom - 5),
+                                     (sound_checkbox_rect.right - 5, sound_checkbox_rect.top + 5), 3)
     
-    # Handle loading screen for Gameplay.py transition
-    if loading_animation_active and transition_target == "GAMEPLAY":
-        # Create loading screen overlay
-        loading_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        loading_surface.fill((0, 0, 0, 200))  # Semi-transparent black
-        screen.blit(loading_surface, (0, 0))
-        
-        # Update loading dots animation
-        current_time = pygame.time.get_ticks()
-        if current_time - last_loading_update > loading_animation_speed:
-            loading_dots = (loading_dots + 1) % 4  # Cycle through 0-3 dots
-            last_loading_update = current_time
-        
-        # Draw loading text
-        loading_text = button_font.render("Loading Gameplay Module", True, WHITE)
-        loading_rect = loading_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 30))
-        screen.blit(loading_text, loading_rect)
-        
-        # Draw animated dots
-        dots_text = "." * loading_dots + " " * (3 - loading_dots)
-        dots_surface = button_font.render(dots_text, True, WHITE)
-        dots_rect = dots_surface.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 10))
-        screen.blit(dots_surface, dots_rect)
-        
-        # Attempt to load Gameplay module after showing loading screen
-        if not gameplay_launch_initiated:
-            gameplay_launch_initiated = True
-            print("Loading Gameplay.py module...")
-            result = transition_to_gameplay()
-            print(f"Gameplay returned: {result}")
-            # Always return to main menu after Gameplay finishes (whether back button was clicked or not)
-            reset_transition_state()
-            current_state = GAME_SCREEN
+        # Handle fade animations for transition state
+        if current_state == TRANSITION_SCREEN or transitioning:
+            if fading_out:
+                # Fade out the current elements
+                fade_alpha -= fade_speed
+                if fade_alpha <= 0:
+                    fade_alpha = 0
+                    fading_out = False
+                    fading_in = True
+                    # Switch to target state
+                    if current_state == TRANSITION_SCREEN:
+                        # Special handling for Gameplay transition
+                        if transition_target == "GAMEPLAY":
+                            # Show loading screen instead of regular fade-in
+                            loading_animation_active = True
+                            print("Showing loading screen for Gameplay.py...")
+                        else:
+                            current_state = transition_target
+        
+            elif fading_in and transition_target != "GAMEPLAY":
+                # Fade in the new elements (only for non-gameplay transitions)
+                fade_alpha += fade_speed
+                if fade_alpha >= 255:
+                    fade_alpha = 255
+                    fading_in = False
+                    transitioning = False
+
     
-    # Update the display
-    pygame.display.flip()
+        # Handle loading screen for Gameplay.py transition
+        if loading_animation_active and transition_target == "GAMEPLAY":
+            if asset_loader is None:
+                # Queue everything the gameplay screens load, decoded on worker threads
+                asset_loader = AssetManager.BackgroundLoader()
+                if load_gameplay_module() is not None and hasattr(Gameplay, 'preload_assets'):
+                    try:
+                        Gameplay.preload_assets(asset_loader)
+                    except Exception as e:
+                        print(f"Could not preload gameplay assets: {e}")
+            loading_progress = asset_loader.poll()
+        
+            # Loading screen overlay (semi-transparent black, reused every frame)
+            screen.blit(AssetManager.get_filled_surface((SCREEN_WIDTH, SCREEN_HEIGHT), (0, 0, 0, 200)), (0, 0))
+        
+            # Draw loading text
+            loading_text = render_text(button_font, "Loading Gameplay Module", WHITE)
+            loading_rect = loading_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 30))
+            screen.blit(loading_text, loading_rect)
+        
+            # Draw progress bar
+            bar_rect = pygame.Rect(0, 0, loading_bar_width, loading_bar_height)
+            bar_rect.center = (SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 15)
+            pygame.draw.rect(screen, (40, 60, 120), bar_rect, border_radius=4)
+            fill_width = int(bar_rect.width * loading_progress)
+            if fill_width > 0:
+                pygame.draw.rect(screen, YELLOW, (bar_rect.left, bar_rect.top, fill_width, bar_rect.height), border_radius=4)
+            pygame.draw.rect(screen, (60, 80, 160), bar_rect, width=2, border_radius=4)
+            percent_surface = render_text(menu_font, f"{int(loading_progress * 100)}%", WHITE)
+            percent_rect = percent_surface.get_rect(center=(SCREEN_WIDTH//2, bar_rect.bottom + 25))
+            screen.blit(percent_surface, percent_rect)
     
-    # Cap the frame rate
-    clock.tick(60)
+    def present(self, screen):
+        global first_frame_shown
+        super().present(screen)
+        
+        # Report the cold-start time once
+        if not first_frame_shown:
+            first_frame_shown = True
+            startup_ms = (time.perf_counter() - startup_started) * 1000
+            print(f"First frame after {startup_ms:.0f} ms (budget {STARTUP_BUDGET_MS} ms)")
+            if startup_ms > STARTUP_BUDGET_MS:
+                print("Warning: startup is over budget")
+
+# Main game loop - the scene manager runs every screen of the game at 60 FPS
+scene_manager = SceneManager.SceneManager(screen, 60)
+scene_manager.push(TitleScene())
+scene_manager.run()
+print(scene_manager.frame_summary())
+
+# Let scores and session logs still being saved reach the disk
+ScoreStore.flush_scores()
+SessionLog.flush_logs()
 
 # Quit pygame
 pygame.quit()
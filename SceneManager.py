@@ -0,0 +1,135 @@
+# One frame loop for the whole game
+#
+# Every screen (title, selection, difficulty, typing) is a Scene on a stack.
+# The SceneManager owns the only event loop and clock: each frame it hands
+# the events to the scene on top, updates it, draws and presents it, then
+# waits for the next frame. Opening a screen pushes a scene, going back pops
+# it - no nested loops, and nothing is reloaded when a scene is uncovered.
+import time
+from collections import deque
+
+import pygame
+
+class Scene:
+    """One screen of the game. Override the hooks that are needed.
+
+    The manager calls enter() when the scene is pushed, resume(result) when
+    the scene above it is popped, and exit() when the scene itself is popped
+    (or the game quits). While on top, every frame it gets handle_event()
+    for each event, then update(), then present().
+    """
+    manager = None  # Set by SceneManager.push()
+
+    def enter(self):
+        """Called when the scene is pushed onto the stack."""
+
+    def exit(self):
+        """Called when the scene is popped, or the game quits while it is on the stack."""
+
+    def resume(self, result):
+        """Called when the scene above this one is popped, with what it returned."""
+
+    def handle_event(self, event):
+        """Handle one event (pygame.QUIT is handled by the manager)."""
+
+    def update(self):
+        """Advance the scene by one frame."""
+
+    def draw(self, screen):
+        """Draw the whole scene."""
+
+    def present(self, screen):
+        """Draw the scene and put it on the display (override for partial updates)."""
+        self.draw(screen)
+        pygame.display.flip()
+
+class SceneManager:
+    """Runs the scene stack with a single frame loop and clock."""
+    def __init__(self, screen, fps=60):
+        self.screen = screen
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.stack = []
+        self.result = None  # What the last scene returned when it was popped
+        self.polled_at = None  # perf_counter() time the current frame's events were read
+        self.frame_times = deque(maxlen=600)  # Milliseconds of work (events to present) per frame
+
+    @property
+    def top(self):
+        """The scene being shown, or None when the stack is empty."""
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        """Show scene on top of the current one."""
+        scene.manager = self
+        self.stack.append(scene)
+        scene.enter()
+
+    def pop(self, result=None):
+        """Close the top scene and go back to the one below, passing it result."""
+        scene = self.stack.pop()
+        scene.exit()
+        if self.stack:
+            self.stack[-1].resume(result)
+        else:
+            self.result = result
+
+    def replace(self, scene):
+        """Swap the top scene for scene (the one below is not resumed)."""
+        self.stack.pop().exit()
+        self.push(scene)
+
+    def quit(self):
+        """Close every scene, top first, which ends run()."""
+        while self.stack:
+            self.stack.pop().exit()
+
+    def run_frame(self):
+        """Run one frame of the top scene."""
+        events = pygame.event.get()
+        self.polled_at = time.perf_counter()
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.quit()
+                return
+            # Whichever scene is on top gets the event - if one switched scenes, the rest of
+            # this frame's events (a KEYUP, say) go to the new scene instead of being lost
+            scene = self.top
+            if scene is None:
+                return
+            scene.handle_event(event)
+        scene = self.top
+        if scene is None:
+            return
+        scene.update()
+        # update() may have switched scenes too - show whichever is on top now
+        scene = self.top
+        if scene is not None:
+            scene.present(self.screen)
+        self.frame_times.append((time.perf_counter() - self.polled_at) * 1000)
+        self.clock.tick(self.fps)
+
+    def run(self):
+        """Run frames until the stack is empty. Returns what the last scene returned."""
+        while self.stack:
+            self.run_frame()
+        return self.result
+
+    def frame_summary(self):
+        """One-line summary of the recent per-frame work times."""
+        if not self.frame_times:
+            return "No frames"
+        times = sorted(self.frame_times)
+        p50 = times[(len(times) - 1) // 2]
+        p95 = times[max(0, -(-len(times) * 95 // 100) - 1)]
+        return f"Frame work over {len(times)} frames: p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {times[-1]:.1f} ms"
+
+def run_scene(scene, screen=None, fps=60):
+    """Run scene in its own SceneManager until it is popped and return its result.
+
+    For running one screen on its own (e.g. TheTypingGame.main()); the game
+    itself pushes scenes onto the manager it already has.
+    """
+    manager = SceneManager(screen or pygame.display.get_surface(), fps)
+    manager.push(scene)
+    return manager.run()
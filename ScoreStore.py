@@ -0,0 +1,201 @@
+# Round results kept in an SQLite database
+#
+# Every finished round's results (what the completion screen shows) are
+# saved as one row. Saving only queues the row: a background thread opens
+# the database, owns the writing connection and commits whatever has queued
+# up in one transaction, so the game never waits on the disk. Reads use their own connection; the
+# database is in WAL mode, so they don't wait for the writer either.
+#
+# Show the saved scores:        python ScoreStore.py
+# Time the queries at scale:    python ScoreStore.py bench [rows]
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCORE_DB_PATH = 'scores.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    played_at REAL NOT NULL,  -- Unix time the round ended
+    difficulty TEXT NOT NULL,
+    wpm INTEGER NOT NULL,
+    accuracy REAL NOT NULL,
+    highest_combo INTEGER NOT NULL,
+    time_ran_out INTEGER NOT NULL,
+    typed INTEGER NOT NULL,
+    mistakes INTEGER NOT NULL,
+    elapsed REAL NOT NULL,  -- Seconds the round took
+    log_path TEXT  -- Session log of the round (see SessionLog.py), if it was recorded
+);
+CREATE INDEX IF NOT EXISTS scores_by_date ON scores (difficulty, played_at);
+CREATE INDEX IF NOT EXISTS scores_by_wpm ON scores (difficulty, wpm);
+-- Only the rounds a ghost can be made of (see best_run_logs)
+CREATE INDEX IF NOT EXISTS finished_runs_by_wpm ON scores (difficulty, wpm) WHERE time_ran_out = 0 AND log_path IS NOT NULL;
+"""
+
+COLUMNS = ("played_at", "difficulty", "wpm", "accuracy", "highest_combo", "time_ran_out", "typed", "mistakes", "elapsed", "log_path")
+INSERT = f"INSERT INTO scores ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+SELECT = f"SELECT {', '.join(COLUMNS)} FROM scores"
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; commits don't wait for an fsync
+    connection.executescript(SCHEMA)
+    return connection
+
+class ScoreStore:
+    """Saves round results with a write-behind thread and answers score queries."""
+    def __init__(self, path=SCORE_DB_PATH):
+        self.path = path
+        self.queue = queue.Queue()
+        self.local = threading.local()  # Read connection per thread (sqlite3 connections stay on one thread)
+        # The writer thread creates the database; readers create the schema too if they get there first
+        self.thread = threading.Thread(target=self.run, name="ScoreStore", daemon=True)
+        self.thread.start()
+
+    def save(self, difficulty, results, played_at=None, log_path=None):
+        """Queue one round's results (TypingSession.results()) to be written."""
+        self.queue.put((
+            played_at if played_at is not None else time.time(),
+            difficulty,
+            results["wpm"],
+            results["accuracy"],
+            results["highest_combo"],
+            int(results["time_ran_out"]),
+            results["typed"],
+            results["mistakes"],
+            results["elapsed"],
+            log_path,
+        ))
+
+    def run(self):
+        try:
+            connection = connect(self.path)
+        except Exception as e:
+            print(f"Could not open the score database {self.path}: {e}")
+            connection = None
+        while True:
+            rows = [self.queue.get()]
+            # Write everything that queued up meanwhile in the same transaction
+            while True:
+                try:
+                    rows.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if connection is None:
+                    raise sqlite3.OperationalError("database is not open")
+                with connection:
+                    connection.executemany(INSERT, rows)
+            except Exception as e:
+                print(f"Could not save {len(rows)} scores: {e}")
+            finally:
+                for _ in rows:
+                    self.queue.task_done()
+
+    def flush(self):
+        """Block until every queued result has been written."""
+        self.queue.join()
+
+    def reader(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = connect(self.path)
+        return connection
+
+    def query(self, sql, parameters):
+        """Rows of sql as dicts keyed by COLUMNS."""
+        return [dict(zip(COLUMNS, row)) for row in self.reader().execute(sql, parameters)]
+
+    def personal_best(self, difficulty):
+        """The highest-WPM round at difficulty, or None if none have been saved."""
+        rows = self.query(f"{SELECT} WHERE difficulty = ? ORDER BY wpm DESC LIMIT 1", (difficulty,))
+        return rows[0] if rows else None
+
+    def top_scores(self, difficulty, limit=10):
+        """The limit highest-WPM rounds at difficulty, best first."""
+        return self.query(f"{SELECT} WHERE difficulty = ? ORDER BY wpm DESC LIMIT ?", (difficulty, limit))
+
+    def best_run_logs(self, difficulty, limit=5):
+        """Session logs of the highest-WPM rounds at difficulty finished before time ran out, best first."""
+        return [row[0] for row in self.reader().execute(
+            "SELECT log_path FROM scores WHERE difficulty = ? AND time_ran_out = 0 AND log_path IS NOT NULL ORDER BY wpm DESC LIMIT ?",
+            (difficulty, limit))]
+
+    def recent_scores(self, difficulty, limit=10, since=None):
+        """The limit latest rounds at difficulty (played after since, if given), newest first."""
+        return self.query(f"{SELECT} WHERE difficulty = ? AND played_at > ? ORDER BY played_at DESC LIMIT ?",
+                          (difficulty, since if since is not None else 0.0, limit))
+
+    def count(self, difficulty=None):
+        if difficulty is None:
+            return self.reader().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        return self.reader().execute("SELECT COUNT(*) FROM scores WHERE difficulty = ?", (difficulty,)).fetchone()[0]
+
+_score_store = None
+_score_store_lock = threading.Lock()
+
+def get_score_store():
+    """Return the shared score store, opening the database on first use."""
+    global _score_store
+    with _score_store_lock:
+        if _score_store is None:
+            _score_store = ScoreStore()
+        return _score_store
+
+def flush_scores():
+    """Wait for queued scores to reach the database (call before the game exits)."""
+    if _score_store is not None:
+        _score_store.flush()
+
+def benchmark(rows=300000, path='scores-bench.db'):
+    """Fill a scratch database with rows random rounds and time the game's queries."""
+    import random
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = ScoreStore(path)
+    started = time.perf_counter()
+    now = time.time()
+    for i in range(rows):
+        typed = random.randint(50, 450)
+        store.save(random.choice(("Easy", "Normal", "Hard")), {
+            "wpm": random.randint(10, 150), "accuracy": random.uniform(70, 100), "highest_combo": random.randint(0, 60),
+            "time_ran_out": random.random() < 0.3, "typed": typed, "mistakes": random.randint(0, 30), "elapsed": random.uniform(20, 120),
+        }, played_at=now - random.uniform(0, 365 * 86400))
+    queued = time.perf_counter() - started
+    store.flush()
+    print(f"Saved {rows} rounds: {queued / rows * 1e6:.1f} us per save() call, {time.perf_counter() - started:.1f} s until all were written")
+
+    queries = [
+        ("personal_best", lambda: store.personal_best("Normal")),
+        ("top_scores", lambda: store.top_scores("Normal")),
+        ("best_run_logs", lambda: store.best_run_logs("Normal")),
+        ("recent_scores (last 30 days)", lambda: store.recent_scores("Normal", 10, now - 30 * 86400)),
+    ]
+    for name, run_query in queries:
+        run_query()
+        repeats = 200
+        started = time.perf_counter()
+        for _ in range(repeats):
+            run_query()
+        print(f"{name}: {(time.perf_counter() - started) / repeats * 1000:.3f} ms")
+    plan = store.reader().execute("EXPLAIN QUERY PLAN SELECT * FROM scores WHERE difficulty = ? ORDER BY wpm DESC LIMIT 10", ("Normal",)).fetchall()
+    print(f"top_scores plan: {plan[-1][-1]}")
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 300000)
+    else:
+        store = get_score_store()
+        for difficulty in ("Easy", "Normal", "Hard"):
+            scores = store.top_scores(difficulty)
+            print(f"{difficulty}: {store.count(difficulty)} rounds")
+            for rank, score in enumerate(scores, 1):
+                played = time.strftime('%Y-%m-%d %H:%M', time.localtime(score['played_at']))
+                print(f"  {rank:2d}. {score['wpm']:3d} WPM  {score['accuracy']:5.1f}%  combo {score['highest_combo']:2d}  {played}")
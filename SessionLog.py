@@ -0,0 +1,283 @@
+# Compact binary keystroke logs for typing sessions
+# A log holds everything needed to replay a session through TypingSession
+#
+# Run this file to check that a saved log reads back unchanged:
+#   python SessionLog.py
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+from TypingCore import BACKSPACE, WORD_BACKSPACE, TypingSession
+
+# File layout: header, difficulty (UTF-8), paragraph text (UTF-8), then one
+# fixed-width record per key
+LOG_MAGIC = b'PTKL'
+LOG_VERSION = 1
+HEADER = struct.Struct('<4sHddHI')  # magic, version, time limit, wall-clock start, difficulty bytes, paragraph bytes
+RECORD = struct.Struct('<dIB')  # seconds since the first key, code point, flags (13 bytes)
+
+# Record flags
+FLAG_CORRECT = 1  # The typed character matched the paragraph
+FLAG_BACKSPACE = 2
+FLAG_WORD_BACKSPACE = 4
+FLAG_NO_TEXT = 8  # A key that typed nothing but started the timer
+FLAG_END = 16  # When the round ended or was left (not a key)
+
+UNKNOWN_CHAR = 0xFFFD  # Stored for key presses that produced more than one character
+
+# Where finished logs are written
+SESSION_LOG_DIR = 'sessions'
+SESSION_LOG_EXTENSION = '.ptlog'
+
+class KeystrokeRecorder:
+    """Collects the keys of one session as fixed-width binary records.
+
+    Pass it to TypingSession(recorder=...) and every key the session handles
+    is appended to a bytearray - no per-key objects or JSON.
+    """
+    def __init__(self, paragraph_text, time_limit, difficulty=""):
+        self.paragraph_text = paragraph_text
+        self.time_limit = time_limit
+        self.difficulty = difficulty
+        self.started_at = time.time()  # Wall-clock time, for naming and sorting logs
+        self.origin = None  # Session time of the first key
+        self.records = bytearray()
+        self.saved_path = None
+
+    def __len__(self):
+        return len(self.records) // RECORD.size
+
+    def record(self, now, key, is_correct=False):
+        """Append one key handled by the session at session time now."""
+        if self.origin is None:
+            self.origin = now
+        if key is None:
+            code, flags = 0, FLAG_NO_TEXT
+        elif key == BACKSPACE:
+            code, flags = 0, FLAG_BACKSPACE
+        elif key == WORD_BACKSPACE:
+            code, flags = 0, FLAG_WORD_BACKSPACE
+        else:
+            code = ord(key) if len(key) == 1 else UNKNOWN_CHAR
+            flags = FLAG_CORRECT if is_correct else 0
+        self.records += RECORD.pack(now - self.origin, code, flags)
+
+    def finish(self, now):
+        """Mark the time the round ended or was left, so replays know whether the timer ran out."""
+        if self.origin is not None:
+            self.records += RECORD.pack(now - self.origin, 0, FLAG_END)
+
+    def to_bytes(self):
+        """Serialize the whole log."""
+        difficulty = self.difficulty.encode('utf-8')
+        paragraph = self.paragraph_text.encode('utf-8')
+        header = HEADER.pack(LOG_MAGIC, LOG_VERSION, self.time_limit, self.started_at, len(difficulty), len(paragraph))
+        return header + difficulty + paragraph + bytes(self.records)
+
+    def save(self, directory=SESSION_LOG_DIR):
+        """Queue the log to be written in the background and return its path.
+
+        Sessions without any keys are not saved. Saving twice is a no-op.
+        """
+        if self.saved_path is not None or not self.records:
+            return self.saved_path
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        millis = int(self.started_at * 1000) % 1000
+        name = f"{self.difficulty or 'session'}-{stamp}-{millis:03d}{SESSION_LOG_EXTENSION}"
+        self.saved_path = os.path.join(directory, name)
+        get_log_writer().submit(self.saved_path, self.to_bytes())
+        return self.saved_path
+
+class SessionLog:
+    """A session log read back from disk."""
+    def __init__(self, data):
+        magic, version, time_limit, started_at, difficulty_length, paragraph_length = HEADER.unpack_from(data, 0)
+        if magic != LOG_MAGIC:
+            raise ValueError("Not a Pixel Typers session log")
+        if version != LOG_VERSION:
+            raise ValueError(f"Unsupported session log version: {version}")
+        offset = HEADER.size
+        self.time_limit = time_limit
+        self.started_at = started_at
+        self.difficulty = data[offset:offset + difficulty_length].decode('utf-8')
+        offset += difficulty_length
+        self.paragraph_text = data[offset:offset + paragraph_length].decode('utf-8')
+        offset += paragraph_length
+
+        record_count = (len(data) - offset) // RECORD.size
+        self.timestamps = array('d')  # Seconds since the first key
+        self.codes = array('I')
+        self.flags = bytearray()
+        self.end_time = None  # Seconds from the first key to the end of the round, if recorded
+        for timestamp, code, flags in RECORD.iter_unpack(data[offset:offset + record_count * RECORD.size]):
+            if flags & FLAG_END:
+                self.end_time = timestamp
+                continue
+            self.timestamps.append(timestamp)
+            self.codes.append(code)
+            self.flags.append(flags)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def key(self, index):
+        """The TypingSession key of record index."""
+        flags = self.flags[index]
+        if flags & FLAG_BACKSPACE:
+            return BACKSPACE
+        if flags & FLAG_WORD_BACKSPACE:
+            return WORD_BACKSPACE
+        if flags & FLAG_NO_TEXT:
+            return None
+        return chr(self.codes[index])
+
+    def events(self, start_time=0.0):
+        """(timestamp, key) pairs for TypingSession.press / simulate, offset by start_time."""
+        return [(start_time + self.timestamps[i], self.key(i)) for i in range(len(self.timestamps))]
+
+    @property
+    def duration(self):
+        """Seconds from the first key to the end of the round (or the last key)."""
+        if self.end_time is not None:
+            return self.end_time
+        return self.timestamps[-1] if self.timestamps else 0.0
+
+def read_session_log(path):
+    """Load a session log written by KeystrokeRecorder.save()."""
+    with open(path, 'rb') as log_file:
+        return SessionLog(log_file.read())
+
+def read_log_paragraph(path):
+    """The paragraph a log was typed on, without reading its keys."""
+    with open(path, 'rb') as log_file:
+        magic, version, time_limit, started_at, difficulty_length, paragraph_length = HEADER.unpack(log_file.read(HEADER.size))
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError("Not a readable Pixel Typers session log")
+        log_file.seek(difficulty_length, os.SEEK_CUR)
+        return log_file.read(paragraph_length).decode('utf-8')
+
+class GhostRun:
+    """A recorded run played back as a caret position over time, to race against.
+
+    The caret after every key is worked out once by replaying the log through
+    a TypingSession; after that, position(elapsed) is a binary search over
+    the log's timestamp array.
+    """
+    def __init__(self, log):
+        self.log = log
+        self.timestamps = log.timestamps
+        self.positions = array('I')  # Caret after each record
+        session = TypingSession(log.paragraph_text, log.time_limit)
+        for index in range(len(log)):
+            session.press(log.key(index), log.timestamps[index])
+            self.positions.append(session.current_char_index)
+        if log.end_time is not None:
+            session.update(log.end_time)
+        self.results = session.results()
+
+    def position(self, elapsed):
+        """Where the caret was elapsed seconds after the first key."""
+        index = bisect_right(self.timestamps, elapsed)
+        return self.positions[index - 1] if index else 0
+
+def find_best_run(paragraph_text, log_paths):
+    """The first of log_paths (best first, e.g. ScoreStore.best_run_logs()) holding a finished run of
+    paragraph_text, as a GhostRun (None if there isn't one)."""
+    for path in log_paths:
+        try:
+            if read_log_paragraph(path) != paragraph_text:
+                continue
+            run = GhostRun(read_session_log(path))
+        except Exception as e:
+            print(f"Skipping session log {path}: {e}")
+            continue
+        if run.results["completed"] and not run.results["time_ran_out"]:
+            return run
+    return None
+
+class SessionLogWriter:
+    """Writes finished session logs on a background thread."""
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="SessionLogWriter", daemon=True)
+        self.thread.start()
+
+    def submit(self, path, data):
+        """Queue data to be written to path."""
+        self.queue.put((path, data))
+
+    def run(self):
+        while True:
+            path, data = self.queue.get()
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                # Write to a temporary file first so readers never see half a log
+                temp_path = path + '.tmp'
+                with open(temp_path, 'wb') as log_file:
+                    log_file.write(data)
+                os.replace(temp_path, path)
+            except Exception as e:
+                print(f"Could not write session log {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Block until every queued log has been written."""
+        self.queue.join()
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+def get_log_writer():
+    """Return the shared background log writer, starting it on first use."""
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = SessionLogWriter()
+        return _log_writer
+
+def flush_logs():
+    """Wait for queued session logs to reach the disk (call before the game exits)."""
+    if _log_writer is not None:
+        _log_writer.flush()
+
+def self_check():
+    """Record a short session, save and flush it, and check that the log reads back the same."""
+    import shutil
+    import tempfile
+    paragraph = "the quick brown fox"
+    keys = [(1.0, 't'), (1.2, 'h'), (1.3, 'r'), (1.6, BACKSPACE), (1.8, 'e'), (2.0, ' '), (2.3, 'q'), (2.5, WORD_BACKSPACE), (2.9, 'q')]
+    recorder = KeystrokeRecorder(paragraph, 60, "Check")
+    session = TypingSession(paragraph, 60, recorder=recorder)
+    for now, key in keys:
+        session.press(key, now)
+    recorder.finish(3.5)
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = recorder.save(directory)
+        flush_logs()
+        log = read_session_log(path)
+    finally:
+        shutil.rmtree(directory)
+    replayed = [(round(timestamp, 6), key) for timestamp, key in log.events(keys[0][0])]
+    checks = [
+        ("paragraph", log.paragraph_text == paragraph),
+        ("difficulty", log.difficulty == "Check"),
+        ("time limit", log.time_limit == 60),
+        ("keys", replayed == keys),
+        ("end time", log.end_time == 2.5),
+    ]
+    for name, ok in checks:
+        print(f"{name}: {'ok' if ok else 'MISMATCH'}")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    import sys
+    ok = self_check()
+    print("OK" if ok else "FAILED - the log did not read back unchanged")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,48 @@
+# Cache of rendered text surfaces, shared by Pixel Typers.py, Gameplay.py and
+# TheTypingGame.py
+#
+# Most UI text is the same from frame to frame (titles, labels, the timer
+# between seconds), so each (font, text, color, antialias) is rasterized once
+# and the surface reused until it falls out of the cache.
+from collections import OrderedDict
+
+class TextCache:
+    """Bounded LRU cache of font.render() results.
+
+    Callers get shared surfaces - copy one before calling set_alpha() or
+    drawing on it.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()  # (font, text, color, antialias) -> Surface, oldest first
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        """Return the rendered surface for text, rendering it on first use."""
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Drop every cached surface."""
+        self.surfaces.clear()
+
+# Shared cache used by all screens
+text_cache = TextCache()
+
+def render_text(font, text, color, antialias=True):
+    """Render text through the shared cache (same as font.render, but reused)."""
+    return text_cache.render(font, text, color, antialias)
@@ -2,34 +2,29 @@ import pygame
 import sys
 import os
 import time
-try:
-    import imageio
-    import numpy as np
-except ImportError:
-    print("imageio or numpy module not found. Please install it with: pip install imageio numpy")
-    imageio = None
-    np = None
-
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    print("PIL/Pillow not available, using imageio for GIF loading")
-
-# Initialize pygame
-pygame.init()
-
-# Screen dimensions and display
+import math
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+import AssetManager
+import SceneManager
+import ScoreStore
+from TextCache import render_text
+from TypingCore import BACKSPACE, WORD_BACKSPACE, ScaledClock, TypingSession, calculate_wpm, calculate_accuracy
+from SessionLog import KeystrokeRecorder, SessionLog, find_best_run, flush_logs, read_session_log
+
+# Race modules (asyncio, NumPy) - imported when the first race is set up (see
+# load_race_modules), so practice rounds never load them
+Bots = None
+Multiplayer = None
+NetworkPump = None
+
+# Screen dimensions and display - the display and fonts are set up by
+# ensure_initialized() on first use, so importing this module is cheap
 SCREEN_WIDTH = 960
 SCREEN_HEIGHT = 540
-existing_screen = pygame.display.get_surface()
-if existing_screen:
-    screen = existing_screen
-    SCREEN_WIDTH, SCREEN_HEIGHT = existing_screen.get_size()
-else:
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Pixel Typers - Typing Game")
+screen = None
 
 # Colors (matching Gameplay.py)
 WHITE = (255, 255, 255)
@@ -41,23 +36,80 @@ BACKGROUND_COLOR = (20, 30, 48)  # Hex #141E30 - same as Gameplay.py
 GREEN = (0, 255, 0)
 RED = (255, 0, 0)
 UNTYPED_COLOR = (150, 150, 150)  # Gray color for untyped text (semi-transparent look)
+MISTAKE_BOX_COLOR = (255, 0, 0, 100)  # Red with transparency, drawn over mistyped characters
+CURSOR_BOX_COLOR = (100, 100, 100, 150)  # Gray with transparency, behind the current character
+GHOST_BOX_COLOR = (0, 170, 255, 90)  # Blue with transparency, where your best run's caret was
 
-# Font setup
+# Font setup (fonts are loaded by ensure_initialized())
 font_path = os.path.join('fonts', 'fs-pixel-sans-unicode-regular.ttf')
-try:
-    title_font = pygame.font.Font(font_path, 48)
-    button_font = pygame.font.Font(font_path, 36)
-    text_font = pygame.font.Font(font_path, 36)  # Font for the paragraph text
-    ui_font = pygame.font.Font(font_path, 24)  # Font for UI elements
-    stats_font = pygame.font.Font(font_path, 28)  # Font for WPM
-    combo_font = pygame.font.Font(font_path, 40)  # Font for COMBO (larger)
-except:
-    title_font = pygame.font.SysFont('Arial', 48)
-    button_font = pygame.font.SysFont('Arial', 36)
-    text_font = pygame.font.SysFont('Arial', 36)
-    ui_font = pygame.font.SysFont('Arial', 24)
-    stats_font = pygame.font.SysFont('Arial', 28)
-    combo_font = pygame.font.SysFont('Arial', 40)
+title_font = None
+button_font = None
+text_font = None  # Font for the paragraph text
+ui_font = None  # Font for UI elements
+stats_font = None  # Font for WPM
+combo_font = None  # Font for COMBO (larger)
+
+def ensure_initialized():
+    """Set up the display and fonts the first time the typing game needs them."""
+    global screen, SCREEN_WIDTH, SCREEN_HEIGHT
+    global title_font, button_font, text_font, ui_font, stats_font, combo_font
+    if screen is not None and pygame.display.get_surface() is screen:
+        return
+    
+    if not pygame.display.get_init():
+        pygame.display.init()
+    # Prefer reusing the existing window created by Pixel Typers
+    existing_screen = pygame.display.get_surface()
+    if existing_screen:
+        screen = existing_screen
+        SCREEN_WIDTH, SCREEN_HEIGHT = existing_screen.get_size()
+    else:
+        # Running on its own - open a window
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Pixel Typers - Typing Game")
+    
+    title_font = AssetManager.get_font(font_path, 48)
+    button_font = AssetManager.get_font(font_path, 36)
+    text_font = AssetManager.get_font(font_path, 36)
+    ui_font = AssetManager.get_font(font_path, 24)
+    stats_font = AssetManager.get_font(font_path, 28)
+    combo_font = AssetManager.get_font(font_path, 40)
+
+# Flame drawn behind the combo counter
+FLAME_IMAGE_PATH = os.path.join('images', 'flame-lit.gif')
+
+def preload_assets(loader):
+    """Queue the typing screen's fonts and images on an AssetManager.BackgroundLoader."""
+    loader.add_font(font_path, (48, 36, 24, 28, 40))
+    loader.add_gif(FLAME_IMAGE_PATH)
+
+# Paragraph render modes
+RENDER_MODE_GLYPHS = "glyphs"  # Draw every character from the glyph atlas
+RENDER_MODE_LINES = "lines"  # Blit pre-rendered untyped/typed line surfaces
+PARAGRAPH_RENDER_MODE = RENDER_MODE_LINES
+
+# Redraw only the parts of the typing screen that changed each frame
+# (set to False to fill and flip the whole screen every frame)
+USE_DIRTY_RECTS = True
+
+# Save a binary keystroke log of every round (see SessionLog.py)
+RECORD_SESSIONS = True
+
+# Measure how long each keystroke takes to reach the display and print
+# p50/p95/p99 at the end of every round
+MEASURE_LATENCY = True
+
+# Save every finished round's results to the score database (see ScoreStore.py)
+RECORD_SCORES = True
+
+# Race a ghost of your fastest finished run of the same paragraph (found through the score
+# database, so it needs RECORD_SCORES and RECORD_SESSIONS)
+SHOW_GHOST = True
+
+# Keys that never type anything (Shift, Ctrl, Alt, etc.)
+MODIFIER_KEYS = (pygame.K_LSHIFT, pygame.K_RSHIFT, pygame.K_LCTRL, pygame.K_RCTRL,
+                 pygame.K_LALT, pygame.K_RALT, pygame.K_LMETA, pygame.K_RMETA,
+                 pygame.K_CAPSLOCK, pygame.K_TAB)
 
 # Back button specifications
 BACK_BUTTON_SIZE = 44
@@ -106,8 +158,8 @@ class InteractiveButton:
     def load_images(self, base_image_path):
         """Load button images for different states."""
         try:
-            if os.path.exists(base_image_path):
-                original_image = pygame.image.load(base_image_path).convert_alpha()
+            original_image = AssetManager.get_image(base_image_path)
+            if original_image is not None:
                 self.normal_image = pygame.transform.scale(original_image, (self.rect.width, self.rect.height))
                 self.current_image = self.normal_image
                 
@@ -177,6 +229,101 @@ def draw_pause_button(screen, x, y, size):
     # Right line
     pygame.draw.rect(screen, WHITE, (x + line_width + spacing, y + 5, line_width, line_height))
 
+class GlyphAtlas:
+    """Cache of rasterized glyphs packed into one shared surface.
+
+    Each (font, color, character) is rendered once and kept as a sub-rect of
+    the atlas surface, so drawing a character is a single blit from the atlas.
+    A pygame Font object is one face at one size, so it covers both in the key.
+    When the atlas is full (or holds max_glyphs entries) the least recently
+    used glyphs are evicted and their cells are reused.
+    """
+    def __init__(self, width=1024, height=1024, max_glyphs=2048):
+        self.width = width
+        self.height = height
+        self.max_glyphs = max_glyphs
+        self.surface = None  # Created on first use
+        self.glyphs = OrderedDict()  # key -> (glyph rect, cell rect), oldest first
+        self.free_cells = []  # Cells released by eviction, reused before new space
+        self.shelves = []  # Rows of cells: [y, height, next_x]
+        self.next_shelf_y = 0
+    
+    def get(self, font, char, color):
+        """Return the atlas rect holding char rendered with font and color."""
+        key = (font, color, char)
+        entry = self.glyphs.get(key)
+        if entry is not None:
+            self.glyphs.move_to_end(key)
+            return entry[0]
+        return self.add(key, font.render(char, True, color))
+    
+    def blit(self, target, font, char, color, position):
+        """Draw a cached glyph onto target and return its width."""
+        rect = self.get(font, char, color)
+        target.blit(self.surface, position, rect)
+        return rect.width
+    
+    def add(self, key, glyph_surface):
+        """Copy a freshly rendered glyph into the atlas."""
+        if self.surface is None:
+            self.surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        
+        glyph_width, glyph_height = glyph_surface.get_size()
+        if len(self.glyphs) >= self.max_glyphs:
+            self.evict_oldest()
+        
+        cell = self.allocate(glyph_width, glyph_height)
+        while cell is None and self.glyphs:
+            self.evict_oldest()
+            cell = self.allocate(glyph_width, glyph_height)
+        if cell is None:
+            # Free cells are too fragmented for this glyph - start over
+            self.clear()
+            cell = self.allocate(glyph_width, glyph_height)
+            if cell is None:
+                raise ValueError(f"Glyph {key[2]!r} is larger than the glyph atlas")
+        
+        rect = pygame.Rect(cell.x, cell.y, glyph_width, glyph_height)
+        # Clear the cell and copy the glyph pixels (including alpha) unchanged
+        self.surface.fill((0, 0, 0, 0), cell)
+        self.surface.blit(glyph_surface, rect.topleft, special_flags=pygame.BLEND_RGBA_MAX)
+        self.glyphs[key] = (rect, cell)
+        return rect
+    
+    def allocate(self, width, height):
+        """Find room for a width x height glyph, or return None if full."""
+        for i, cell in enumerate(self.free_cells):
+            if cell.width >= width and cell.height >= height:
+                return self.free_cells.pop(i)
+        
+        for shelf in self.shelves:
+            shelf_y, shelf_height, next_x = shelf
+            if shelf_height >= height and next_x + width <= self.width:
+                shelf[2] = next_x + width
+                return pygame.Rect(next_x, shelf_y, width, shelf_height)
+        
+        # Open a new shelf below the existing ones
+        if self.next_shelf_y + height <= self.height and width <= self.width:
+            self.shelves.append([self.next_shelf_y, height, width])
+            self.next_shelf_y += height
+            return pygame.Rect(0, self.shelves[-1][0], width, height)
+        return None
+    
+    def evict_oldest(self):
+        """Drop the least recently used glyph and free its cell."""
+        _, (_, cell) = self.glyphs.popitem(last=False)
+        self.free_cells.append(cell)
+    
+    def clear(self):
+        """Forget every cached glyph."""
+        self.glyphs.clear()
+        self.free_cells = []
+        self.shelves = []
+        self.next_shelf_y = 0
+
+# Shared glyph cache for the paragraph renderers
+glyph_atlas = GlyphAtlas()
+
 def wrap_text(text, font, max_width):
     """Wrap text to fit within max_width."""
     words = text.split(' ')
@@ -202,509 +349,1124 @@ def wrap_text(text, font, max_width):
     
     return lines
 
+class ParagraphLayout:
+    """Precomputed position of every character of a wrapped paragraph.
+    
+    Built once per (text, font, max_width) using the same line breaks as
+    wrap_text. Offsets are relative to the paragraph's top-left corner, so one
+    layout serves any start position. The space a line was broken at stays at
+    the end of that line, which keeps character indexes aligned with the text.
+    """
+    def __init__(self, text, font, max_width):
+        self.text = text
+        self.line_height = font.get_height()
+        self.space_width = font.size(' ')[0]
+        self.lines = wrap_text(text, font, max_width)
+        self.xs = array('i')  # Per-character x offset
+        self.ys = array('i')  # Per-character y offset
+        self.widths = array('i')  # Per-character advance width
+        self.line_starts = array('i')  # Index of the first character of each line
+        
+        char_widths = {}
+        index = 0
+        for line_number, line in enumerate(self.lines):
+            self.line_starts.append(index)
+            line_end = index + len(line)
+            if line_number < len(self.lines) - 1:
+                line_end += 1  # Include the space the line was broken at
+            x = 0
+            y = line_number * self.line_height
+            for char in text[index:line_end]:
+                width = char_widths.get(char)
+                if width is None:
+                    width = char_widths[char] = font.size(char)[0]
+                self.xs.append(x)
+                self.ys.append(y)
+                self.widths.append(width)
+                x += width
+            index = line_end
+        
+        self.height = len(self.lines) * self.line_height
+    
+    def __len__(self):
+        return len(self.xs)
+    
+    def line_range(self, line_number):
+        """Return (start, end) character indexes of a line."""
+        start = self.line_starts[line_number]
+        if line_number + 1 < len(self.line_starts):
+            return start, self.line_starts[line_number + 1]
+        return start, len(self.xs)
+    
+    def cell_rect(self, index, start_x, start_y):
+        """Return the screen Rect of character index for a paragraph drawn at start_x, start_y."""
+        cell_x, cell_y, cell_width, cell_height = self.cell(index)
+        return pygame.Rect(start_x + cell_x, start_y + cell_y, cell_width, cell_height)
+    
+    def line_of(self, index):
+        """Return the line number that holds character index."""
+        return max(0, bisect_right(self.line_starts, index) - 1)
+    
+    def cell(self, index):
+        """Return (x, y, width, height) of character index relative to the paragraph.
+        
+        Indexes past the end continue the last line in space-sized cells.
+        """
+        if index < len(self.xs):
+            return (self.xs[index], self.ys[index], self.widths[index], self.line_height)
+        if not self.xs:
+            return (0, 0, self.space_width, self.line_height)
+        end_x = self.xs[-1] + self.widths[-1] + (index - len(self.xs)) * self.space_width
+        return (end_x, self.ys[-1], self.space_width, self.line_height)
+
+# Layouts are cached per (text, font, max_width)
+_layout_cache = {}
+
+def get_paragraph_layout(text, font, max_width):
+    """Return the cached ParagraphLayout for text, building it on first use."""
+    key = (text, font, max_width)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        if len(_layout_cache) >= 32:
+            _layout_cache.clear()
+        layout = _layout_cache[key] = ParagraphLayout(text, font, max_width)
+    return layout
+
+class LineSurfaceRenderer:
+    """Draws a paragraph from pre-rendered line surfaces.
+    
+    Every wrapped line is rendered twice, once in UNTYPED_COLOR and once in
+    WHITE, with glyphs placed at the layout's offsets so both layers line up
+    with the cursor box. Typing progress is the white layer clipped to the
+    typed prefix, plus a cached per-line overlay that puts the gray character
+    and a red box back over each mistake.
+    """
+    def __init__(self, layout, font, background_color=BACKGROUND_COLOR):
+        self.layout = layout
+        self.font = font
+        self.background_color = background_color
+        self.untyped_lines = []
+        self.typed_lines = []
+        for line_number in range(len(layout.lines)):
+            self.untyped_lines.append(self.render_line(line_number, UNTYPED_COLOR))
+            self.typed_lines.append(self.render_line(line_number, WHITE))
+        # Mistake overlays are rebuilt only when a line's typed states change
+        self.mistake_overlays = [None] * len(layout.lines)
+        self.overlay_states = [None] * len(layout.lines)
+    
+    def line_width(self, start, end):
+        """Width of the characters start..end-1 of the paragraph."""
+        if end <= start:
+            return 0
+        return self.layout.xs[end - 1] + self.layout.widths[end - 1] - self.layout.xs[start]
+    
+    def render_line(self, line_number, color):
+        """Render one wrapped line from the glyph atlas in a single color."""
+        start, end = self.layout.line_range(line_number)
+        line_surface = pygame.Surface((max(1, self.line_width(start, end)), self.layout.line_height), pygame.SRCALPHA)
+        for i in range(start, end):
+            glyph_rect = glyph_atlas.get(self.font, self.layout.text[i], color)
+            # Copy the glyph pixels unchanged onto the transparent line
+            line_surface.blit(glyph_atlas.surface, (self.layout.xs[i], 0), glyph_rect, special_flags=pygame.BLEND_RGBA_MAX)
+        return line_surface
+    
+    def mistake_overlay(self, line_number, states):
+        """Return the cached mistake overlay for a line, rebuilding it if states changed."""
+        states = bytes(states)  # Snapshot - states may be a live view of the typed flags
+        if states == self.overlay_states[line_number]:
+            return self.mistake_overlays[line_number]
+        
+        start, _ = self.layout.line_range(line_number)
+        overlay = None
+        for offset, is_correct in enumerate(states):
+            if is_correct:
+                continue
+            if overlay is None:
+                overlay = pygame.Surface(self.untyped_lines[line_number].get_size(), pygame.SRCALPHA)
+            # Opaque cell: background, gray character, then the red mistake box
+            x = self.layout.xs[start + offset]
+            cell = pygame.Rect(x, 0, self.layout.widths[start + offset], self.layout.line_height)
+            overlay.fill(self.background_color, cell)
+            overlay.blit(self.untyped_lines[line_number], cell, cell)
+            overlay.blit(AssetManager.get_filled_surface(cell.size, MISTAKE_BOX_COLOR), cell)
+        
+        self.mistake_overlays[line_number] = overlay
+        self.overlay_states[line_number] = states
+        return overlay
+    
+    def draw(self, screen, start_x, start_y, typed_chars):
+        """Draw the paragraph with typing progress from typed_chars."""
+        typed_count = len(typed_chars)
+        line_height = self.layout.line_height
+        for line_number, untyped_line in enumerate(self.untyped_lines):
+            line_y = start_y + line_number * line_height
+            screen.blit(untyped_line, (start_x, line_y))
+            
+            start, end = self.layout.line_range(line_number)
+            if typed_count <= start:
+                continue
+            typed_end = min(typed_count, end)
+            typed_width = self.line_width(start, typed_end)
+            screen.blit(self.typed_lines[line_number], (start_x, line_y), (0, 0, typed_width, line_height))
+            
+            overlay = self.mistake_overlay(line_number, typed_chars[start:typed_end])
+            if overlay is not None:
+                screen.blit(overlay, (start_x, line_y))
+
+# Line renderers are cached per layout
+_line_renderer_cache = {}
+
+def get_line_renderer(layout, font):
+    """Return the cached LineSurfaceRenderer for a paragraph layout."""
+    key = (layout, font)
+    renderer = _line_renderer_cache.get(key)
+    if renderer is None:
+        if len(_line_renderer_cache) >= 32:
+            _line_renderer_cache.clear()
+        renderer = _line_renderer_cache[key] = LineSurfaceRenderer(layout, font)
+    return renderer
+
 def render_colored_text(screen, text, font, start_x, start_y, max_width, typed_chars, cursor_index=None):
     """Render text with different colors based on typing status."""
-    current_x = start_x
-    current_y = start_y
-    line_height = font.get_height()
-    cursor_pos = None  # Store cursor position
+    layout = get_paragraph_layout(text, font, max_width)
+    xs = layout.xs
+    ys = layout.ys
+    typed_count = len(typed_chars)
     
     for i, char in enumerate(text):
-        # Determine color based on typing status
-        if i < len(typed_chars):
-            # Character has been typed
-            if typed_chars[i]:
-                color = WHITE  # Correctly typed - turn white
-            else:
-                # Incorrectly typed - keep it gray (don't turn red)
-                color = UNTYPED_COLOR
+        # Correctly typed characters turn white; mistakes and untyped text stay gray
+        if i < typed_count and typed_chars[i]:
+            color = WHITE
         else:
-            # Not yet typed - gray/transparent
             color = UNTYPED_COLOR
-        
-        # Check if we need to wrap to next line
-        char_surface = font.render(char, True, color)
-        char_width = char_surface.get_width()
-        
-        # Check if adding this character would exceed the max width
-        # Wrap at spaces to prevent overflow
-        if char == ' ' and current_x + char_width > start_x + max_width:
-            # Move to next line
-            current_x = start_x
-            current_y += line_height
-        elif char != ' ' and current_x + char_width > start_x + max_width:
-            # If a non-space character would overflow, wrap to next line anyway
-            current_x = start_x
-            current_y += line_height
-        
-        # Store cursor position if this is the current character to type
-        if cursor_index is not None and i == cursor_index:
-            cursor_pos = (current_x, current_y, char_width, line_height)
-        
-        screen.blit(char_surface, (current_x, current_y))
-        current_x += char_width
+        glyph_rect = glyph_atlas.get(font, char, color)
+        screen.blit(glyph_atlas.surface, (start_x + xs[i], start_y + ys[i]), glyph_rect)
     
-    return cursor_pos  # Return cursor position for drawing the indicator
+    # Return cursor position for drawing the indicator
+    if cursor_index is not None and cursor_index < len(layout):
+        cursor_x, cursor_y, cursor_width, cursor_height = layout.cell(cursor_index)
+        return (start_x + cursor_x, start_y + cursor_y, cursor_width, cursor_height)
+    return None
 
 def render_user_input(screen, user_input, expected_text, font, start_x, start_y, max_width):
     """Render what the user has typed so far, overlaid on the sentence."""
-    # Use the same positioning logic as render_colored_text to ensure perfect alignment
-    # We need to match the exact position of each character in the expected text
-    current_x = start_x
-    current_y = start_y
-    line_height = font.get_height()
-    
-    # Track position in expected text for alignment
-    expected_index = 0
+    # Positions come from the expected text's layout so every typed character
+    # sits exactly on top of the character it was meant to be
+    layout = get_paragraph_layout(expected_text, font, max_width)
+    expected_length = len(expected_text)
     
     for i, typed_char in enumerate(user_input):
-        # Determine color - compare with expected character
-        if expected_index < len(expected_text):
-            expected_char = expected_text[expected_index]
-            is_correct = (typed_char == expected_char)
-        else:
-            # Extra characters typed
-            is_correct = False
-        
-        # Get the width of the expected character (for alignment) and typed character (for rendering)
-        expected_char_surface = font.render(expected_char if expected_index < len(expected_text) else ' ', True, UNTYPED_COLOR)
-        expected_char_width = expected_char_surface.get_width()
-        
-        # Check if we need to wrap to next line (use expected text's wrapping logic)
-        # This ensures alignment with the original text
-        if expected_index < len(expected_text):
-            # Wrap at spaces or if character would overflow
-            if expected_char == ' ' and current_x + expected_char_width > start_x + max_width:
-                # Move to next line (matching the original text wrapping)
-                current_x = start_x
-                current_y += line_height
-            elif expected_char != ' ' and current_x + expected_char_width > start_x + max_width:
-                # If a non-space character would overflow, wrap to next line anyway
-                current_x = start_x
-                current_y += line_height
-        
-        # If correct, render the typed character in white
-        if is_correct:
-            typed_char_surface = font.render(typed_char, True, WHITE)
-            screen.blit(typed_char_surface, (current_x, current_y))
+        cell_x, cell_y, cell_width, cell_height = layout.cell(i)
+        position = (start_x + cell_x, start_y + cell_y)
+        
+        # Extra characters past the end of the text are always mistakes
+        if i < expected_length and typed_char == expected_text[i]:
+            # If correct, render the typed character in white
+            glyph_atlas.blit(screen, font, typed_char, WHITE, position)
         else:
             # If incorrect, draw a transparent red rectangle instead of showing the character
-            mistake_box = pygame.Surface((expected_char_width, line_height), pygame.SRCALPHA)
-            mistake_box.fill((255, 0, 0, 100))  # Red with transparency (more transparent)
-            screen.blit(mistake_box, (current_x, current_y))
+            screen.blit(AssetManager.get_filled_surface((cell_width, cell_height), MISTAKE_BOX_COLOR), position)
+
+class DirtyRegions:
+    """Tracks which parts of the screen changed since the last frame.
+    
+    Each named region reports a signature of what it shows and the rect it
+    covers; when the signature changes, both the old and the new rect are
+    marked dirty. present() redraws the scene clipped to each dirty rect and
+    pushes only those rects to the display.
+    """
+    def __init__(self):
+        self.regions = {}  # name -> (signature, rect)
+        self.rects = []
+        self.full_redraw = True
+    
+    def track(self, name, signature, rect):
+        """Mark a region dirty if what it shows has changed."""
+        previous = self.regions.get(name)
+        if previous is not None and previous[0] == signature:
+            return
+        if previous is not None:
+            self.add(previous[1])
+        self.add(rect)
+        self.regions[name] = (signature, pygame.Rect(rect))
+    
+    def add(self, rect):
+        """Mark an area of the screen dirty."""
+        if rect.width > 0 and rect.height > 0:
+            self.rects.append(pygame.Rect(rect))
+    
+    def invalidate_all(self):
+        """Redraw and flip the whole screen on the next present()."""
+        self.full_redraw = True
+    
+    def merged_rects(self):
+        """Return the dirty rects with overlapping ones combined."""
+        merged = []
+        for rect in self.rects:
+            for i, other in enumerate(merged):
+                if rect.colliderect(other):
+                    merged[i] = other.union(rect)
+                    break
+            else:
+                merged.append(rect)
+        return merged
+    
+    def present(self, screen, draw_scene, background_color):
+        """Redraw the dirty areas with draw_scene and update the display.
         
-        # Advance position using expected character width to maintain alignment
-        if expected_index < len(expected_text):
-            current_x += expected_char_width
+        The scene is drawn once, clipped to the union of the dirty rects (the
+        whole union is cleared first, so translucent overlays are never
+        blended twice), and only the dirty rects are pushed to the display.
+        
+        Returns the list of rects that were pushed to the display.
+        """
+        if self.full_redraw:
+            screen.fill(background_color)
+            draw_scene()
+            pygame.display.flip()
+            updated = [screen.get_rect()]
+        elif self.rects:
+            updated = self.merged_rects()
+            screen.set_clip(updated[0].unionall(updated[1:]))
+            screen.fill(background_color)
+            draw_scene()
+            screen.set_clip(None)
+            pygame.display.update(updated)
         else:
-            # For extra characters, use space width
-            space_surface = font.render(' ', True, UNTYPED_COLOR)
-            current_x += space_surface.get_width()
+            updated = []
+        
+        self.rects = []
+        self.full_redraw = False
+        return updated
+
+class LatencyProbe:
+    """Measures keystroke-to-display latency.
+    
+    key_polled() is called with the time a KEYDOWN was taken off the event
+    queue, frame_presented() right after the frame showing it was pushed to
+    the display. Each key's latency is kept in an array of milliseconds, so
+    measuring costs two perf_counter() calls and an append per key.
+    """
+    def __init__(self):
+        self.pending = array('d')  # Poll times of keys not yet on screen
+        self.samples = array('d')  # Latencies in milliseconds
+    
+    def __len__(self):
+        return len(self.samples)
+    
+    def key_polled(self, polled_at):
+        """Remember a key that changed the typed text, polled at perf_counter() time polled_at.
         
-        expected_index += 1
+        Keys that type nothing (Shift, arrows) have no frame of their own to measure, so
+        they must not be passed here.
+        """
+        self.pending.append(polled_at)
+    
+    def frame_presented(self, presented_at):
+        """Record every pending key as shown at perf_counter() time presented_at."""
+        if self.pending:
+            for polled_at in self.pending:
+                self.samples.append((presented_at - polled_at) * 1000.0)
+            del self.pending[:]
+    
+    def percentile(self, percent):
+        """Latency in milliseconds that percent of keys were at or under (nearest rank)."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(0, -(-len(ordered) * percent // 100) - 1)
+        return ordered[int(rank)]
+    
+    def summary(self):
+        """One line with p50/p95/p99 and the key count."""
+        return (f"Keystroke latency: p50 {self.percentile(50):.1f} ms, p95 {self.percentile(95):.1f} ms, "
+                f"p99 {self.percentile(99):.1f} ms ({len(self.samples)} keys)")
+    
+    def reset(self):
+        """Forget all measurements."""
+        del self.pending[:]
+        del self.samples[:]
+
+# Combo counter rects are cached per (font, combo, show_flame, flame_only)
+_combo_rect_cache = {}
 
-def calculate_wpm(characters_typed, time_elapsed, typed_chars=None):
-    """Calculate Words Per Minute.
+def get_combo_rect(combo, show_flame, flame_only=False):
+    """Return the screen area covered by the COMBO counter and its flame.
     
-    Args:
-        characters_typed: Total characters typed (including mistakes)
-        time_elapsed: Time elapsed in seconds
-        typed_chars: Optional list of booleans indicating correct (True) or incorrect (False) characters
-                    If provided, only correctly typed characters are counted for WPM
+    With flame_only, return just the rect the flame is drawn in. The rects
+    are measured once per combo value, so callers must not modify them.
     """
-    if time_elapsed <= 0:
-        return 0
-    
-    # If we have the typed_chars list, count only correctly typed characters
-    if typed_chars is not None:
-        correct_chars = sum(1 for is_correct in typed_chars if is_correct)
-        characters_typed = correct_chars
-    
-    # Standard: 5 characters = 1 word (including spaces)
-    # This is the industry standard for typing tests
-    words = characters_typed / 5.0
-    
-    # Convert seconds to minutes
-    minutes = time_elapsed / 60.0
-    
-    # Calculate WPM, rounding to nearest integer for display
-    if minutes > 0:
-        wpm = words / minutes
-        return round(wpm)  # Round to nearest integer for more accurate display
-    return 0
-
-def calculate_accuracy(total_chars, mistakes):
-    """Calculate typing accuracy percentage."""
-    if total_chars == 0:
-        return 100.0
-    correct_chars = total_chars - mistakes
-    accuracy = (correct_chars / total_chars) * 100.0
-    # Ensure accuracy doesn't go below 0
-    return max(0.0, accuracy)
-
-def main(difficulty="Normal"):
-    """Main function for the typing game."""
-    print(f"Starting typing game with difficulty: {difficulty}")
-    
-    clock = pygame.time.Clock()
-    running = True
-    game_started = False
-    game_completed = False
-    
-    # Load flame image for combo >= 10
-    flame_image = None
-    flame_frames = []
+    key = (combo_font, combo, show_flame, flame_only)
+    rect = _combo_rect_cache.get(key)
+    if rect is None:
+        if len(_combo_rect_cache) >= 256:
+            _combo_rect_cache.clear()
+        rect = _combo_rect_cache[key] = measure_combo_rect(combo, show_flame, flame_only)
+    return rect
+
+def measure_combo_rect(combo, show_flame, flame_only=False):
+    """Work out the rect for get_combo_rect() from the font metrics."""
+    combo_x = BACK_BUTTON_PADDING
+    combo_y = BACK_BUTTON_PADDING + BACK_BUTTON_SIZE + 10
+    combo_rect = pygame.Rect((combo_x, combo_y), combo_font.size(f"COMBO: {combo:02d}"))
+    if not show_flame:
+        return combo_rect
+    
+    # Calculate the number part width and position
+    number_width, number_height = combo_font.size(f"{combo:02d}")
+    
+    # Scale flame to fit the number height with some padding
+    flame_size = int(number_height * 1.2)
+    
+    # Find where the number starts (after "COMBO: ")
+    number_start_x = combo_x + combo_font.size("COMBO: ")[0]
+    
+    # Center flame behind the number
+    flame_x = number_start_x + (number_width // 2) - (flame_size // 2)
+    flame_y = combo_y + (number_height // 2) - (flame_size // 2)
+    flame_rect = pygame.Rect(flame_x, flame_y, flame_size, flame_size)
+    if flame_only:
+        return flame_rect
+    return combo_rect.union(flame_rect)
+
+def session_key_for_event(event):
+    """Translate a KEYDOWN event into a TypingSession key.
+    
+    Returns None for keys that type nothing (they still start the timer).
+    """
+    if event.key == pygame.K_BACKSPACE:
+        return WORD_BACKSPACE if event.mod & pygame.KMOD_CTRL else BACKSPACE
+    if event.key in MODIFIER_KEYS:
+        return None
+    if event.unicode and event.unicode.isprintable():
+        return event.unicode
+    return None
+
+def load_race_modules():
+    """Import the modules RaceScene needs on first use. Returns whether they could be loaded."""
+    global Bots, Multiplayer, NetworkPump
+    if Multiplayer is None:
+        try:
+            import Bots as bots_module
+            import NetworkPump as network_pump_module
+            import Multiplayer as multiplayer_module
+        except ImportError as e:
+            print(f"Could not load the race modules: {e}")
+            return False
+        Bots, NetworkPump, Multiplayer = bots_module, network_pump_module, multiplayer_module
+    return True
+
+def find_personal_best(difficulty):
+    """The best saved round at difficulty (see ScoreStore.personal_best), read on a background thread."""
     try:
-        flame_path = os.path.join('images', 'flame-lit.gif')
-        if os.path.exists(flame_path):
-            # Preferred: use PIL + ImageSequence for correct frame handling/transparency
-            try:
-                from PIL import ImageSequence
-                if PIL_AVAILABLE:
-                    img = Image.open(flame_path)
-                    for frame in ImageSequence.Iterator(img):
-                        frame_rgba = frame.convert('RGBA')
-                        size = frame_rgba.size  # (width, height)
-                        raw = frame_rgba.tobytes()
-                        surf = pygame.image.frombuffer(raw, size, 'RGBA').convert_alpha()
-                        flame_frames.append(surf)
-                # If PIL wasn't available, fall through to imageio below
-            except Exception:
-                pass
-
-            # Fallback to imageio if PIL failed or not available
-            if not flame_frames and imageio and np:
-                try:
-                    reader = imageio.get_reader(flame_path)
-                    for frame in reader:
-                        # frame is H x W x (3 or 4)
-                        h, w = frame.shape[0], frame.shape[1]
-                        if frame.shape[2] == 4:
-                            surf = pygame.image.frombuffer(frame.tobytes(), (w, h), 'RGBA').convert_alpha()
-                        else:
-                            surf = pygame.image.frombuffer(frame.tobytes(), (w, h), 'RGB').convert()
-                            surf = surf.convert_alpha()
-                        flame_frames.append(surf)
-                    reader.close()
-                except Exception as e:
-                    print(f"imageio failed to load GIF: {e}")
-
-            if flame_frames:
-                flame_image = flame_frames[0]
-                print(f"Flame GIF loaded successfully with {len(flame_frames)} frames")
+        return ScoreStore.get_score_store().personal_best(difficulty)
     except Exception as e:
-        print(f"Could not load flame image: {e}")
-    
-    # Get paragraph text
-    paragraph_text = get_paragraph_for_difficulty(difficulty)
-    
-    # Get time limit
-    time_limit = get_time_limit_for_difficulty(difficulty)  # in seconds
-    
-    # Game state
-    user_input = ""
-    typed_chars = []  # List of booleans: True = correct, False = incorrect
-    current_char_index = 0
-    combo = 0
-    highest_combo = 0  # Track the highest combo achieved
-    total_mistakes = 0  # Current mistakes (can decrease with backspace)
-    permanent_mistakes = 0  # Total mistakes ever made (never decreases, used for accuracy)
-    start_time = None
-    end_time = None
-    time_ran_out = False
-    
-    # Backspace hold tracking
-    backspace_held = False
-    backspace_repeat_time = 0
-    backspace_initial_delay = 500  # milliseconds before repeat starts
-    backspace_repeat_delay = 50  # milliseconds between repeats
-    
-    # Flame animation tracking
-    flame_frame_index = 0
-    flame_animation_speed = 50  # milliseconds between frames (faster animation)
-    last_flame_update = pygame.time.get_ticks()
-    
-    # Pause button (top-left)
-    pause_button_rect = pygame.Rect(BACK_BUTTON_PADDING, BACK_BUTTON_PADDING, BACK_BUTTON_SIZE, BACK_BUTTON_SIZE)
-    
-    # Wrap text for display - use more conservative margins to ensure it fits
-    margin = 80  # Increased margin on both sides
-    max_text_width = SCREEN_WIDTH - (margin * 2)  # Ensure text fits with padding
-    text_lines = wrap_text(paragraph_text, text_font, max_text_width)
-    
-    # Calculate text starting position (centered)
-    text_start_y = SCREEN_HEIGHT // 2 - (len(text_lines) * text_font.get_height()) // 2
-    
-    # Game loop
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            # Handle pause button click
-            if event.type == pygame.MOUSEBUTTONUP:
-                if pause_button_rect.collidepoint(event.pos):
-                    return "BACK_TO_DIFFICULTY"
+        print(f"Could not read personal best: {e}")
+        return None
+
+def find_ghost_run(difficulty, paragraph_text):
+    """The fastest finished run of paragraph_text as a GhostRun, picked through the score database.
+    
+    Reads the score database and session logs, so TypingScene runs it on a background thread.
+    """
+    try:
+        return find_best_run(paragraph_text, ScoreStore.get_score_store().best_run_logs(difficulty))
+    except Exception as e:
+        print(f"Could not look up your best run: {e}")
+        return None
+
+class TypingScene(SceneManager.Scene):
+    """The typing screen for one round.
+    
+    With replay_log (a SessionLog) the recorded keys are played back instead
+    of reading the keyboard, replay_speed times faster than they were typed.
+    time_source is a function returning the current time in seconds; it
+    drives the timer and WPM (time.time by default, a ScaledClock for replays).
+    
+    With ghost (SHOW_GHOST unless given), the fastest finished run of the same paragraph in the saved
+    session logs is played back as a second cursor, starting with the
+    player's first key (replays never show one). It is looked up on a
+    background thread and appears once it has been loaded.
+    
+    Pops with "BACK_TO_DIFFICULTY" when the player leaves with ESC or the
+    pause button.
+    """
+    def __init__(self, difficulty="Normal", replay_log=None, replay_speed=1.0, time_source=None, ghost=None):
+        if replay_log is not None:
+            difficulty = replay_log.difficulty or difficulty
+        self.difficulty = difficulty
+        self.replay_log = replay_log
+        self.replay_speed = replay_speed
+        self.show_ghost = (SHOW_GHOST if ghost is None else ghost) and replay_log is None
+        # The session clock - replays start at 0 so log timestamps can be used as-is
+        if time_source is None:
+            time_source = ScaledClock(replay_speed) if replay_log is not None else time.time
+        self.time_source = time_source
+    
+    def enter(self):
+        ensure_initialized()
+        replay_log = self.replay_log
+        print(f"Starting typing game with difficulty: {self.difficulty}")
+        
+        # Load flame image for combo >= 10, pre-scaled to fit the combo number
+        # (the flame is as tall as the font, whatever the combo, so one size is
+        # enough; the asset manager keeps it across rounds)
+        flame_size = get_combo_rect(0, True, flame_only=True).size
+        self.flame_frames = AssetManager.get_gif_frames(FLAME_IMAGE_PATH, flame_size)
+        if not self.flame_frames:
+            print("Could not load flame image")
+        
+        if replay_log is not None:
+            # Replays use the recorded paragraph and limit, and are not recorded again
+            self.paragraph_text = replay_log.paragraph_text
+            time_limit = replay_log.time_limit
+            self.replay_events = replay_log.events()
+            self.replay_index = 0
+            self.replay_label = f"REPLAY {self.replay_speed:g}x"
+        else:
+            # Get paragraph text
+            self.paragraph_text = get_paragraph_for_difficulty(self.difficulty)
             
-            # Keyboard shortcuts
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return "BACK_TO_DIFFICULTY"
-                
-                # Handle text input (only if game not completed)
-                if not game_completed:
-                    if not game_started:
-                        # Start the game on first keypress
-                        game_started = True
-                        start_time = time.time()
-                    
-                    # Ignore modifier keys (Shift, Ctrl, Alt, etc.)
-                    if event.key in [pygame.K_LSHIFT, pygame.K_RSHIFT, pygame.K_LCTRL, pygame.K_RCTRL, 
-                                     pygame.K_LALT, pygame.K_RALT, pygame.K_LMETA, pygame.K_RMETA,
-                                     pygame.K_CAPSLOCK, pygame.K_TAB]:
-                        continue
-                    
-                    if event.key == pygame.K_BACKSPACE:
-                        # Start backspace hold
-                        backspace_held = True
-                        backspace_repeat_time = pygame.time.get_ticks() + backspace_initial_delay
-                        # Delete immediately on first press
-                        if user_input and current_char_index > 0:
-                            user_input = user_input[:-1]
-                            if typed_chars:
-                                # Remove last typed character
-                                # Note: permanent_mistakes is NOT decreased - mistakes count forever for accuracy
-                                if not typed_chars[-1]:  # If it was a mistake
-                                    total_mistakes -= 1  # Decrease current mistake count for combo/display
-                                typed_chars.pop()
-                                current_char_index -= 1
+            # Get time limit
+            time_limit = get_time_limit_for_difficulty(self.difficulty)  # in seconds
+        
+        # Game state - keystrokes, timer, combo and completion all live in the session
+        self.recorder = KeystrokeRecorder(self.paragraph_text, time_limit, self.difficulty) if RECORD_SESSIONS and replay_log is None else None
+        self.session = TypingSession(self.paragraph_text, time_limit, recorder=self.recorder)
+        self.typed_text = self.session.typed_text  # What the user typed, with a correct/incorrect flag per character
+        self.stats = self.session.stats  # Running correct/mistake/combo counts
+        
+        # Past rounds are read on a background thread, never while a frame is drawn
+        self.history_loader = AssetManager.BackgroundLoader(max_workers=1)
+        
+        # Best saved WPM before this round, for the results screen (see RECORD_SCORES)
+        self.score_store = ScoreStore.get_score_store() if RECORD_SCORES and replay_log is None else None
+        self.previous_best = None
+        self.previous_best_loaded = False
+        if self.score_store is not None:
+            difficulty = self.difficulty
+            self.history_loader.submit(lambda: find_personal_best(difficulty), self.personal_best_found)
+        
+        # Personal best to race against (see SHOW_GHOST)
+        self.ghost = None
+        self.ghost_index = 0
+        if self.show_ghost and RECORD_SCORES:
+            difficulty, paragraph_text = self.difficulty, self.paragraph_text
+            self.history_loader.submit(lambda: find_ghost_run(difficulty, paragraph_text), self.ghost_found)
+        
+        # Backspace hold tracking
+        self.backspace_held = False
+        self.backspace_repeat_time = 0
+        self.backspace_initial_delay = 500  # milliseconds before repeat starts
+        self.backspace_repeat_delay = 50  # milliseconds between repeats
+        
+        # Flame animation tracking
+        self.flame_frame_index = 0
+        self.flame_animation_speed = 50  # milliseconds between frames (faster animation)
+        self.last_flame_update = pygame.time.get_ticks()
+        
+        # Pause button (top-left)
+        self.pause_button_rect = pygame.Rect(BACK_BUTTON_PADDING, BACK_BUTTON_PADDING, BACK_BUTTON_SIZE, BACK_BUTTON_SIZE)
+        
+        # Wrap text for display - use more conservative margins to ensure it fits
+        margin = 80  # Increased margin on both sides
+        self.max_text_width = SCREEN_WIDTH - (margin * 2)  # Ensure text fits with padding
+        self.text_layout = get_paragraph_layout(self.paragraph_text, text_font, self.max_text_width)
+        
+        # Calculate text starting position (centered)
+        self.text_x = (SCREEN_WIDTH - self.max_text_width) // 2
+        self.text_start_y = SCREEN_HEIGHT // 2 - self.text_layout.height // 2
+        
+        # Dirty-rect tracking (see USE_DIRTY_RECTS)
+        self.dirty_regions = DirtyRegions()
+        self.last_screen_state = None
+        self.changed_cells = []  # Paragraph character indexes edited since the last frame
+        
+        # Timer and WPM readouts, worked out in update()
+        self.timer_text = ""
+        self.timer_color = WHITE
+        self.live_wpm = 0
+        
+        # Keystroke-to-display latency (see MEASURE_LATENCY)
+        self.latency_probe = LatencyProbe() if MEASURE_LATENCY else None
+    
+    def exit(self):
+        self.save_recording()
+        self.report_latency()
+    
+    def personal_best_found(self, previous_best):
+        """Keep the best saved round find_personal_best() read (called from update())."""
+        self.previous_best = previous_best
+        self.previous_best_loaded = True
+        if self.session.completed:
+            self.dirty_regions.invalidate_all()  # The results screen is already up
+    
+    def ghost_found(self, ghost):
+        """Start racing the ghost find_ghost_run() loaded (called from update())."""
+        if ghost is None or self.session.completed:
+            return
+        self.ghost = ghost
+        self.ghost_label = f"GHOST {ghost.results['wpm']} WPM"
+        print(f"Racing your best run: {ghost.results['wpm']} WPM")
+        self.dirty_regions.invalidate_all()  # Bring in the ghost's label
+    
+    def current_time(self):
+        """Session time from time_source - a replay's clock stops where its log ends."""
+        now = self.time_source()
+        if self.replay_log is not None and now > self.replay_log.duration:
+            return self.replay_log.duration
+        return now
+    
+    def apply_key(self, key, now):
+        """Feed a key to the session and mark the paragraph cells it changed.
+        
+        Returns whether the key typed or erased anything.
+        """
+        session = self.session
+        before = session.current_char_index
+        was_completed = session.completed
+        session.press(key, now)
+        after = session.current_char_index
+        self.changed_cells.extend(range(min(before, after), max(before, after)))
+        if session.completed and not was_completed:
+            self.report_completion()
+        return after != before
+    
+    def report_completion(self):
+        """Log how the round ended."""
+        if self.session.time_ran_out:
+            print(f"Time ran out! Completed {self.stats.typed} characters")
+        else:
+            print(f"Level completed! Mistakes: {self.stats.mistakes}, Total chars: {self.stats.typed}")
+        self.save_recording()
+        self.save_score()
+    
+    def save_score(self):
+        """Queue the round's results for the score database (saved in the background)."""
+        if self.score_store is not None:
+            recorder = self.recorder
+            self.score_store.save(self.difficulty, self.session.results(), log_path=recorder.saved_path if recorder is not None else None)
+    
+    def report_latency(self):
+        """Print the round's keystroke latency percentiles (once per round)."""
+        if self.latency_probe is not None and len(self.latency_probe):
+            print(self.latency_probe.summary())
+            self.latency_probe.reset()
+    
+    def save_recording(self):
+        """Hand the keystroke log to the background writer (once per round)."""
+        recorder = self.recorder
+        if recorder is not None and recorder.saved_path is None and len(recorder):
+            recorder.finish(self.current_time())
+            print(f"Saving session log: {recorder.save()}")
+    
+    def handle_event(self, event):
+        session = self.session
+        
+        # The window contents may have been lost - redraw everything
+        if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+            self.dirty_regions.invalidate_all()
+        
+        # Handle pause button click
+        if event.type == pygame.MOUSEBUTTONUP:
+            if self.pause_button_rect.collidepoint(event.pos):
+                self.manager.pop("BACK_TO_DIFFICULTY")
+                return
+        
+        # Keyboard shortcuts
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.manager.pop("BACK_TO_DIFFICULTY")
+                return
             
-            # Handle key release for backspace
-            if event.type == pygame.KEYUP:
+            # Handle text input (only if game not completed) - the first keypress starts the timer
+            if not session.completed and self.replay_log is None:
                 if event.key == pygame.K_BACKSPACE:
-                    backspace_held = False
-            
-            # Handle text input (only if game not completed and time hasn't run out)
-            if event.type == pygame.KEYDOWN and not game_completed and not time_ran_out:
-                if event.unicode and event.unicode.isprintable() and len(event.unicode) > 0:
-                    # Only process actual printable characters (not modifier keys)
-                    char = event.unicode
-                    user_input += char
-                    
-                    # Check if character matches
-                    if current_char_index < len(paragraph_text):
-                        expected_char = paragraph_text[current_char_index]
-                        is_correct = (char == expected_char)  # Case-sensitive comparison - capitalization matters!
-                        typed_chars.append(is_correct)
-                        
-                        if not is_correct:
-                            total_mistakes += 1
-                            permanent_mistakes += 1  # Permanent mistake count (never decreases)
-                            combo = 0  # Reset combo on mistake
-                        else:
-                            # Increment combo when we complete a word (type a space correctly)
-                            if expected_char == ' ':
-                                combo += 1
-                                # Update highest combo
-                                if combo > highest_combo:
-                                    highest_combo = combo
-                            # Also increment on last character if it's the end
-                            elif current_char_index == len(paragraph_text) - 1:
-                                combo += 1
-                                # Update highest combo
-                                if combo > highest_combo:
-                                    highest_combo = combo
-                        
-                        current_char_index += 1
-                        
-                        # Check if paragraph is complete (can complete even with mistakes)
-                        if current_char_index >= len(paragraph_text):
-                            game_completed = True
-                            end_time = time.time()
-                            print(f"Level completed! Mistakes: {total_mistakes}, Total chars: {len(typed_chars)}")
+                    # Start backspace hold
+                    self.backspace_held = True
+                    self.backspace_repeat_time = pygame.time.get_ticks() + self.backspace_initial_delay
+                # Characters, backspace (a whole word with Ctrl held) and timer start - only
+                # keys that changed the text are timed to the frame that shows them
+                if self.apply_key(session_key_for_event(event), self.current_time()) and self.latency_probe is not None:
+                    self.latency_probe.key_polled(self.manager.polled_at)
+        
+        # Handle key release for backspace
+        if event.type == pygame.KEYUP:
+            if event.key == pygame.K_BACKSPACE:
+                self.backspace_held = False
+    
+    def update(self):
+        session = self.session
+        stats = self.stats
+        
+        # Pick up the personal best and ghost once they have been read
+        self.history_loader.poll()
+        
+        # Feed the replay every recorded key that is due, at its recorded time
+        if self.replay_log is not None:
+            now = self.current_time()
+            replay_events = self.replay_events
+            while self.replay_index < len(replay_events) and replay_events[self.replay_index][0] <= now and not session.completed:
+                timestamp, key = replay_events[self.replay_index]
+                self.apply_key(key, timestamp)
+                self.replay_index += 1
         
         # Check timer
-        if game_started and not game_completed and not time_ran_out:
-            elapsed_time = time.time() - start_time if start_time else 0
-            remaining_time = time_limit - elapsed_time
-            
-            if remaining_time <= 0:
-                # Time ran out
-                time_ran_out = True
-                game_completed = True
-                end_time = time.time()
-                print(f"Time ran out! Completed {len(typed_chars)} characters")
+        if session.started and not session.completed:
+            session.update(self.current_time())
+            if session.completed:
+                self.report_completion()
         
         # Handle backspace repeat (when held down)
-        if backspace_held and not game_completed and not time_ran_out:
+        if self.backspace_held and not session.completed:
             current_ticks = pygame.time.get_ticks()
-            if current_ticks >= backspace_repeat_time:
-                # Delete a character
-                if user_input and current_char_index > 0:
-                    user_input = user_input[:-1]
-                    if typed_chars:
-                        # Remove last typed character
-                        # Note: permanent_mistakes is NOT decreased - mistakes count forever for accuracy
-                        if not typed_chars[-1]:  # If it was a mistake
-                            total_mistakes -= 1  # Decrease current mistake count for combo/display
-                        typed_chars.pop()
-                        current_char_index -= 1
+            if current_ticks >= self.backspace_repeat_time:
+                # Delete a character (or a word while Ctrl is held)
+                self.apply_key(WORD_BACKSPACE if pygame.key.get_mods() & pygame.KMOD_CTRL else BACKSPACE, self.current_time())
                 # Set next repeat time
-                backspace_repeat_time = current_ticks + backspace_repeat_delay
-        
-        # Clear screen with background color
-        screen.fill(BACKGROUND_COLOR)
-        
-        # Draw pause button (two vertical lines)
-        draw_pause_button(screen, pause_button_rect.x, pause_button_rect.y, pause_button_rect.height)
+                self.backspace_repeat_time = current_ticks + self.backspace_repeat_delay
         
         # Update flame animation continuously (even when not visible)
-        if flame_frames:
+        if self.flame_frames:
             current_ticks = pygame.time.get_ticks()
-            if current_ticks - last_flame_update >= flame_animation_speed:
-                flame_frame_index = (flame_frame_index + 1) % len(flame_frames)
-                last_flame_update = current_ticks
+            if current_ticks - self.last_flame_update >= self.flame_animation_speed:
+                self.flame_frame_index = (self.flame_frame_index + 1) % len(self.flame_frames)
+                self.last_flame_update = current_ticks
+        
+        # Work out the timer and WPM readouts - only shown during an active game
+        if session.started and not session.completed:
+            now = self.current_time()
+            remaining_time = session.remaining(now)
+            minutes = int(remaining_time // 60)
+            seconds = int(remaining_time % 60)
+            self.timer_text = f"{minutes:01d}:{seconds:02d}"
+            
+            # Blink white to red when <= 10 seconds
+            if remaining_time <= 10:
+                # Blink effect: alternate between white and red
+                blink_cycle = int(pygame.time.get_ticks() / 500) % 2  # Switch every 500ms
+                self.timer_color = RED if blink_cycle == 0 else WHITE
+            else:
+                self.timer_color = WHITE
+            
+            self.live_wpm = session.wpm(now)
+            
+            # The ghost's caret at the same time into its run
+            if self.ghost is not None:
+                self.ghost_index = self.ghost.position(now - session.start_time)
+    
+    def present(self, screen):
+        session = self.session
+        stats = self.stats
+        if USE_DIRTY_RECTS:
+            dirty_regions = self.dirty_regions
+            # Anything that changes the layout of the screen needs a full redraw
+            screen_state = (session.started, session.completed)
+            if screen_state != self.last_screen_state:
+                dirty_regions.invalidate_all()
+                self.last_screen_state = screen_state
+            
+            if not session.completed:
+                # Typed glyphs that changed this frame plus the old and new cursor cell
+                text_layout = self.text_layout
+                for index in self.changed_cells:
+                    dirty_regions.add(text_layout.cell_rect(index, self.text_x, self.text_start_y))
+                dirty_regions.track("cursor", session.current_char_index, text_layout.cell_rect(session.current_char_index, self.text_x, self.text_start_y))
+                if self.ghost is not None:
+                    dirty_regions.track("ghost", self.ghost_index, text_layout.cell_rect(self.ghost_index, self.text_x, self.text_start_y))
+                
+                show_flame = stats.combo >= 5 and bool(self.flame_frames)
+                dirty_regions.track("combo", (stats.combo, show_flame and self.flame_frame_index), get_combo_rect(stats.combo, show_flame))
+            
+            if session.started and not session.completed:
+                timer_size = stats_font.size(self.timer_text)
+                timer_rect = pygame.Rect((0, 0), timer_size)
+                timer_rect.topright = (SCREEN_WIDTH - BACK_BUTTON_PADDING, BACK_BUTTON_PADDING)
+                dirty_regions.track("timer", (self.timer_text, self.timer_color), timer_rect)
+                
+                wpm_value_size = stats_font.size(f"{self.live_wpm}")
+                wpm_rect = pygame.Rect(BACK_BUTTON_PADDING, SCREEN_HEIGHT - 60, max(stats_font.size("WPM")[0], wpm_value_size[0]), 20 + wpm_value_size[1])
+                dirty_regions.track("wpm", self.live_wpm, wpm_rect)
+            
+            # Redraw only the changed regions and push them to the display
+            dirty_regions.present(screen, lambda: self.draw(screen), BACKGROUND_COLOR)
+        else:
+            # Clear screen with background color, redraw everything and flip
+            screen.fill(BACKGROUND_COLOR)
+            self.draw(screen)
+            pygame.display.flip()
+        if self.latency_probe is not None:
+            self.latency_probe.frame_presented(time.perf_counter())
+            if session.completed:
+                # The key that ended the round is on screen now
+                self.report_latency()
+        self.changed_cells.clear()
+    
+    def draw(self, screen):
+        """Draw the whole typing screen (clipped to the dirty region when set)."""
+        session = self.session
+        stats = self.stats
+        typed_text = self.typed_text
+        text_layout = self.text_layout
+        text_x = self.text_x
+        text_start_y = self.text_start_y
+        
+        # Draw pause button (two vertical lines)
+        draw_pause_button(screen, self.pause_button_rect.x, self.pause_button_rect.y, self.pause_button_rect.height)
         
         # Draw COMBO counter (below pause button) - only show during active game
-        if not game_completed:
-            combo_text = combo_font.render(f"COMBO: {combo:02d}", True, WHITE)
-            combo_text_rect = combo_text.get_rect()
+        if not session.completed:
+            combo = stats.combo
+            combo_text = render_text(combo_font, f"COMBO: {combo:02d}", WHITE)
             combo_x = BACK_BUTTON_PADDING
             combo_y = BACK_BUTTON_PADDING + BACK_BUTTON_SIZE + 10
             
             # Draw flame behind combo if combo >= 10
-            if combo >= 5 and flame_frames:
-                # Get current flame frame (animation already updated above)
-                current_flame = flame_frames[flame_frame_index]
-                
-                # Calculate the number part width and position
-                number_text = f"{combo:02d}"
-                number_width = combo_font.size(number_text)[0]
-                number_height = combo_font.size(number_text)[1]
-                
-                # Scale flame to fit the number size
-                flame_scale = number_height * 1.2  # Scale to fit number height with some padding
-                flame_scaled = pygame.transform.scale(current_flame, (int(flame_scale), int(flame_scale)))
-                
-                # Position flame centered behind the number
-                # Find where the number starts (after "COMBO: ")
-                label_text = "COMBO: "
-                label_width = combo_font.size(label_text)[0]
-                number_start_x = combo_x + label_width
-                
-                # Center flame behind the number
-                flame_x = number_start_x + (number_width // 2) - (flame_scaled.get_width() // 2)
-                flame_y = combo_y + (number_height // 2) - (flame_scaled.get_height() // 2)
-                
-                # Draw flame behind text
-                screen.blit(flame_scaled, (flame_x, flame_y))
+            if combo >= 5 and self.flame_frames:
+                # Current flame frame (animation already updated in update()),
+                # already scaled to fit - center it behind the number
+                screen.blit(self.flame_frames[self.flame_frame_index], get_combo_rect(combo, True, flame_only=True))
             
             # Draw combo text on top
             screen.blit(combo_text, (combo_x, combo_y))
         
         # Draw paragraph text with color coding
-        if not game_completed:
-            # Render text character by character with color coding
-            text_x = (SCREEN_WIDTH - max_text_width) // 2
-            cursor_pos = render_colored_text(screen, paragraph_text, text_font, text_x, text_start_y, max_text_width, typed_chars, current_char_index)
+        if not session.completed:
+            if PARAGRAPH_RENDER_MODE == RENDER_MODE_LINES:
+                # Draw the untyped and typed line layers plus mistake overlays
+                get_line_renderer(text_layout, text_font).draw(screen, text_x, text_start_y, typed_text.correct_flags())
+            else:
+                # Render text character by character with color coding
+                render_colored_text(screen, self.paragraph_text, text_font, text_x, text_start_y, self.max_text_width, typed_text.correct_flags())
+            
+            # Draw the ghost's box where the best run's caret is, under our own
+            if self.ghost is not None and self.ghost_index < len(text_layout):
+                ghost_x, ghost_y, ghost_width, ghost_height = text_layout.cell(self.ghost_index)
+                screen.blit(AssetManager.get_filled_surface((ghost_width, ghost_height), GHOST_BOX_COLOR), (text_x + ghost_x, text_start_y + ghost_y))
             
             # Draw gray cursor box at current typing position
-            if cursor_pos is not None:
-                cursor_x, cursor_y, cursor_width, cursor_height = cursor_pos
+            if session.current_char_index < len(text_layout):
+                cursor_x, cursor_y, cursor_width, cursor_height = text_layout.cell(session.current_char_index)
                 # Draw a semi-transparent gray box behind the current character
-                cursor_box = pygame.Surface((cursor_width, cursor_height), pygame.SRCALPHA)
-                cursor_box.fill((100, 100, 100, 150))  # Gray with transparency
-                screen.blit(cursor_box, (cursor_x, cursor_y))
+                screen.blit(AssetManager.get_filled_surface((cursor_width, cursor_height), CURSOR_BOX_COLOR), (text_x + cursor_x, text_start_y + cursor_y))
             
             # Draw user's input ON TOP of the paragraph (overlaid) so they can see what they typed
-            if user_input:
+            if typed_text and PARAGRAPH_RENDER_MODE == RENDER_MODE_GLYPHS:
                 # Render what the user has typed at the same position as the paragraph
-                render_user_input(screen, user_input, paragraph_text[:len(user_input)], text_font, text_x, text_start_y, max_text_width)
+                render_user_input(screen, typed_text, self.paragraph_text, text_font, text_x, text_start_y, self.max_text_width)
         else:
             # Game completed - show results
-            # Calculate stats
-            time_elapsed = end_time - start_time if start_time and end_time else 0
-            wpm = calculate_wpm(len(typed_chars), time_elapsed, typed_chars)
-            
-            # Calculate accuracy: how accurate they typed WITHOUT mistakes
-            # For every mistake (even if erased), they lose accuracy
-            total_chars_typed = len(typed_chars)
-            if total_chars_typed > 0:
-                # Use permanent mistakes - mistakes count even if erased with backspace
-                # Accuracy = (correct characters / total characters) * 100
-                # correct_chars = total_chars_typed - permanent_mistakes
-                correct_chars = total_chars_typed - permanent_mistakes
-                accuracy = (correct_chars / total_chars_typed) * 100.0
-            else:
-                accuracy = 0.0
-            
-            # Ensure accuracy is between 0 and 100
-            accuracy = max(0.0, min(100.0, accuracy))
+            # Accuracy uses permanent mistakes - mistakes count even if erased with backspace
+            results = session.results()
+            wpm = results["wpm"]
+            accuracy = results["accuracy"]
             
             # Draw completion message (larger font)
-            if time_ran_out:
-                completion_text = title_font.render("Typing Incomplete", True, RED)
+            if session.time_ran_out:
+                completion_text = render_text(title_font, "Typing Incomplete", RED)
             else:
-                completion_text = title_font.render("Typing Complete!", True, GREEN)
+                completion_text = render_text(title_font, "Typing Complete!", GREEN)
             completion_rect = completion_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 120))
             screen.blit(completion_text, completion_rect)
             
+            # Compare with the best saved round
+            if self.score_store is not None and self.previous_best_loaded:
+                previous_best = self.previous_best
+                if previous_best is None or wpm > previous_best["wpm"]:
+                    best_text = render_text(ui_font, "New personal best!", YELLOW)
+                else:
+                    best_text = render_text(ui_font, f"Personal best: {previous_best['wpm']} WPM", GRAY)
+                screen.blit(best_text, best_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80)))
+            
             # Draw WPM (larger font)
-            wpm_text = button_font.render(f"WPM: {wpm}", True, WHITE)
+            wpm_text = render_text(button_font, f"WPM: {wpm}", WHITE)
             wpm_rect = wpm_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40))
             screen.blit(wpm_text, wpm_rect)
             
             # Draw Accuracy (larger font)
-            accuracy_text = button_font.render(f"Accuracy: {accuracy:.1f}%", True, WHITE)
+            accuracy_text = render_text(button_font, f"Accuracy: {accuracy:.1f}%", WHITE)
             accuracy_rect = accuracy_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10))
             screen.blit(accuracy_text, accuracy_rect)
             
             # Draw Highest Combo (larger font)
-            highest_combo_text = button_font.render(f"Highest Combo: {highest_combo:02d}", True, WHITE)
+            highest_combo_text = render_text(button_font, f"Highest Combo: {results['highest_combo']:02d}", WHITE)
             highest_combo_rect = highest_combo_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
             screen.blit(highest_combo_text, highest_combo_rect)
             
             # Draw instructions
-            instruction_text = ui_font.render("Press ESC or click pause to return", True, GRAY)
+            instruction_text = render_text(ui_font, "Press ESC or click pause to return", GRAY)
             instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 120))
             screen.blit(instruction_text, instruction_rect)
         
+        # Mark replays (bottom-right)
+        if self.replay_log is not None:
+            replay_text = render_text(ui_font, self.replay_label, GRAY)
+            screen.blit(replay_text, replay_text.get_rect(bottomright=(SCREEN_WIDTH - BACK_BUTTON_PADDING, SCREEN_HEIGHT - BACK_BUTTON_PADDING)))
+        
+        # Name the ghost's pace (bottom-right) while racing it
+        if self.ghost is not None and not session.completed:
+            ghost_text = render_text(ui_font, self.ghost_label, GHOST_BOX_COLOR[:3])
+            screen.blit(ghost_text, ghost_text.get_rect(bottomright=(SCREEN_WIDTH - BACK_BUTTON_PADDING, SCREEN_HEIGHT - BACK_BUTTON_PADDING)))
+        
         # Draw timer (top-right) - only show during active game
-        if game_started and not game_completed:
-            elapsed_time = time.time() - start_time if start_time else 0
-            remaining_time = max(0, time_limit - elapsed_time)
-            minutes = int(remaining_time // 60)
-            seconds = int(remaining_time % 60)
-            timer_text = f"{minutes:01d}:{seconds:02d}"
-            
-            # Blink white to red when <= 10 seconds
-            if remaining_time <= 10:
-                # Blink effect: alternate between white and red
-                blink_cycle = int(pygame.time.get_ticks() / 500) % 2  # Switch every 500ms
-                timer_color = RED if blink_cycle == 0 else WHITE
-            else:
-                timer_color = WHITE
-            
-            timer_surface = stats_font.render(timer_text, True, timer_color)
+        if session.started and not session.completed:
+            timer_surface = render_text(stats_font, self.timer_text, self.timer_color)
             timer_rect = timer_surface.get_rect(topright=(SCREEN_WIDTH - BACK_BUTTON_PADDING, BACK_BUTTON_PADDING))
             screen.blit(timer_surface, timer_rect)
         
         # Draw WPM in bottom-left (only during typing)
-        if game_started and not game_completed:
-            time_elapsed = time.time() - start_time if start_time else 0
-            wpm = calculate_wpm(len(typed_chars), time_elapsed, typed_chars)
-            wpm_text = stats_font.render(f"WPM", True, WHITE)
+        if session.started and not session.completed:
+            wpm_text = render_text(stats_font, f"WPM", WHITE)
             screen.blit(wpm_text, (BACK_BUTTON_PADDING, SCREEN_HEIGHT - 60))  # Moved up 20px
-            wpm_value_text = stats_font.render(f"{wpm}", True, WHITE)
+            wpm_value_text = render_text(stats_font, f"{self.live_wpm}", WHITE)
             screen.blit(wpm_value_text, (BACK_BUTTON_PADDING, SCREEN_HEIGHT - 40))  # Moved up 20px
+
+# Race standings, drawn under the paragraph: a name and progress bar per racer
+RACE_PANEL_RECT = pygame.Rect(260, 400, 440, 128)
+RACE_ROW_HEIGHT = 16
+RACE_NAME_WIDTH = 110
+RACE_COLORS = [YELLOW, (0, 200, 255), (255, 120, 0), (200, 100, 255), (0, 220, 120), (255, 80, 160), (180, 180, 255), (255, 200, 120)]
+RACE_BOTS = 3  # Bot opponents on each racer's own screen (they are not sent to the server)
+
+def race_color(racer_id):
+    """Bar color for another racer (player ids from the server, negative for bots) - the first color is ours."""
+    return RACE_COLORS[1 + racer_id % (len(RACE_COLORS) - 1)]
+
+def race_place_key(char_index, finished, finish_ms):
+    """Sort key for race places: finished racers by time, then everyone else by how far they got."""
+    return (0, finish_ms) if finished else (1, -char_index)
+
+class RaceScene(TypingScene):
+    """A typing round raced against other players on the LAN (see Multiplayer.py).
+    
+    Joins the race room for the difficulty on host:port, hosting the server
+    on this machine if none is running there. Typing is locked until at
+    least two racers are in the room, every one of them has pressed ENTER and
+    the countdown has run out (a racer alone in the room can press ENTER
+    again to start anyway); from
+    then on the player's progress is sent whenever it changes, and every
+    racer's progress is drawn as a bar under the paragraph.
+    
+    bots local bot opponents (see Bots.py) race on this screen as well; when
+    no server can be reached, the race is against the bots alone.
+    
+    The connection lives on a NetworkPump thread; update() only drains what
+    it received, within the pump's per-frame budget.
+    """
+    def __init__(self, difficulty="Normal", host=None, port=None, player_name=None, bots=RACE_BOTS):
+        if not load_race_modules():
+            raise ImportError("The race modules could not be loaded")
+        super().__init__(difficulty, ghost=False)  # The other racers are the opponents here
+        self.host = host or Multiplayer.RACE_SERVER_HOST
+        self.port = port or Multiplayer.RACE_SERVER_PORT
+        self.player_name = player_name or Multiplayer.default_player_name()
+        self.bots = bots
+    
+    def enter(self):
+        super().enter()
+        self.race_font = AssetManager.get_font(font_path, 16)
+        self.pump = NetworkPump.NetworkPump("Race network").start()
+        self.connecting = self.pump.submit(Multiplayer.connect_or_host(self.host, self.port, pump=self.pump))
+        self.client = None
+        self.server = None  # Set when we are hosting
+        # Every bot's whole round, planned in one batch
+        self.bot_pack = Bots.BotPack(self.paragraph_text, Bots.random_profiles(self.bots)) if self.bots else None
+        self.local_start_time = None  # When a race against the bots alone starts
+        self.ready = False
+        self.finish_ms = None
+        self.racers = []  # (name, char index, finished, finish ms, color) for everyone but us
+        self.standings = []  # (name, fraction typed, finished, color) per row, us first
+        self.status_text = ""
+    
+    def exit(self):
+        super().exit()
+        if self.client is not None:
+            self.client.close()
+        if self.server is not None:
+            self.pump.call(self.server.close)
+        print(self.pump.summary())
+        self.pump.stop()
+    
+    def check_connection(self):
+        """Pick up the connection once the network thread has made it."""
+        try:
+            self.client, self.server = self.connecting.result()
+            # Everyone racing the same difficulty shares a room, so the paragraph matches
+            self.client.join(f"race-{self.difficulty}", self.player_name, self.difficulty)
+        except Exception as e:
+            print(f"Could not join a race on {self.host}:{self.port}: {e}")
+        self.connecting = None
+    
+    @property
+    def start_time(self):
+        """perf_counter() time the race starts, or None until it is known."""
+        if self.client is not None:
+            return self.client.start_time
+        return self.local_start_time
+    
+    @property
+    def started(self):
+        start_time = self.start_time
+        return start_time is not None and time.perf_counter() >= start_time
+    
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and not self.started:
+            # Until the race starts the only keys are ENTER (ready) and ESC
+            if event.key == pygame.K_RETURN and self.ready and self.client is not None and not self.client.players:
+                # Nobody else has joined - start alone (against the bots, if any)
+                self.client.start_anyway()
+            elif event.key == pygame.K_RETURN and not self.ready:
+                if self.client is not None:
+                    self.ready = True
+                    self.client.ready()
+                elif self.connecting is None and self.bot_pack is not None:
+                    # No server - race the bots
+                    self.ready = True
+                    self.local_start_time = time.perf_counter() + Multiplayer.START_COUNTDOWN_MS / 1000
+            if event.key != pygame.K_ESCAPE:
+                return
+        super().handle_event(event)
+    
+    def update(self):
+        super().update()
+        if self.connecting is not None and self.connecting.done():
+            self.check_connection()
+        client = self.client
+        session = self.session
+        
+        # Send our progress and take in everyone else's
+        elapsed_ms = 0
+        if self.started:
+            elapsed_ms = (time.perf_counter() - self.start_time) * 1000
+            finished = session.completed and not session.time_ran_out
+            if finished and self.finish_ms is None:
+                self.finish_ms = elapsed_ms
+            if client is not None:
+                client.send_progress(session.current_char_index, self.stats.permanent_mistakes, elapsed_ms, finished)
+        self.pump.drain()
+        
+        racers = []
+        if client is not None:
+            for player_id, name in sorted(client.players.items()):
+                char_index, mistakes, finish_ms, finished = client.progress.get(player_id, (0, 0, 0, False))
+                racers.append((name, char_index, finished, finish_ms, race_color(player_id)))
+        bot_pack = self.bot_pack
+        if bot_pack is not None:
+            # One lookup places every bot
+            bot_chars, bot_mistakes = bot_pack.progress(elapsed_ms / 1000)
+            bot_finished = bot_pack.finished(elapsed_ms / 1000)
+            for i, profile in enumerate(bot_pack.profiles):
+                racers.append((profile.name, int(bot_chars[i]), bool(bot_finished[i]), float(bot_pack.finish_times[i]) * 1000,
+                               race_color(-1 - i)))
+        self.racers = racers
         
-        # Update display
-        pygame.display.flip()
-        clock.tick(60)
+        # Us, then whoever is doing best (as many as fit)
+        paragraph_length = len(self.paragraph_text)
+        leaders = sorted(racers, key=lambda racer: race_place_key(*racer[1:4]))
+        standings = [("You", session.current_char_index / paragraph_length, self.finish_ms is not None, RACE_COLORS[0])]
+        for name, char_index, finished, finish_ms, color in leaders[:RACE_PANEL_RECT.height // RACE_ROW_HEIGHT - 1]:
+            standings.append((name, min(1.0, char_index / paragraph_length), finished, color))
+        self.standings = standings
+        self.status_text = self.race_status()
     
-    return None
+    def race_status(self):
+        """The line shown above everything else: waiting, countdown or our place."""
+        client = self.client
+        racers = len(self.racers) + 1
+        if client is None:
+            if self.connecting is not None:
+                return "Connecting to the race server..."
+            if self.bot_pack is None:
+                return "Could not reach the race server - press ESC"
+            if self.local_start_time is None:
+                return "No race server - press ENTER to race the bots"
+        elif not client.connected:
+            return "Lost the race server - press ESC"
+        elif client.start_time is None:
+            if self.ready and not client.players:
+                return "Waiting for another racer - press ENTER to start anyway"
+            if self.ready:
+                return "Waiting for the other racers to get ready"
+            # Players in the room - the local bots are not in it
+            return f"{len(client.players) + 1} in the room - press ENTER when ready"
+        if not self.started:
+            return f"Starting in {math.ceil(self.start_time - time.perf_counter())}"
+        
+        ours = race_place_key(self.session.current_char_index, self.finish_ms is not None, self.finish_ms or 0)
+        ahead = sum(1 for racer in self.racers if race_place_key(*racer[1:4]) < ours)
+        return f"Place {ahead + 1} of {racers}"
+    
+    def present(self, screen):
+        if USE_DIRTY_RECTS:
+            status_size = ui_font.size(self.status_text)
+            status_rect = pygame.Rect((0, 0), status_size)
+            status_rect.midtop = (SCREEN_WIDTH // 2, BACK_BUTTON_PADDING)
+            self.dirty_regions.track("race status", self.status_text, status_rect)
+            self.dirty_regions.track("race standings", tuple(self.standings), RACE_PANEL_RECT)
+        super().present(screen)
+    
+    def draw(self, screen):
+        super().draw(screen)
+        if self.status_text:
+            status_surface = render_text(ui_font, self.status_text, WHITE)
+            screen.blit(status_surface, status_surface.get_rect(midtop=(SCREEN_WIDTH // 2, BACK_BUTTON_PADDING)))
+        
+        bar_width = RACE_PANEL_RECT.width - RACE_NAME_WIDTH
+        for row, (name, fraction, finished, color) in enumerate(self.standings):
+            y = RACE_PANEL_RECT.y + row * RACE_ROW_HEIGHT
+            screen.blit(render_text(self.race_font, name, GREEN if finished else WHITE), (RACE_PANEL_RECT.x, y))
+            bar_rect = pygame.Rect(RACE_PANEL_RECT.x + RACE_NAME_WIDTH, y + 3, bar_width, RACE_ROW_HEIGHT - 6)
+            pygame.draw.rect(screen, GRAY, bar_rect, 1)
+            bar_rect.width = int(bar_width * fraction)
+            pygame.draw.rect(screen, color, bar_rect)
+
+def main(difficulty="Normal", replay_log=None, replay_speed=1.0, time_source=None, ghost=None):
+    """Run the typing screen on its own until the player leaves it.
+    
+    Returns "BACK_TO_DIFFICULTY" when the player leaves, or None if the
+    window was closed. See TypingScene for the arguments.
+    """
+    ensure_initialized()
+    return SceneManager.run_scene(TypingScene(difficulty, replay_log, replay_speed, time_source, ghost), screen)
+
+def replay(log, speed=1.0, render_surface=None):
+    """Play back a recorded session log (a SessionLog or a path to one).
+    
+    With a speed the session is shown in the typing screen at that multiple
+    of real time (1.0 = as typed, 4.0 = four times faster). With speed=None
+    it is played as fast as possible without drawing to the display and the
+    results dict is returned - if render_surface is given, the paragraph is
+    still drawn onto it after every key, to exercise the renderer.
+    """
+    if not isinstance(log, SessionLog):
+        log = read_session_log(log)
+    
+    if speed is not None:
+        return main(log.difficulty, replay_log=log, replay_speed=speed)
+    
+    session = TypingSession(log.paragraph_text, log.time_limit)
+    if render_surface is not None:
+        ensure_initialized()
+        max_text_width = render_surface.get_width() - 160
+        renderer = get_line_renderer(get_paragraph_layout(log.paragraph_text, text_font, max_text_width), text_font)
+    for timestamp, key in log.events():
+        session.press(key, timestamp)
+        if render_surface is not None:
+            render_surface.fill(BACKGROUND_COLOR)
+            renderer.draw(render_surface, 80, 0, session.typed_text.correct_flags())
+        if session.completed:
+            break
+    session.update(log.duration)
+    return session.results()
 
 # Entry point
 if __name__ == "__main__":
-    result = main("Normal")
+    if len(sys.argv) > 1:
+        # python TheTypingGame.py <session log> [speed | fast]
+        speed = sys.argv[2] if len(sys.argv) > 2 else "1"
+        result = replay(sys.argv[1], None if speed == "fast" else float(speed))
+    else:
+        result = main("Normal")
+    ScoreStore.flush_scores()
+    flush_logs()
     print(f"Game ended with result: {result}")
@@ -0,0 +1,353 @@
+# Typing game logic that does not depend on pygame
+# Used by TheTypingGame.py and by tools that score sessions without a window
+import time
+
+def calculate_wpm(characters_typed, time_elapsed, typed_chars=None):
+    """Calculate Words Per Minute.
+
+    Args:
+        characters_typed: Total characters typed (including mistakes)
+        time_elapsed: Time elapsed in seconds
+        typed_chars: Optional list of booleans indicating correct (True) or incorrect (False) characters
+                    If provided, only correctly typed characters are counted for WPM
+    """
+    if time_elapsed <= 0:
+        return 0
+
+    # If we have the typed_chars list, count only correctly typed characters
+    if typed_chars is not None:
+        correct_chars = sum(1 for is_correct in typed_chars if is_correct)
+        characters_typed = correct_chars
+
+    # Standard: 5 characters = 1 word (including spaces)
+    # This is the industry standard for typing tests
+    words = characters_typed / 5.0
+
+    # Convert seconds to minutes
+    minutes = time_elapsed / 60.0
+
+    # Calculate WPM, rounding to nearest integer for display
+    if minutes > 0:
+        wpm = words / minutes
+        return round(wpm)  # Round to nearest integer for more accurate display
+    return 0
+
+def calculate_accuracy(total_chars, mistakes):
+    """Calculate typing accuracy percentage."""
+    if total_chars == 0:
+        return 100.0
+    correct_chars = total_chars - mistakes
+    accuracy = (correct_chars / total_chars) * 100.0
+    # Ensure accuracy doesn't go below 0
+    return max(0.0, accuracy)
+
+class TypingStats:
+    """Running totals for one typing session.
+
+    Updated on every keystroke and backspace so WPM, accuracy and combo are
+    read in constant time instead of being recounted from the typed text.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clear all counters for a new session."""
+        self.typed = 0  # Characters currently typed (drops on backspace)
+        self.correct = 0  # Currently typed characters that are correct
+        self.mistakes = 0  # Current mistakes (can decrease with backspace)
+        self.permanent_mistakes = 0  # Total mistakes ever made (never decreases, used for accuracy)
+        self.combo = 0
+        self.highest_combo = 0  # Track the highest combo achieved
+
+    def record_keystroke(self, is_correct, completes_word=False):
+        """Count a typed character.
+
+        completes_word is True when the character finishes a word (a space or
+        the last character of the text), which is what builds the combo.
+        """
+        self.typed += 1
+        if is_correct:
+            self.correct += 1
+            if completes_word:
+                self.combo += 1
+                if self.combo > self.highest_combo:
+                    self.highest_combo = self.combo
+        else:
+            self.mistakes += 1
+            self.permanent_mistakes += 1  # Permanent mistake count (never decreases)
+            self.combo = 0  # Reset combo on mistake
+
+    def record_backspace(self, was_correct):
+        """Uncount an erased character.
+
+        permanent_mistakes is NOT decreased - mistakes count forever for accuracy.
+        """
+        self.typed -= 1
+        if was_correct:
+            self.correct -= 1
+        else:
+            self.mistakes -= 1
+
+    def wpm(self, time_elapsed):
+        """Words per minute from correctly typed characters."""
+        return calculate_wpm(self.correct, time_elapsed)
+
+    def accuracy(self):
+        """Accuracy percentage, counting mistakes even if they were erased."""
+        if self.typed <= 0:
+            return 0.0
+        return min(100.0, calculate_accuracy(self.typed, self.permanent_mistakes))
+
+class TypedText:
+    """The typed text, kept in a preallocated array that grows at the end.
+
+    The caret is always at the end of what has been typed, so typing
+    appends a character and backspace drops the last one - both O(1), with
+    no string copies. Whether each character was correct is stored
+    alongside in a bytearray (1 = correct, 0 = mistake). Storage doubles
+    when it fills up.
+    """
+    def __init__(self, capacity=256):
+        self.chars = [''] * capacity
+        self.flags = bytearray(capacity)
+        self.length = 0  # Characters typed; storage after them is unused
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ''.join(self.chars[:self.length][index])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("TypedText index out of range")
+        return self.chars[index]
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.chars[i]
+
+    def append(self, char, is_correct):
+        """Type a character at the caret."""
+        if self.length == len(self.chars):
+            # Storage is full - double it
+            self.chars.extend([''] * len(self.chars))
+            self.flags = self.flags + bytearray(len(self.flags))
+        self.chars[self.length] = char
+        self.flags[self.length] = 1 if is_correct else 0
+        self.length += 1
+
+    def pop(self):
+        """Erase the character before the caret and return (char, was_correct)."""
+        if not self.length:
+            raise IndexError("pop from empty TypedText")
+        self.length -= 1
+        return self.chars[self.length], self.flags[self.length] == 1
+
+    def delete_word(self):
+        """Erase back to the start of the previous word (Ctrl+Backspace).
+
+        Spaces right before the caret are erased first, then the word itself.
+        Returns the was_correct flag of every erased character, last first.
+        """
+        removed = []
+        while self.length and self.chars[self.length - 1] == ' ':
+            removed.append(self.pop()[1])
+        while self.length and self.chars[self.length - 1] != ' ':
+            removed.append(self.pop()[1])
+        return removed
+
+    def clear(self):
+        """Erase everything."""
+        self.length = 0
+
+    def text(self):
+        """The typed text as a string."""
+        return ''.join(self.chars[:self.length])
+
+    def correct_flags(self):
+        """Per-character correctness (1/0) of the typed text, without copying."""
+        return memoryview(self.flags)[:self.length]
+
+# Special keys understood by TypingSession.press
+BACKSPACE = '\b'
+WORD_BACKSPACE = '\x17'  # Ctrl+Backspace
+
+class TypingSession:
+    """State machine for one round of the typing game, with no rendering.
+
+    Every method takes the current time as an argument instead of reading a
+    clock, so the same session can be driven by the real clock (the game), a
+    virtual clock (replays) or a list of scripted events (simulate()).
+    
+    If a recorder is given (see SessionLog.KeystrokeRecorder), every key the
+    session handles is passed to recorder.record(now, key, is_correct).
+    """
+    def __init__(self, paragraph_text, time_limit, recorder=None):
+        self.paragraph_text = paragraph_text
+        self.time_limit = time_limit  # in seconds
+        self.typed_text = TypedText(max(16, len(paragraph_text)))
+        self.stats = TypingStats()
+        self.started = False
+        self.completed = False
+        self.time_ran_out = False
+        self.start_time = None
+        self.end_time = None
+        self.recorder = recorder
+
+    @property
+    def current_char_index(self):
+        """Index of the next character to type."""
+        return self.typed_text.length
+
+    def start(self, now):
+        """Start the timer (on the first keypress)."""
+        if not self.started:
+            self.started = True
+            self.start_time = now
+
+    def update(self, now):
+        """End the round if the time limit has passed."""
+        if self.started and not self.completed and now - self.start_time >= self.time_limit:
+            self.time_ran_out = True
+            self.completed = True
+            # The round ends exactly at the limit, however late this check runs
+            self.end_time = self.start_time + self.time_limit
+
+    def press(self, key, now):
+        """Handle one key press.
+
+        key is a typed character, BACKSPACE, WORD_BACKSPACE, or None for keys
+        that type nothing (they still start the timer).
+        """
+        if self.completed:
+            return
+        starting = not self.started
+        if starting:
+            self.started = True
+            self.start_time = now
+        elif now - self.start_time >= self.time_limit:
+            self.update(now)
+            return
+
+        recorder = self.recorder
+        if key is None:
+            # Only the key that started the timer matters for a replay
+            if starting and recorder is not None:
+                recorder.record(now, None)
+            return
+        is_correct = False
+        if key == BACKSPACE:
+            self.backspace()
+        elif key == WORD_BACKSPACE:
+            self.backspace(whole_word=True)
+        else:
+            is_correct = self.type_char(key, now)
+        if recorder is not None:
+            recorder.record(now, key, is_correct)
+
+    def type_char(self, char, now):
+        """Type one character at the caret and return whether it was correct."""
+        paragraph_text = self.paragraph_text
+        index = self.typed_text.length
+        if index >= len(paragraph_text):
+            return False
+
+        expected_char = paragraph_text[index]
+        is_correct = char == expected_char  # Case-sensitive comparison - capitalization matters!
+        self.typed_text.append(char, is_correct)
+        # Combo grows when a word is completed (a space, or the last character)
+        self.stats.record_keystroke(is_correct, expected_char == ' ' or index == len(paragraph_text) - 1)
+
+        # Check if paragraph is complete (can complete even with mistakes)
+        if index + 1 >= len(paragraph_text):
+            self.completed = True
+            self.end_time = now
+        return is_correct
+
+    def backspace(self, whole_word=False):
+        """Erase one character, or back to the start of the word. Returns how many were erased."""
+        if whole_word:
+            erased = self.typed_text.delete_word()
+        elif self.typed_text.length:
+            erased = [self.typed_text.pop()[1]]
+        else:
+            erased = []
+        for was_correct in erased:
+            self.stats.record_backspace(was_correct)
+        return len(erased)
+
+    def elapsed(self, now):
+        """Seconds played so far (frozen once the round is over)."""
+        if not self.started:
+            return 0
+        if self.completed:
+            return self.end_time - self.start_time
+        return now - self.start_time
+
+    def remaining(self, now):
+        """Seconds left on the timer."""
+        return max(0, self.time_limit - self.elapsed(now))
+
+    def wpm(self, now):
+        """Live words per minute."""
+        return self.stats.wpm(self.elapsed(now))
+
+    def results(self):
+        """Final stats as shown on the results screen."""
+        time_elapsed = self.end_time - self.start_time if self.start_time is not None and self.end_time is not None else 0
+        return {
+            "wpm": self.stats.wpm(time_elapsed),
+            "accuracy": self.stats.accuracy(),
+            "highest_combo": self.stats.highest_combo,
+            "time_ran_out": self.time_ran_out,
+            "completed": self.completed,
+            "elapsed": time_elapsed,
+            "typed": self.stats.typed,
+            "mistakes": self.stats.permanent_mistakes,
+        }
+
+def simulate(paragraph_text, time_limit, events, end_time=None):
+    """Play a whole session from (timestamp, key) events and return its results.
+
+    Keys are the same as for TypingSession.press. If end_time is given the
+    timer is checked at that time after the last event, as the game would on
+    its next frame.
+    """
+    session = TypingSession(paragraph_text, time_limit)
+    press = session.press
+    for timestamp, key in events:
+        press(key, timestamp)
+        if session.completed:
+            break
+    if end_time is not None:
+        session.update(end_time)
+    return session.results()
+
+class VirtualClock:
+    """A clock that only moves when told to, for driving sessions without real time."""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move the clock forward."""
+        self.now += seconds
+
+    def set(self, now):
+        """Jump the clock to now (it never goes backwards)."""
+        if now > self.now:
+            self.now = now
+
+class ScaledClock:
+    """A clock that starts at 0 and runs speed times faster than real time."""
+    def __init__(self, speed=1.0, source=None):
+        self.speed = speed
+        self.source = source if source is not None else time.perf_counter
+        self.origin = self.source()
+
+    def __call__(self):
+        return (self.source() - self.origin) * self.speed
@@ -0,0 +1,100 @@
+# Measures how long each screen's loaded images take to blit, in the formats
+# they can be loaded in:
+#   raw       - as pygame.image.load / frombuffer return them (no conversion)
+#   alpha     - convert_alpha() on everything
+#   display   - AssetManager.to_display_format() (what the game uses)
+#
+# Run from the game folder: python benchmark_blits.py [blits per image]
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # No window needed
+
+import pygame
+
+import AssetManager
+
+SCREEN_WIDTH = 960
+SCREEN_HEIGHT = 540
+
+# Images blitted on each screen, as (path, size the game scales them to)
+SCREENS = [
+    ("Title screen", [
+        (os.path.join('images', 'BACKGROUND PIXELTYPERS.gif'), (SCREEN_WIDTH, SCREEN_HEIGHT)),
+        (os.path.join('images', 'MainMenuTXTBOX.png'), (400, 350)),
+        (os.path.join('images', 'Back Button 1.png'), None),
+    ]),
+    ("Difficulty menu", [
+        (os.path.join('images', 'EasyBTN.png'), None),
+        (os.path.join('images', 'Normal BTN.png'), None),
+        (os.path.join('images', 'Hard BTN.png'), None),
+        (os.path.join('images', 'PracticeBTN.png'), None),
+        (os.path.join('images', 'MultiplayerBTN.png'), None),
+    ]),
+    ("Typing screen", [
+        (os.path.join('images', 'flame-lit.gif'), None),
+        (os.path.join('images', 'PauseBTN.png'), None),
+    ]),
+    ("Popup", [
+        (os.path.join('images', '200.gif'), (120, 120)),
+    ]),
+]
+
+def load_raw(path):
+    """Every frame of path, unconverted (GIFs as RGBA, like the old loaders)."""
+    if path.lower().endswith('.gif'):
+        return [pygame.image.frombuffer(data, size, mode) for data, size, mode in AssetManager.read_gif_frames(path, True)]
+    return [pygame.image.load(path)]
+
+def time_blits(screen, surfaces, blits):
+    """Seconds to blit each of surfaces blits times."""
+    started = time.perf_counter()
+    for surface in surfaces:
+        for _ in range(blits):
+            screen.blit(surface, (0, 0))
+    return time.perf_counter() - started
+
+def main():
+    blits = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pygame.display.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+    print(f"{'Screen':<18}{'raw ms':>10}{'alpha ms':>10}{'display ms':>12}{'speedup':>10}")
+    timed = 0
+    for screen_name, images in SCREENS:
+        # Timing part of a screen would understate it - skip the row instead
+        missing = [path for path, size in images if not AssetManager.asset_exists(path)]
+        if missing:
+            print(f"{screen_name:<18}skipped - missing {', '.join(missing)}")
+            continue
+        formats = {"raw": [], "alpha": [], "display": []}
+        for path, size in images:
+            for surface in load_raw(AssetManager.resolve_asset(path)):
+                variants = {
+                    "raw": surface,
+                    "alpha": surface.convert_alpha(),
+                    "display": AssetManager.to_display_format(surface, use_colorkey=path.lower().endswith('.gif')),
+                }
+                for name, variant in variants.items():
+                    if size is not None:
+                        variant = pygame.transform.scale(variant, size)
+                    formats[name].append(variant)
+
+        # Blit everything once first so RLE surfaces are encoded before timing
+        for surfaces in formats.values():
+            time_blits(screen, surfaces, 1)
+        # Milliseconds to blit every image on the screen (and every GIF frame) once
+        times = {name: time_blits(screen, surfaces, blits) * 1000 / blits for name, surfaces in formats.items()}
+        speedup = times["alpha"] / times["display"] if times["display"] else 0
+        print(f"{screen_name:<18}{times['raw']:>10.3f}{times['alpha']:>10.3f}{times['display']:>12.3f}{speedup:>9.1f}x")
+        timed += 1
+
+    pygame.quit()
+    if not timed:
+        print("No screen had all of its images - run this from the game folder")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())